@@ -0,0 +1,122 @@
+# Declarative Agent Spec for the EVA Graph
+# Description: The single list of agents the graph is built from. Each AgentSpec names the agent,
+#              the emoji used when it answers, the line the orchestrator sees when routing, and its
+#              dev tool. AgentRegistry turns the enabled specs into everything that used to be kept in
+#              sync by hand: the graph nodes and edges, the RouteDecision literal, the O(1) routing
+#              table, the orchestrator's agent list, the emoji map and the dev tools mapping.
+#
+# Per-deployment subsets: EVA_AGENTS=slack_mgmt_agent,github_mgmt_agent starts a worker with only
+# those specialists (plus the default agent). Optional subsystems of disabled agents (indexes,
+# background syncs, clients) are never created, so slim workers start faster and use less memory.
+
+# -- Imports -- #
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from example_main_agent_tools import (
+    CKBDevTool, CalendarMgmtDevTool, CustomerServiceDevTool, EmailMgmtDevTool, GitHubDevTool,
+    HubSpotMgmtDevTool, LogicalDevTool, SlackDevTool, TherapistDevTool, WebSearchDevTool,
+)
+
+DEFAULT_AGENT = "general_chat_agent"
+
+
+class AgentSpec(BaseModel):
+    name: str
+    emoji: str
+    description: str = Field(..., description="What the orchestrator is told this agent handles.")
+    dev_tool: Optional[Type[BaseTool]] = None
+
+
+# Listed in the order the orchestrator sees them; the default agent comes last
+AGENT_SPECS: List[AgentSpec] = [
+    AgentSpec(name="ckb_agent", emoji="📚", dev_tool=CKBDevTool, description=(
+        "For queries requiring information from our internal knowledge base (e.g., 'how does X work?', 'what are the specs for Y?')."
+    )),
+    AgentSpec(name="email_mgmt_agent", emoji="📧", dev_tool=EmailMgmtDevTool, description=(
+        "For tasks related to managing Gmail inbox (e.g., 'read new emails', 'draft a reply to X', 'search for email from Y')."
+    )),
+    AgentSpec(name="calendar_mgmt_agent", emoji="📅", dev_tool=CalendarMgmtDevTool, description=(
+        "For tasks related to Google Calendar (e.g., 'create an event', 'check my schedule for tomorrow', 'find free slots')."
+    )),
+    AgentSpec(name="web_search_agent", emoji="🌐", dev_tool=WebSearchDevTool, description=(
+        "For general web searches, current events, or information not in the CKB (e.g., 'what's the weather?', 'who won the game?')."
+    )),
+    AgentSpec(name="customer_service_agent", emoji="🤝", dev_tool=CustomerServiceDevTool, description=(
+        "For customer-facing queries about Elevated Vector Automation, its products, or services (e.g., 'tell me about your company', 'what services do you offer?')."
+    )),
+    AgentSpec(name="slack_mgmt_agent", emoji="📱", dev_tool=SlackDevTool, description=(
+        "For tasks related to sending messages to Slack channels, listing Slack channels, or other Slack interactions."
+    )),
+    AgentSpec(name="github_mgmt_agent", emoji="💻", dev_tool=GitHubDevTool, description=(
+        "For tasks related to GitHub, such as creating or managing issues, listing repositories, commenting on issues, or getting repository details."
+    )),
+    AgentSpec(name="hubspot_mgmt_agent", emoji="📈", dev_tool=HubSpotMgmtDevTool, description=(
+        "For CRM tasks in HubSpot (e.g., 'create a new contact', 'log a sales call', 'find company X details')."
+    )),
+    AgentSpec(name="therapist_agent", emoji="❤️‍🩹", dev_tool=TherapistDevTool, description=(
+        "For emotional support, therapy, feelings, or personal problems."
+    )),
+    AgentSpec(name="logical_agent", emoji="💡", dev_tool=LogicalDevTool, description=(
+        "For facts, information, logical analysis, or practical solutions."
+    )),
+    AgentSpec(name=DEFAULT_AGENT, emoji="💬", description=(
+        "For general conversation, greetings, or if no other specialist is suitable. This agent can also echo messages and provide the current date/time."
+    )),
+]
+
+
+class AgentRegistry:
+    def __init__(self, specs: List[AgentSpec], enabled: Optional[Iterable[str]] = None, default_agent: str = DEFAULT_AGENT):
+        known = {spec.name for spec in specs}
+        wanted = set(enabled) if enabled else known
+        unknown = wanted - known
+        if unknown:
+            raise ValueError(f"Unknown agents in EVA_AGENTS: {', '.join(sorted(unknown))}. Known agents: {', '.join(sorted(known))}.")
+        # The default agent is the routing fallback, so it is always part of the graph
+        wanted.add(default_agent)
+        self.default_agent = default_agent
+        self.specs: Dict[str, AgentSpec] = {spec.name: spec for spec in specs if spec.name in wanted}
+        self.names: Tuple[str, ...] = tuple(self.specs)
+        # Routing table for the orchestrator's conditional edges: one dict lookup per request
+        self.route_table: Dict[str, str] = {name: name for name in self.names}
+        self._nodes: Dict[str, Callable[..., Any]] = {}
+
+    def enabled(self, agent_name: str) -> bool:
+        return agent_name in self.specs
+
+    def route(self, agent_name: Optional[str]) -> str:
+        return self.route_table.get(agent_name, self.default_agent)
+
+    def emoji(self, agent_name: Optional[str]) -> str:
+        spec = self.specs.get(agent_name)
+        return spec.emoji if spec else "🤖"
+
+    def routing_prompt(self) -> str:
+        return "".join(f"- {spec.name}: {spec.description}\n" for spec in self.specs.values())
+
+    def dev_tools_map(self) -> Dict[str, Type[BaseTool]]:
+        return {name: spec.dev_tool for name, spec in self.specs.items() if spec.dev_tool}
+
+    def node(self, agent_name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        # Decorator that registers the node function implementing an agent
+        def register(node_fn: Callable[..., Any]) -> Callable[..., Any]:
+            self._nodes[agent_name] = node_fn
+            return node_fn
+        return register
+
+    def node_for(self, agent_name: str) -> Callable[..., Any]:
+        if agent_name not in self._nodes:
+            raise LookupError(f"Agent '{agent_name}' is in the spec but no node function is registered for it.")
+        return self._nodes[agent_name]
+
+
+def agent_registry_from_env(specs: Optional[List[AgentSpec]] = None) -> AgentRegistry:
+    enabled = [name.strip() for name in os.getenv("EVA_AGENTS", "").split(",") if name.strip()]
+    registry = AgentRegistry(specs or AGENT_SPECS, enabled or None)
+    if enabled:
+        print(f"🧩 Agent subset: {', '.join(registry.names)}")
+    return registry
@@ -0,0 +1,139 @@
+# Micro-Batching Router for the EVA Orchestrator
+# Description: Collects routing requests that arrive within a short window and classifies
+#              them with a single structured-output LLM call, fanning the decisions back
+#              out to the waiting graph runs.
+
+# -- Imports -- #
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field, create_model
+
+from example_stats import percentile
+
+
+BATCH_INSTRUCTIONS = (
+    "\nYou will receive a JSON list of independent user queries, each with an 'index'. "
+    "Classify every query on its own, as if it were the only one. "
+    "Return exactly one decision per query and copy its 'index' into the decision."
+)
+
+
+class MicroBatchRouter:
+    def __init__(
+        self,
+        llm: Any,
+        system_prompt: str,
+        decision_model: Type[BaseModel],
+        window_ms: float = 20.0,
+        max_batch_size: int = 16,
+    ):
+        self.system_prompt = system_prompt
+        self.decision_model = decision_model
+        self.window_s = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        # The batched schema reuses the single-decision model so the agent literals stay in one place
+        indexed_model = create_model(
+            f"Indexed{decision_model.__name__}",
+            __base__=decision_model,
+            index=(int, Field(..., description="Index of the query this decision belongs to.")),
+        )
+        batch_model = create_model(
+            f"{decision_model.__name__}Batch",
+            decisions=(List[indexed_model], Field(..., description="One routing decision per query.")),
+        )
+        self._single_llm = llm.with_structured_output(decision_model)
+        self._batch_llm = llm.with_structured_output(batch_model)
+
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.queries_routed = 0
+        self.llm_calls = 0
+        self.batch_sizes: List[int] = []
+        self.queue_wait_ms: List[float] = []
+        self.call_latency_ms: List[float] = []
+
+    async def route(self, query: str) -> BaseModel:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._classify(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _classify(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        dispatched_at = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            self.queue_wait_ms.append((dispatched_at - enqueued_at) * 1000)
+        self.batch_sizes.append(len(batch))
+        self.queries_routed += len(batch)
+        self.llm_calls += 1
+
+        try:
+            if len(batch) == 1:
+                # Nothing to amortise; use the plain single-query call
+                decisions = [await self._single_llm.ainvoke([
+                    SystemMessage(content=self.system_prompt),
+                    HumanMessage(content=batch[0][0])
+                ])]
+            else:
+                payload = json.dumps([{"index": i, "query": q} for i, (q, _, _) in enumerate(batch)], ensure_ascii=False)
+                result = await self._batch_llm.ainvoke([
+                    SystemMessage(content=self.system_prompt + BATCH_INSTRUCTIONS),
+                    HumanMessage(content=payload)
+                ])
+                by_index = {d.index: d for d in result.decisions}
+                decisions = []
+                for i in range(len(batch)):
+                    decision = by_index.get(i)
+                    decisions.append(
+                        self.decision_model(**decision.model_dump(exclude={"index"})) if decision else None
+                    )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.call_latency_ms.append((time.perf_counter() - dispatched_at) * 1000)
+
+        for (_, future, _), decision in zip(batch, decisions):
+            if future.done():
+                continue
+            if decision is None:
+                future.set_exception(ValueError("Batched routing response did not include a decision for this query."))
+            else:
+                future.set_result(decision)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queries_routed": self.queries_routed,
+            "llm_calls": self.llm_calls,
+            # Queries classified per LLM call; 1.0 means batching bought nothing
+            "throughput_gain": round(self.queries_routed / self.llm_calls, 2) if self.llm_calls else 0.0,
+            "avg_batch_size": round(sum(self.batch_sizes) / len(self.batch_sizes), 2) if self.batch_sizes else 0.0,
+            "queue_wait_ms_avg": round(sum(self.queue_wait_ms) / len(self.queue_wait_ms), 2) if self.queue_wait_ms else 0.0,
+            "queue_wait_ms_p95": round(percentile(self.queue_wait_ms, 95), 2),
+            "call_latency_ms_avg": round(sum(self.call_latency_ms) / len(self.call_latency_ms), 2) if self.call_latency_ms else 0.0,
+        }
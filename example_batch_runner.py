@@ -0,0 +1,216 @@
+# Batch Query Runner for the EVA Multi-Agent Graph
+# Description: Streams prompts from a JSONL file through the compiled LangGraph `graph`
+#              with bounded concurrency, a global LLM rate limit, incremental JSONL
+#              results and resume support for interrupted jobs.
+#
+# Input format (one JSON object per line):
+#   {"id": "q-001", "query": "what's on my calendar tomorrow?"}
+#   "id" is optional (the line number is used instead); "prompt" is accepted as an alias of "query".
+#
+# Usage:
+#   python example_batch_runner.py prompts.jsonl results.jsonl --concurrency 8 --requests-per-second 4
+#   Set ORCHESTRATOR_BATCH_WINDOW_MS (e.g. 20) to micro-batch routing calls across concurrent queries.
+
+# -- Imports -- #
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from langchain_core.messages import HumanMessage
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from example_deadline import ainvoke_with_deadline
+from example_fast_path import synthesis_stats
+from example_main_and_agents import REQUEST_DEADLINE_S, AgentState, build_warmup, context_packer, graph, llm, llm_traffic_controller, micro_batch_router
+from example_profiling import loop_lag_monitor, span_profiler, write_profile
+from example_rate_limiter import current_priority
+
+
+# --- Input / Resume Helpers --- #
+def load_completed_ids(output_path: str) -> Set[str]:
+    # Only successful items count as done; errored items are retried on resume
+    completed: Set[str] = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A job killed mid-write can leave a truncated last line; ignore it
+                continue
+            if record.get("status") == "ok":
+                completed.add(str(record.get("id")))
+    return completed
+
+
+async def iter_prompts(input_path: str, skip_ids: Set[str]) -> AsyncIterator[Tuple[str, str]]:
+    # Reads lazily so that very large prompt files never sit in memory at once
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed line {line_number}: {e}")
+                continue
+            item_id = str(item.get("id", line_number))
+            query = item.get("query") or item.get("prompt")
+            if not query:
+                print(f"⚠️ Skipping line {line_number}: no 'query' or 'prompt' field.")
+                continue
+            if item_id in skip_ids:
+                continue
+            yield item_id, query
+            # Yield control so workers can make progress while the file is read
+            await asyncio.sleep(0)
+
+
+# --- Batch Execution --- #
+async def run_single_query(item_id: str, query: str, deadline_s: Optional[float] = None) -> Dict[str, Any]:
+    initial_state: AgentState = {
+        "messages": [HumanMessage(content=query)],
+        "user_query": query,
+        "next_agent": None,
+        "final_response": None,
+        "final_responder": None
+    }
+    config = {"configurable": {"session_id": f"batch_{item_id}"}}
+
+    started_at = time.time()
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"id": item_id, "query": query, "started_at": started_at}
+    try:
+        with span_profiler.trace_request(item_id):
+            final_graph_state, deadline_report = await ainvoke_with_deadline(graph, initial_state, deadline_s, config=config)
+        record.update({
+            "status": "ok",
+            "next_agent": final_graph_state.get("next_agent"),
+            "final_responder": final_graph_state.get("final_responder"),
+            "final_response": final_graph_state.get("final_response"),
+        })
+        if deadline_report:
+            record["deadline"] = deadline_report
+    except Exception as e:
+        record.update({"status": "error", "error": str(e)})
+    record["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 8,
+    requests_per_second: Optional[float] = None,
+    deadline_s: Optional[float] = REQUEST_DEADLINE_S,
+) -> Dict[str, Any]:
+    if requests_per_second:
+        # One limiter on the shared client throttles every LLM call made by every node
+        llm.rate_limiter = InMemoryRateLimiter(
+            requests_per_second=requests_per_second,
+            check_every_n_seconds=0.05,
+            max_bucket_size=max(1, int(requests_per_second)),
+        )
+
+    # Workers inherit this, so the shared LLM limiter serves interactive traffic first
+    current_priority.set("batch")
+
+    completed_ids = load_completed_ids(output_path)
+    if completed_ids:
+        print(f"🔁 Resuming: {len(completed_ids)} items already completed in {output_path}")
+
+    # Connections and model loads are set up before the clock starts, not inside the first items
+    await build_warmup().run()
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    write_lock = asyncio.Lock()
+    stats = {"ok": 0, "error": 0, "skipped": len(completed_ids)}
+    batch_start = time.perf_counter()
+    if loop_lag_monitor:
+        loop_lag_monitor.start()
+
+    with open(output_path, "a", encoding="utf-8") as out_file:
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                item_id, query = item
+                record = await run_single_query(item_id, query, deadline_s)
+                async with write_lock:
+                    # Flushed per item so an interrupted job loses at most the in-flight queries
+                    out_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out_file.flush()
+                    stats[record["status"]] += 1
+                    done = stats["ok"] + stats["error"]
+                    if done % 50 == 0:
+                        print(f"⏳ {done} processed ({stats['error']} errors)...")
+                queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        async for item in iter_prompts(input_path, completed_ids):
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    if loop_lag_monitor:
+        loop_lag_monitor.stop()
+    elapsed = time.perf_counter() - batch_start
+    processed = stats["ok"] + stats["error"]
+    summary = {
+        **stats,
+        "processed": processed,
+        "elapsed_s": round(elapsed, 2),
+        "queries_per_s": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    if micro_batch_router:
+        summary["router"] = micro_batch_router.stats()
+    if llm_traffic_controller:
+        summary["llm_limiter"] = llm_traffic_controller.metrics()
+    summary["synthesis"] = synthesis_stats.report()
+    if context_packer:
+        summary["prompt_tokens"] = context_packer.report()
+    if loop_lag_monitor:
+        summary["loop_lag"] = loop_lag_monitor.report()
+    if span_profiler.enabled:
+        summary["span_profile"] = write_profile("batch_spans", span_profiler.folded())
+    print(f"✅ Batch finished: {summary}")
+    return summary
+
+
+# --- CLI --- #
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through the EVA graph.")
+    parser.add_argument("input_path", help="JSONL file with one {'id', 'query'} object per line.")
+    parser.add_argument("output_path", help="JSONL file results are appended to (also used for resume).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum number of concurrent graph runs.")
+    parser.add_argument(
+        "--requests-per-second", type=float, default=None,
+        help="Global LLM request rate limit shared by all graph runs (default: unlimited)."
+    )
+    parser.add_argument(
+        "--deadline-s", type=float, default=REQUEST_DEADLINE_S,
+        help="Per-query time budget in seconds; expired queries get a degraded response (default: EVA_REQUEST_DEADLINE_S)."
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(run_batch(
+            args.input_path, args.output_path, args.concurrency, args.requests_per_second, args.deadline_s
+        ))
+    except KeyboardInterrupt:
+        print("\nBatch interrupted. Re-run the same command to resume.")
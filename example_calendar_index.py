@@ -0,0 +1,436 @@
+# Calendar Free/Busy Interval Index for the calendar_mgmt_agent
+# Description: Keeps every attendee's busy time in a local interval tree, synced incrementally
+#              with calendar sync tokens (only changed/cancelled events are fetched after the first
+#              sync). "Find a free slot" questions are answered locally by intersecting the attendees'
+#              free time in milliseconds, and the agent receives a compact slot list instead of raw
+#              event dumps.
+#
+# Backends (CALENDAR_INDEX):
+#   file     events from a JSON file (CALENDAR_EVENTS_PATH: {"calendar id": [Google-format events]}),
+#            re-read when it changes; for local runs and demos
+#   google   Google Calendar events.list with syncToken, using GOOGLE_ACCESS_TOKEN
+# InMemoryCalendarSource is the programmatic source that benchmarks and tests fill with put_event().
+# Calendars to index are listed in CALENDAR_IDS (comma separated, usually attendee emails).
+
+# -- Imports -- #
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+from zoneinfo import ZoneInfo
+
+import httpx
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+Interval = Tuple[float, float]
+
+
+# --- Interval Tree --- #
+class _Node:
+    __slots__ = ("start", "end", "key", "priority", "max_end", "left", "right")
+
+    def __init__(self, start: float, end: float, key: str):
+        self.start, self.end, self.key = start, end, key
+        self.priority = random.random()
+        self.max_end = end
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self) -> None:
+        self.max_end = max(self.end, self.left.max_end if self.left else self.end, self.right.max_end if self.right else self.end)
+
+
+class IntervalTree:
+    # Treap ordered by (start, key) and augmented with each subtree's max end:
+    # O(log n) insert/delete, O(log n + k) overlap queries
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _rotate_right(node: _Node) -> _Node:
+        left = node.left
+        node.left, left.right = left.right, node
+        node.update()
+        left.update()
+        return left
+
+    @staticmethod
+    def _rotate_left(node: _Node) -> _Node:
+        right = node.right
+        node.right, right.left = right.left, node
+        node.update()
+        right.update()
+        return right
+
+    def insert(self, start: float, end: float, key: str) -> None:
+        def _insert(node: Optional[_Node]) -> _Node:
+            if node is None:
+                return _Node(start, end, key)
+            if (start, key) < (node.start, node.key):
+                node.left = _insert(node.left)
+                if node.left.priority > node.priority:
+                    node = self._rotate_right(node)
+            else:
+                node.right = _insert(node.right)
+                if node.right.priority > node.priority:
+                    node = self._rotate_left(node)
+            node.update()
+            return node
+
+        self._root = _insert(self._root)
+        self._size += 1
+
+    def remove(self, start: float, key: str) -> bool:
+        removed = False
+
+        def _remove(node: Optional[_Node]) -> Optional[_Node]:
+            nonlocal removed
+            if node is None:
+                return None
+            if (start, key) == (node.start, node.key):
+                removed = True
+                if node.left is None:
+                    return node.right
+                if node.right is None:
+                    return node.left
+                if node.left.priority > node.right.priority:
+                    node = self._rotate_right(node)
+                    node.right = _remove(node.right)
+                else:
+                    node = self._rotate_left(node)
+                    node.left = _remove(node.left)
+            elif (start, key) < (node.start, node.key):
+                node.left = _remove(node.left)
+            else:
+                node.right = _remove(node.right)
+            node.update()
+            return node
+
+        self._root = _remove(self._root)
+        if removed:
+            self._size -= 1
+        return removed
+
+    def overlapping(self, start: float, end: float) -> Iterator[Tuple[float, float, str]]:
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            # Nothing in this subtree ends after the query starts
+            if node is None or node.max_end <= start:
+                continue
+            stack.append(node.left)
+            if node.start < end:
+                if node.end > start:
+                    yield node.start, node.end, node.key
+                stack.append(node.right)
+
+
+# --- Interval Helpers --- #
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(windows: List[Interval], busy: List[Interval]) -> List[Interval]:
+    free: List[Interval] = []
+    busy = merge_intervals(busy)
+    for window_start, window_end in windows:
+        cursor = window_start
+        for busy_start, busy_end in busy:
+            if busy_end <= cursor or busy_start >= window_end:
+                continue
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < window_end:
+            free.append((cursor, window_end))
+    return free
+
+
+def working_windows(start: datetime, end: datetime, tz: ZoneInfo, day_start: int = 9, day_end: int = 17, weekdays_only: bool = True) -> List[Interval]:
+    windows: List[Interval] = []
+    day = start.astimezone(tz).date()
+    while day <= end.astimezone(tz).date():
+        if not weekdays_only or day.weekday() < 5:
+            ws = datetime.combine(day, dt_time(day_start), tz).timestamp()
+            we = datetime.combine(day, dt_time(day_end), tz).timestamp()
+            ws, we = max(ws, start.timestamp()), min(we, end.timestamp())
+            if ws < we:
+                windows.append((ws, we))
+        day += timedelta(days=1)
+    return windows
+
+
+# --- Calendar Sources --- #
+class SyncTokenExpired(Exception):
+    pass
+
+
+class CalendarSource:
+    async def list_changes(self, calendar_id: str, sync_token: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+        # Returns (events, next_sync_token). Without a token every event is returned; with one, only
+        # events changed since, including cancelled ones ({"id": ..., "status": "cancelled"})
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryCalendarSource(CalendarSource):
+    def __init__(self):
+        self._events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, Dict[str, int]] = {}
+        self._clock = 0
+
+    def put_event(self, calendar_id: str, event: Dict[str, Any]) -> None:
+        self._clock += 1
+        self._events.setdefault(calendar_id, {})[event["id"]] = event
+        self._versions.setdefault(calendar_id, {})[event["id"]] = self._clock
+
+    def cancel_event(self, calendar_id: str, event_id: str) -> None:
+        self.put_event(calendar_id, {"id": event_id, "status": "cancelled"})
+
+    async def list_changes(self, calendar_id: str, sync_token: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+        since = int(sync_token) if sync_token else 0
+        versions = self._versions.get(calendar_id, {})
+        events = [self._events[calendar_id][eid] for eid, version in versions.items() if version > since]
+        if not sync_token:
+            events = [e for e in events if e.get("status") != "cancelled"]
+        return events, str(self._clock)
+
+
+class FileCalendarSource(InMemoryCalendarSource):
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._mtime: Optional[float] = None
+
+    def _reload(self) -> None:
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            calendars: Dict[str, List[Dict[str, Any]]] = json.load(f)
+        # Only new, edited and removed events get a new version, so sync tokens stay incremental
+        for calendar_id in set(calendars) | set(self._events):
+            events = {e["id"]: e for e in calendars.get(calendar_id, [])}
+            current = self._events.get(calendar_id, {})
+            for event_id, event in events.items():
+                if current.get(event_id) != event:
+                    self.put_event(calendar_id, event)
+            for event_id, event in list(current.items()):
+                if event_id not in events and event.get("status") != "cancelled":
+                    self.cancel_event(calendar_id, event_id)
+        self._mtime = mtime
+
+    async def list_changes(self, calendar_id: str, sync_token: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+        await asyncio.to_thread(self._reload)
+        return await super().list_changes(calendar_id, sync_token)
+
+
+class GoogleCalendarSource(CalendarSource):
+    def __init__(self, access_token: str, base_url: str = "https://www.googleapis.com/calendar/v3"):
+        self._client = httpx.AsyncClient(
+            base_url=base_url, headers={"Authorization": f"Bearer {access_token}"}, timeout=30,
+        )
+
+    async def list_changes(self, calendar_id: str, sync_token: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+        events: List[Dict[str, Any]] = []
+        params: Dict[str, Any] = {"maxResults": 2500, "singleEvents": "true"}
+        if sync_token:
+            params["syncToken"] = sync_token
+        else:
+            # A full sync only needs recent and upcoming events for free/busy purposes
+            params["timeMin"] = (datetime.utcnow() - timedelta(days=7)).isoformat() + "Z"
+        while True:
+            response = await self._client.get(f"/calendars/{calendar_id}/events", params=params)
+            if response.status_code == 410:
+                raise SyncTokenExpired(calendar_id)
+            response.raise_for_status()
+            page = response.json()
+            events.extend(page.get("items", []))
+            if page.get("nextPageToken"):
+                params["pageToken"] = page["nextPageToken"]
+                continue
+            return events, page["nextSyncToken"]
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def _event_bounds(event: Dict[str, Any], tz: ZoneInfo) -> Optional[Interval]:
+    def parse(value: Dict[str, Any]) -> Optional[float]:
+        if "dateTime" in value:
+            return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00")).timestamp()
+        if "date" in value:
+            return datetime.combine(date.fromisoformat(value["date"]), dt_time(0), tz).timestamp()
+        return None
+
+    start, end = parse(event.get("start", {})), parse(event.get("end", {}))
+    return (start, end) if start is not None and end is not None and end > start else None
+
+
+# --- Index --- #
+class CalendarIndex:
+    def __init__(self, source: CalendarSource, calendar_ids: List[str], timezone: str = "UTC", sync_interval_s: float = 60.0):
+        self.source = source
+        self.calendar_ids = calendar_ids
+        self.tz = ZoneInfo(timezone)
+        self.sync_interval_s = sync_interval_s
+        self._trees: Dict[str, IntervalTree] = {cid: IntervalTree() for cid in calendar_ids}
+        # calendar -> event id -> start, needed to remove/replace an event in its tree
+        self._event_starts: Dict[str, Dict[str, float]] = {cid: {} for cid in calendar_ids}
+        self._sync_tokens: Dict[str, Optional[str]] = {}
+        self._last_sync_at = 0.0
+        self._sync_lock = asyncio.Lock()
+        self.sync_ms: List[float] = []
+        self.query_ms: List[float] = []
+        self.events_applied = 0
+
+    def _apply(self, calendar_id: str, event: Dict[str, Any]) -> None:
+        tree, starts = self._trees[calendar_id], self._event_starts[calendar_id]
+        event_id = event["id"]
+        if event_id in starts:
+            tree.remove(starts.pop(event_id), event_id)
+        if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+            return
+        bounds = _event_bounds(event, self.tz)
+        if bounds:
+            tree.insert(bounds[0], bounds[1], event_id)
+            starts[event_id] = bounds[0]
+        self.events_applied += 1
+
+    async def _sync_calendar(self, calendar_id: str) -> None:
+        try:
+            events, token = await self.source.list_changes(calendar_id, self._sync_tokens.get(calendar_id))
+        except SyncTokenExpired:
+            print(f"♻️ Sync token expired for {calendar_id}; doing a full resync")
+            self._trees[calendar_id], self._event_starts[calendar_id] = IntervalTree(), {}
+            events, token = await self.source.list_changes(calendar_id, None)
+        for event in events:
+            self._apply(calendar_id, event)
+        self._sync_tokens[calendar_id] = token
+
+    async def sync(self, force: bool = False) -> None:
+        async with self._sync_lock:
+            if not force and time.monotonic() - self._last_sync_at < self.sync_interval_s:
+                return
+            start = time.perf_counter()
+            await asyncio.gather(*[self._sync_calendar(cid) for cid in self.calendar_ids])
+            self._last_sync_at = time.monotonic()
+            self.sync_ms.append((time.perf_counter() - start) * 1000)
+
+    def busy(self, calendar_id: str, start: float, end: float) -> List[Interval]:
+        return [(max(s, start), min(e, end)) for s, e, _ in self._trees[calendar_id].overlapping(start, end)]
+
+    def resolve(self, attendee: str) -> Optional[str]:
+        attendee = attendee.strip().lower()
+        for cid in self.calendar_ids:
+            if cid.lower() == attendee or cid.lower().split("@")[0] == attendee:
+                return cid
+        return None
+
+    def free_slots(
+        self, calendar_ids: List[str], start: datetime, end: datetime, min_duration_minutes: int = 30,
+        day_start: int = 9, day_end: int = 17, weekdays_only: bool = True
+    ) -> List[Interval]:
+        query_start = time.perf_counter()
+        windows = working_windows(start, end, self.tz, day_start, day_end, weekdays_only)
+        busy: List[Interval] = []
+        for cid in calendar_ids:
+            busy.extend(self.busy(cid, start.timestamp(), end.timestamp()))
+        slots = [(s, e) for s, e in subtract_intervals(windows, busy) if e - s >= min_duration_minutes * 60]
+        self.query_ms.append((time.perf_counter() - query_start) * 1000)
+        return slots
+
+    def format_slots(self, slots: List[Interval], limit: int = 10) -> str:
+        if not slots:
+            return "No common free slots in that range."
+        lines = []
+        for s, e in slots[:limit]:
+            start, end = datetime.fromtimestamp(s, self.tz), datetime.fromtimestamp(e, self.tz)
+            lines.append(f"- {start:%a %Y-%m-%d %H:%M}-{end:%H:%M} ({int((e - s) // 60)} min)")
+        more = f"\n(+{len(slots) - limit} more)" if len(slots) > limit else ""
+        return f"Common free slots ({self.tz.key}):\n" + "\n".join(lines) + more
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calendars": len(self.calendar_ids),
+            "indexed_events": sum(len(t) for t in self._trees.values()),
+            "events_applied": self.events_applied,
+            "syncs": len(self.sync_ms),
+            "last_sync_ms": round(self.sync_ms[-1], 2) if self.sync_ms else None,
+            "avg_query_ms": round(sum(self.query_ms) / len(self.query_ms), 3) if self.query_ms else None,
+        }
+
+
+# --- Agent Tool --- #
+class FreeSlotsInput(BaseModel):
+    attendees: List[str] = Field(..., description="Attendee emails or names whose calendars must all be free.")
+    start_date: str = Field(..., description="First day to search, YYYY-MM-DD.")
+    end_date: str = Field(..., description="Last day to search (inclusive), YYYY-MM-DD.")
+    duration_minutes: int = Field(30, description="Minimum slot length in minutes.")
+
+
+class FreeSlotsTool(BaseTool):
+    name: str = "find_free_slots"
+    description: str = (
+        "Finds time slots when all the given attendees are free during working hours, "
+        "computed from the synced calendar index. Use this for scheduling and availability questions."
+    )
+    args_schema: Type[BaseModel] = FreeSlotsInput
+    index: Any = None
+
+    def _run(self, **kwargs: Any) -> str:
+        raise NotImplementedError("find_free_slots is async-only; use ainvoke.")
+
+    async def _arun(self, attendees: List[str], start_date: str, end_date: str, duration_minutes: int = 30) -> str:
+        await self.index.sync()
+        resolved = {a: self.index.resolve(a) for a in attendees}
+        unknown = [a for a, cid in resolved.items() if cid is None]
+        if unknown:
+            return f"No indexed calendar for: {', '.join(unknown)}. Known calendars: {', '.join(self.index.calendar_ids)}."
+        start = datetime.combine(date.fromisoformat(start_date), dt_time(0), self.index.tz)
+        end = datetime.combine(date.fromisoformat(end_date) + timedelta(days=1), dt_time(0), self.index.tz)
+        slots = self.index.free_slots(list(resolved.values()), start, end, duration_minutes)
+        return self.index.format_slots(slots)
+
+
+def calendar_index_from_env() -> Optional[CalendarIndex]:
+    backend = os.getenv("CALENDAR_INDEX", "off").strip().lower()
+    if backend in ("", "off"):
+        return None
+    calendar_ids = [c.strip() for c in os.getenv("CALENDAR_IDS", "").split(",") if c.strip()]
+    if backend == "file":
+        path = os.getenv("CALENDAR_EVENTS_PATH", "")
+        if not path or not os.path.exists(path):
+            raise ValueError("CALENDAR_INDEX=file requires CALENDAR_EVENTS_PATH pointing at a JSON events file.")
+        source: CalendarSource = FileCalendarSource(path)
+    elif backend == "memory":
+        # An empty in-process source would report everyone as free all day
+        raise ValueError("CALENDAR_INDEX=memory has no events to serve; use file (CALENDAR_EVENTS_PATH) or google.")
+    elif backend == "google":
+        token = os.getenv("GOOGLE_ACCESS_TOKEN", "")
+        if not token or token.startswith("YOUR_"):
+            raise ValueError("CALENDAR_INDEX=google requires GOOGLE_ACCESS_TOKEN.")
+        source = GoogleCalendarSource(token)
+    else:
+        raise ValueError(f"Unknown CALENDAR_INDEX '{backend}', expected off, file or google.")
+    return CalendarIndex(
+        source, calendar_ids,
+        timezone=os.getenv("CALENDAR_TIMEZONE", "UTC"),
+        sync_interval_s=float(os.getenv("CALENDAR_SYNC_INTERVAL_S", "60")),
+    )
@@ -0,0 +1,256 @@
+# Record/Replay Cassette Layer for LLM and Tool Calls
+# Description: Wraps the shared chat model and the agent tools so that graph runs can be recorded
+#              to disk once and replayed deterministically later (optionally with the original
+#              timing), making graph-level benchmarks repeatable on an offline machine.
+#
+# Enable through the environment before starting any entry point:
+#   EVA_CASSETTE_MODE=record EVA_CASSETTE_PATH=cassettes/bench.jsonl python example_batch_runner.py ...
+#   EVA_CASSETTE_MODE=replay EVA_CASSETTE_PATH=cassettes/bench.jsonl EVA_CASSETTE_TIMING=original python ...
+
+# -- Imports -- #
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, tzinfo
+from typing import Any, Dict, List, Optional, Type
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableBinding, RunnableSequence
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ConfigDict
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMissError(KeyError):
+    pass
+
+
+# --- Cassette Storage --- #
+class Cassette:
+    def __init__(self, path: str, mode: str, timing: str = "none", timing_scale: float = 1.0):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {CASSETTE_MODES}.")
+        self.path = path
+        self.mode = mode
+        # "none" replays instantly; "original" sleeps for the recorded latency (times timing_scale)
+        self.timing = timing
+        self.timing_scale = timing_scale
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = asyncio.Lock()
+
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette file not found for replay: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        print(f"📼 Loaded {sum(len(v) for v in self._entries.values())} cassette entries from {self.path}")
+
+    @staticmethod
+    def make_key(kind: str, name: str, request: Any) -> str:
+        payload = json.dumps({"kind": kind, "name": name, "request": request}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def record(self, key: str, kind: str, name: str, request: Any, response: Any, latency_ms: float) -> None:
+        entry = {
+            "key": key, "kind": kind, "name": name,
+            "request": request, "response": response, "latency_ms": round(latency_ms, 2)
+        }
+        async with self._lock:
+            # Appended per interaction so a crashed recording keeps everything captured so far
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    async def replay(self, key: str, name: str) -> Any:
+        entries = self._entries.get(key)
+        if not entries:
+            raise CassetteMissError(f"No cassette entry recorded for '{name}' (key {key[:12]}).")
+        # Identical requests are served in recorded order; the last one repeats once exhausted
+        index = min(self._cursor[key], len(entries) - 1)
+        self._cursor[key] += 1
+        entry = entries[index]
+        if self.timing == "original" and entry.get("latency_ms"):
+            await asyncio.sleep(entry["latency_ms"] * self.timing_scale / 1000)
+        return entry["response"]
+
+    async def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        # Clock reads that end up in prompts ("Today is ...") are recorded like any other interaction,
+        # so a replay on another day builds the same prompts and hits the same keys
+        key = self.make_key("clock", "now", None)
+        if self.mode == "replay":
+            try:
+                return datetime.fromisoformat(await self.replay(key, "clock")).astimezone(tz)
+            except CassetteMissError:
+                # Cassettes recorded before clock entries existed only replay on the day they were made
+                return datetime.now(tz)
+        current = datetime.now(tz)
+        await self.record(key, "clock", "now", None, current.isoformat(), 0.0)
+        return current
+
+
+def _message_fingerprint(message: BaseMessage) -> Dict[str, Any]:
+    # Only the parts that determine the model's answer; ids and provider metadata vary per run
+    return {
+        "type": message.type,
+        "content": message.content,
+        "tool_calls": [
+            {"name": tc["name"], "args": tc["args"], "id": tc.get("id")}
+            for tc in getattr(message, "tool_calls", None) or []
+        ],
+        "tool_call_id": getattr(message, "tool_call_id", None),
+    }
+
+
+def _response_format_fingerprint(response_format: Any) -> Any:
+    # ChatOpenAI's json_schema structured output passes the Pydantic class itself
+    if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+        return {"name": response_format.__name__, "schema": response_format.model_json_schema()}
+    return response_format
+
+
+def _recordable_message(message: BaseMessage) -> BaseMessage:
+    # Structured output arrives as a parsed Pydantic object; store it as a dict, which the
+    # provider's output parser accepts on replay
+    parsed = message.additional_kwargs.get("parsed")
+    if isinstance(parsed, BaseModel):
+        return message.model_copy(update={"additional_kwargs": {**message.additional_kwargs, "parsed": parsed.model_dump()}})
+    return message
+
+
+def forward_structured_output(wrapper: BaseChatModel, inner: BaseChatModel, schema: Any, **kwargs: Any):
+    # Let the real model pick its structured-output method (json_schema for ChatOpenAI) and parser,
+    # then rebind its request kwargs onto the wrapper so the calls still go through the wrapper
+    structured = inner.with_structured_output(schema, **kwargs)
+    steps = getattr(structured, "steps", None)
+    if kwargs.get("include_raw") or not steps or not isinstance(steps[0], RunnableBinding):
+        return BaseChatModel.with_structured_output(wrapper, schema, **kwargs)
+    bound = wrapper.bind(**steps[0].kwargs)
+    return RunnableSequence(bound, *steps[1:]) if len(steps) > 1 else bound
+
+
+# --- Chat Model Wrapper --- #
+class CassetteChatModel(BaseChatModel):
+    inner: BaseChatModel
+    cassette: Any
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cassette-{self.inner._llm_type}"
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any):
+        # Let the real model normalise tool schemas and tool_choice for its provider
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def with_structured_output(self, schema: Any, **kwargs: Any):
+        # Recorded requests must match what the real model sends in production
+        return forward_structured_output(self, self.inner, schema, **kwargs)
+
+    def _request(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": getattr(self.inner, "model_name", None),
+            "messages": [_message_fingerprint(m) for m in messages],
+            "stop": stop,
+            "tools": kwargs.get("tools"),
+            "tool_choice": kwargs.get("tool_choice"),
+            "response_format": _response_format_fingerprint(kwargs.get("response_format")),
+        }
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        kwargs.pop("ls_structured_output_format", None)
+        request = self._request(messages, stop, kwargs)
+        key = Cassette.make_key("llm", self._llm_type, request)
+
+        if self.cassette.mode == "replay":
+            response = await self.cassette.replay(key, "llm")
+            generations = [
+                ChatGeneration(message=message)
+                for message in messages_from_dict(response["messages"])
+            ]
+            return ChatResult(generations=generations, llm_output=response.get("llm_output"))
+
+        start = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        response = {
+            "messages": messages_to_dict([_recordable_message(g.message) for g in result.generations]),
+            "llm_output": result.llm_output,
+        }
+        await self.cassette.record(key, "llm", self._llm_type, request, response, latency_ms)
+        return result
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # The graph is fully async; sync callers get the same behaviour on a private loop
+        return asyncio.run(self._agenerate(messages, stop=stop, **kwargs))
+
+
+# --- Tool Wrapper --- #
+class CassetteTool(BaseTool):
+    inner: BaseTool
+    cassette: Any
+    args_schema: Optional[Type[BaseModel]] = None
+    response_template: Optional[str] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def __init__(self, inner: BaseTool, cassette: Cassette):
+        # Same name, description and schema, so bound tool definitions (and cassette keys) match; the
+        # fast-path flags are carried over so recorded runs skip the same synthesis calls
+        super().__init__(
+            name=inner.name, description=inner.description, args_schema=inner.args_schema,
+            return_direct=inner.return_direct, response_template=getattr(inner, "response_template", None),
+            inner=inner, cassette=cassette
+        )
+
+    def _run(self, **kwargs: Any) -> Any:
+        return asyncio.run(self._arun(**kwargs))
+
+    async def _arun(self, **kwargs: Any) -> Any:
+        key = Cassette.make_key("tool", self.name, kwargs)
+        if self.cassette.mode == "replay":
+            return await self.cassette.replay(key, self.name)
+
+        start = time.perf_counter()
+        output = await self.inner.ainvoke(kwargs)
+        latency_ms = (time.perf_counter() - start) * 1000
+        await self.cassette.record(key, "tool", self.name, kwargs, output, latency_ms)
+        return output
+
+
+def wrap_dev_tools(dev_tools: Dict[str, BaseTool], cassette: Cassette) -> Dict[str, BaseTool]:
+    return {agent_name: CassetteTool(tool, cassette) for agent_name, tool in dev_tools.items()}
+
+
+def wrap_tools(tools: List[Optional[BaseTool]], cassette: Cassette) -> List[Optional[BaseTool]]:
+    # For the optional per-agent tools (calendar, GitHub, HubSpot, web search); absent ones stay None
+    return [CassetteTool(tool, cassette) if tool is not None else None for tool in tools]
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    mode = os.getenv("EVA_CASSETTE_MODE", "").strip().lower()
+    if not mode or mode == "off":
+        return None
+    return Cassette(
+        path=os.getenv("EVA_CASSETTE_PATH", "cassettes/eva_cassette.jsonl"),
+        mode=mode,
+        timing=os.getenv("EVA_CASSETTE_TIMING", "none"),
+        timing_scale=float(os.getenv("EVA_CASSETTE_TIMING_SCALE", "1.0")),
+    )
@@ -0,0 +1,391 @@
+# Knowledge Graph Backend for the CKB Agent
+# Description: Entity/relation extraction during CKB ingestion, a graph store interface with an
+#              in-process implementation (tests, local runs) and a Neo4j implementation, and a
+#              query path that answers relation-style questions ("which services depend on X?")
+#              with indexed graph traversals instead of LLM round trips.
+#
+# Usage:
+#   python example_ckb_graph.py ingest docs/ --output data/ckb_graph.json
+#   python example_ckb_graph.py query "which services depend on the auth gateway?"
+#   Enable in the ckb_agent with CKB_GRAPH_BACKEND=memory (CKB_GRAPH_PATH) or neo4j (NEO4J_URI, ...).
+
+# -- Imports -- #
+import argparse
+import asyncio
+import difflib
+import json
+import os
+import re
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+EXTRACTION_PROMPT = (
+    "Extract a knowledge graph from the document excerpt. List the named entities (services, components, "
+    "systems, teams, people, products, documents) and the relations between them as subject-relation-object "
+    "triples. Use short UPPER_SNAKE_CASE relation names such as DEPENDS_ON, OWNS, USES, CALLS, PART_OF, "
+    "MAINTAINED_BY, DEPLOYED_ON. Use the entity names exactly as they appear in the text. "
+    "Only include relations that the text states explicitly."
+)
+
+
+# --- Extraction Models --- #
+class Triple(BaseModel):
+    subject: str = Field(..., description="Source entity name.")
+    relation: str = Field(..., description="Relation name in UPPER_SNAKE_CASE, e.g. DEPENDS_ON.")
+    object: str = Field(..., description="Target entity name.")
+
+
+class ExtractedGraph(BaseModel):
+    entities: List[str] = Field(default_factory=list, description="Entity names mentioned in the excerpt.")
+    relations: List[Triple] = Field(default_factory=list, description="Relations stated in the excerpt.")
+
+
+def normalize_entity(name: str) -> str:
+    name = re.sub(r"\s+", " ", name.strip().strip("`'\"?.!,").lower())
+    return re.sub(r"^(the|a|an) ", "", name)
+
+
+def normalize_relation(relation: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", "_", relation.strip().upper()).strip("_")
+
+
+# --- Graph Stores --- #
+class GraphStore:
+    async def upsert(self, entities: List[str], relations: List[Tuple[str, str, str]]) -> None:
+        raise NotImplementedError
+
+    async def resolve_entity(self, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def traverse(self, start: str, relation: str, direction: str = "out", max_depth: int = 1) -> List[List[str]]:
+        # Returns one path (start, ..., node) per reachable node, shortest first
+        raise NotImplementedError
+
+    def display_name(self, key: str) -> str:
+        return key
+
+    async def warm_up(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryGraphStore(GraphStore):
+    def __init__(self):
+        self.entities: Dict[str, str] = {}  # normalized -> display name
+        # (node, relation) -> neighbours, one index per direction, so each hop is a dict lookup
+        self._out: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._in: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+
+    async def upsert(self, entities: List[str], relations: List[Tuple[str, str, str]]) -> None:
+        for entity in entities:
+            self.entities.setdefault(normalize_entity(entity), entity.strip())
+        for subject, relation, obj in relations:
+            s, r, o = normalize_entity(subject), normalize_relation(relation), normalize_entity(obj)
+            if not s or not r or not o:
+                continue
+            self.entities.setdefault(s, subject.strip())
+            self.entities.setdefault(o, obj.strip())
+            self._out[(s, r)].add(o)
+            self._in[(o, r)].add(s)
+
+    async def resolve_entity(self, name: str) -> Optional[str]:
+        key = normalize_entity(name)
+        if key in self.entities:
+            return key
+        # Tolerate small wording differences ("auth gateway" vs "auth-gateway")
+        matches = difflib.get_close_matches(key, list(self.entities), n=1, cutoff=0.8)
+        return matches[0] if matches else None
+
+    async def traverse(self, start: str, relation: str, direction: str = "out", max_depth: int = 1) -> List[List[str]]:
+        index = self._out if direction == "out" else self._in
+        relation = normalize_relation(relation)
+        paths: List[List[str]] = []
+        visited = {start}
+        queue = deque([[start]])
+        while queue:
+            path = queue.popleft()
+            if len(path) > max_depth:
+                continue
+            for neighbour in sorted(index.get((path[-1], relation), ())):
+                if neighbour in visited:
+                    continue
+                visited.add(neighbour)
+                paths.append(path + [neighbour])
+                queue.append(path + [neighbour])
+        return paths
+
+    def display_name(self, key: str) -> str:
+        return self.entities.get(key, key)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        relations = [[s, r, o] for (s, r), objects in self._out.items() for o in sorted(objects)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"entities": self.entities, "relations": relations}, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "InMemoryGraphStore":
+        store = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        store.entities.update(data.get("entities", {}))
+        for s, r, o in data.get("relations", []):
+            store._out[(s, r)].add(o)
+            store._in[(o, r)].add(s)
+        return store
+
+
+class Neo4jGraphStore(GraphStore):
+    def __init__(self, uri: str, user: str, password: str, database: Optional[str] = None):
+        try:
+            from neo4j import AsyncGraphDatabase
+        except ImportError as e:
+            raise ImportError("Neo4jGraphStore requires the neo4j driver (pip install neo4j).") from e
+        self._driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+        self._database = database
+        self._schema_ready = False
+
+    async def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        # The uniqueness constraint doubles as the index that makes start-node lookups O(log n)
+        await self._driver.execute_query(
+            "CREATE CONSTRAINT ckb_entity_key IF NOT EXISTS FOR (e:CkbEntity) REQUIRE e.key IS UNIQUE",
+            database_=self._database,
+        )
+        self._schema_ready = True
+
+    async def upsert(self, entities: List[str], relations: List[Tuple[str, str, str]]) -> None:
+        await self._ensure_schema()
+        entity_rows = [{"key": normalize_entity(e), "name": e.strip()} for e in entities if normalize_entity(e)]
+        relation_rows = [
+            {"s": normalize_entity(s), "sn": s.strip(), "r": normalize_relation(r), "o": normalize_entity(o), "on": o.strip()}
+            for s, r, o in relations
+            if normalize_entity(s) and normalize_relation(r) and normalize_entity(o)
+        ]
+        if entity_rows:
+            await self._driver.execute_query(
+                "UNWIND $rows AS row MERGE (e:CkbEntity {key: row.key}) ON CREATE SET e.name = row.name",
+                rows=entity_rows, database_=self._database,
+            )
+        if relation_rows:
+            # Relation types cannot be Cypher parameters, so they are stored as a property
+            await self._driver.execute_query(
+                "UNWIND $rows AS row "
+                "MERGE (a:CkbEntity {key: row.s}) ON CREATE SET a.name = row.sn "
+                "MERGE (b:CkbEntity {key: row.o}) ON CREATE SET b.name = row.on "
+                "MERGE (a)-[:CKB_REL {type: row.r}]->(b)",
+                rows=relation_rows, database_=self._database,
+            )
+
+    async def resolve_entity(self, name: str) -> Optional[str]:
+        await self._ensure_schema()
+        records, _, _ = await self._driver.execute_query(
+            "MATCH (e:CkbEntity {key: $key}) RETURN e.key AS key", key=normalize_entity(name), database_=self._database,
+        )
+        return records[0]["key"] if records else None
+
+    async def traverse(self, start: str, relation: str, direction: str = "out", max_depth: int = 1) -> List[List[str]]:
+        max_depth = max(1, int(max_depth))
+        arrow = "-[rels:CKB_REL*1..%d]->" % max_depth if direction == "out" else "<-[rels:CKB_REL*1..%d]-" % max_depth
+        records, _, _ = await self._driver.execute_query(
+            f"MATCH p = (s:CkbEntity {{key: $start}}){arrow}(n:CkbEntity) "
+            "WHERE all(r IN rels WHERE r.type = $relation) AND n <> s "
+            "WITH n, p ORDER BY length(p) "
+            "WITH n, collect(p)[0] AS shortest "
+            "RETURN [x IN nodes(shortest) | x.key] AS path ORDER BY length(shortest), n.key",
+            start=start, relation=normalize_relation(relation), database_=self._database,
+        )
+        return [record["path"] for record in records]
+
+    async def warm_up(self) -> None:
+        await self._driver.verify_connectivity()
+        await self._ensure_schema()
+
+    async def close(self) -> None:
+        await self._driver.close()
+
+
+# --- Ingestion --- #
+def chunk_text(text: str, max_chars: int = 4000, overlap: int = 200) -> List[str]:
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    chunks, current = [], ""
+    for paragraph in paragraphs:
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = current[-overlap:]
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def extract_graph(llm: Any, text: str) -> ExtractedGraph:
+    extractor = llm.with_structured_output(ExtractedGraph)
+    return await extractor.ainvoke([SystemMessage(content=EXTRACTION_PROMPT), HumanMessage(content=text)])
+
+
+async def ingest_documents(llm: Any, store: GraphStore, documents: Dict[str, str], concurrency: int = 4) -> Dict[str, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"chunks": 0, "entities": 0, "relations": 0, "failed_chunks": 0}
+
+    async def process(source: str, chunk: str) -> None:
+        async with semaphore:
+            try:
+                extracted = await extract_graph(llm, chunk)
+            except Exception as e:
+                print(f"⚠️ Extraction failed for a chunk of {source}: {e}")
+                counts["failed_chunks"] += 1
+                return
+        await store.upsert(extracted.entities, [(t.subject, t.relation, t.object) for t in extracted.relations])
+        counts["chunks"] += 1
+        counts["entities"] += len(extracted.entities)
+        counts["relations"] += len(extracted.relations)
+
+    await asyncio.gather(*[
+        process(source, chunk) for source, text in documents.items() for chunk in chunk_text(text)
+    ])
+    return counts
+
+
+def read_documents(directory: str, extensions: Tuple[str, ...] = (".md", ".txt", ".rst")) -> Dict[str, str]:
+    documents = {}
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.lower().endswith(extensions):
+                path = os.path.join(root, filename)
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    documents[path] = f.read()
+    return documents
+
+
+# --- Relation Question Answering --- #
+# (pattern, relation, direction): "in" finds who points at the entity, "out" what it points at
+RELATION_QUESTION_PATTERNS = [
+    (r"^(?:which|what) (?:\w+ )?(?:depend|depends|rely|relies) on (?P<entity>.+)$", "DEPENDS_ON", "in"),
+    (r"^what (?:does|do) (?P<entity>.+?) (?:depend|rely) on$", "DEPENDS_ON", "out"),
+    (r"^(?:what are the |list the )?dependencies of (?P<entity>.+)$", "DEPENDS_ON", "out"),
+    (r"^(?:which|what) (?:\w+ )?(?:uses|use|calls|call) (?P<entity>.+)$", "USES", "in"),
+    (r"^what (?:does|do) (?P<entity>.+?) (?:use|call)$", "USES", "out"),
+    (r"^who (?:owns|maintains) (?P<entity>.+)$", "OWNS", "in"),
+    (r"^what (?:does|do) (?P<entity>.+?) own$", "OWNS", "out"),
+    (r"^what is (?P<entity>.+?) (?:a )?part of$", "PART_OF", "out"),
+    (r"^what (?:is part of|are the components of|makes up) (?P<entity>.+)$", "PART_OF", "in"),
+]
+RELATION_HEADINGS = {
+    ("DEPENDS_ON", "in"): "Depends on {entity}",
+    ("DEPENDS_ON", "out"): "{entity} depends on",
+    ("USES", "in"): "Uses {entity}",
+    ("USES", "out"): "{entity} uses",
+    ("OWNS", "in"): "Owner of {entity}",
+    ("OWNS", "out"): "Owned by {entity}",
+    ("PART_OF", "in"): "Parts of {entity}",
+    ("PART_OF", "out"): "{entity} is part of",
+}
+TRANSITIVE_HINT = re.compile(r"\b(transitively|indirectly|ultimately|all the way|downstream|upstream|recursively)\b")
+TRANSITIVE_DEPTH = 5
+
+
+def parse_relation_question(query: str) -> Optional[Tuple[str, str, str, int]]:
+    text = query.strip().lower().rstrip("?.! ")
+    depth = TRANSITIVE_DEPTH if TRANSITIVE_HINT.search(text) else 1
+    text = TRANSITIVE_HINT.sub("", text)
+    text = re.sub(r"\s+", " ", re.sub(r"^(according to (?:our|the) [\w ]+?, |in our [\w ]+?, )", "", text)).strip()
+    for pattern, relation, direction in RELATION_QUESTION_PATTERNS:
+        match = re.match(pattern, text)
+        if match:
+            entity = re.sub(r"\s+(in|from) (?:our|the) [\w ]+$", "", match.group("entity")).strip()
+            return entity, relation, direction, depth
+    return None
+
+
+class CKBGraphQA:
+    def __init__(self, store: GraphStore):
+        self.store = store
+
+    async def answer(self, query: str) -> Optional[str]:
+        # Returns None when the question is not relational or the entity is unknown,
+        # so the caller can fall back to the regular LLM path
+        parsed = parse_relation_question(query)
+        if not parsed:
+            return None
+        entity, relation, direction, depth = parsed
+        start = await self.store.resolve_entity(entity)
+        if start is None:
+            return None
+        paths = await self.store.traverse(start, relation, direction, depth)
+        return self._format(start, relation, direction, paths)
+
+    def _format(self, start: str, relation: str, direction: str, paths: List[List[str]]) -> str:
+        subject = self.store.display_name(start)
+        template = RELATION_HEADINGS.get((relation, direction), "{entity} " + relation.lower().replace("_", " ") + " (" + direction + ")")
+        heading = template.format(entity=subject)
+        if not paths:
+            return f"{heading}: none found in the knowledge graph."
+        lines = []
+        for path in paths:
+            name = self.store.display_name(path[-1])
+            if len(path) > 2:
+                via = " -> ".join(self.store.display_name(p) for p in path[1:-1])
+                lines.append(f"- {name} (via {via})")
+            else:
+                lines.append(f"- {name}")
+        return f"{heading} (from the knowledge graph):\n" + "\n".join(lines)
+
+
+def graph_store_from_env() -> Optional[GraphStore]:
+    backend = os.getenv("CKB_GRAPH_BACKEND", "off").strip().lower()
+    if backend in ("", "off"):
+        return None
+    if backend == "memory":
+        path = os.getenv("CKB_GRAPH_PATH", "data/ckb_graph.json")
+        return InMemoryGraphStore.load(path) if os.path.exists(path) else InMemoryGraphStore()
+    if backend == "neo4j":
+        return Neo4jGraphStore(
+            os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+            os.getenv("NEO4J_USERNAME", "neo4j"),
+            os.getenv("NEO4J_PASSWORD", ""),
+            os.getenv("NEO4J_DATABASE") or None,
+        )
+    raise ValueError(f"Unknown CKB_GRAPH_BACKEND '{backend}', expected off, memory or neo4j.")
+
+
+# --- CLI --- #
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Build and query the CKB knowledge graph.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="Extract entities/relations from a directory of documents.")
+    ingest.add_argument("directory")
+    ingest.add_argument("--output", default=os.getenv("CKB_GRAPH_PATH", "data/ckb_graph.json"))
+    ingest.add_argument("--concurrency", type=int, default=4)
+    query = subparsers.add_parser("query", help="Answer a relation-style question from the graph.")
+    query.add_argument("question")
+    args = parser.parse_args()
+
+    store = graph_store_from_env()
+    if store is None:
+        graph_path = args.output if args.command == "ingest" else os.getenv("CKB_GRAPH_PATH", "data/ckb_graph.json")
+        store = InMemoryGraphStore.load(graph_path) if args.command == "query" and os.path.exists(graph_path) else InMemoryGraphStore()
+    try:
+        if args.command == "ingest":
+            from example_main_and_agents import llm
+            counts = await ingest_documents(llm, store, read_documents(args.directory), args.concurrency)
+            if isinstance(store, InMemoryGraphStore):
+                store.save(args.output)
+            print(f"📚 Ingestion finished: {counts}")
+        else:
+            answer = await CKBGraphQA(store).answer(args.question)
+            print(answer or "🤷 Not a relation-style question, or the entity is not in the graph.")
+    finally:
+        await store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+# Context Packing with Per-Agent Token Budgets
+# Description: Measures and bounds every prompt the agents send. Before each LLM call the message
+#              list is split into system, history, tools and query tokens (tiktoken), then packed:
+#              - oversized ToolMessages are reduced to the lines most relevant to the user query
+#                (term overlap), kept in their original order with omission markers
+#              - if the prompt is still over the agent's budget, the oldest history is dropped and
+#                tool outputs are shrunk further to share what is left
+#              Each call's token breakdown is printed and can be appended to a JSONL log for
+#              capacity planning; report() aggregates it per agent.
+#
+# Enable with EVA_CONTEXT_PACKING=on (pack and log) or log (measure only); off disables both.
+
+# -- Imports -- #
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from example_tokens import MESSAGE_OVERHEAD_TOKENS, count_tokens, truncate_to_tokens
+from example_web_search import STOPWORDS, split_passages
+
+# Floor for a single tool output when several have to share a tight budget
+MIN_TOOL_TOKENS = 64
+OMISSION_MARKER = "[... {lines} lines omitted ...]"
+
+
+def parse_agent_budgets(spec: str) -> Dict[str, int]:
+    # "web_search_agent=8000,therapist_agent=3000"
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            agent, tokens = item.split("=", 1)
+            budgets[agent.strip()] = int(tokens)
+    return budgets
+
+
+def _query_terms(text: str) -> set:
+    return {t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 2 and t not in STOPWORDS}
+
+
+def _message_tokens(message: BaseMessage) -> int:
+    tokens = count_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += count_tokens(json.dumps([{"name": c["name"], "args": c["args"]} for c in message.tool_calls]))
+    return tokens
+
+
+def compress_text(text: str, query: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    chunks = []
+    for line in text.splitlines():
+        if line.strip():
+            chunks.extend(split_passages(line) if len(line) > 600 else [line])
+    terms = _query_terms(query)
+    # Most relevant chunks first; without any overlap this degrades to keeping the head
+    ranked = sorted(range(len(chunks)), key=lambda i: (-len(terms & _query_terms(chunks[i])), i))
+    # Omission markers and newlines count against the budget too: keeping a chunk in the middle of
+    # an omitted run splits it into two markers, keeping the last chunk of a run removes one
+    marker_tokens = count_tokens(OMISSION_MARKER.format(lines=len(chunks))) + 1
+    keep, used = set(), marker_tokens
+    for i in ranked:
+        left, right = i > 0 and i - 1 not in keep, i + 1 < len(chunks) and i + 1 not in keep
+        tokens = count_tokens(chunks[i]) + 1 + marker_tokens * ((left and right) - (not left and not right))
+        if used + tokens > max_tokens:
+            continue
+        keep.add(i)
+        used += tokens
+    # Tokens can still merge differently across the joins: drop the least relevant chunks until the
+    # rendered text really fits
+    kept = [i for i in ranked if i in keep]
+    while kept:
+        compressed = _render_kept(chunks, set(kept))
+        if count_tokens(compressed) <= max_tokens:
+            return compressed
+        kept.pop()
+    marker = "\n" + OMISSION_MARKER.format(lines=max(len(chunks) - 1, 1))
+    head = chunks[ranked[0]] if chunks else text
+    return truncate_to_tokens(head, max(max_tokens - count_tokens(marker), 0)) + marker
+
+
+def _render_kept(chunks: List[str], keep: set) -> str:
+    lines, skipped = [], 0
+    for i, chunk in enumerate(chunks):
+        if i in keep:
+            if skipped:
+                lines.append(OMISSION_MARKER.format(lines=skipped))
+                skipped = 0
+            lines.append(chunk)
+        else:
+            skipped += 1
+    if skipped:
+        lines.append(OMISSION_MARKER.format(lines=skipped))
+    return "\n".join(lines)
+
+
+class ContextPacker:
+    def __init__(
+        self, default_budget: int = 6000, agent_budgets: Optional[Dict[str, int]] = None,
+        tool_output_max_tokens: int = 1500, enforce: bool = True, log_path: Optional[str] = None
+    ):
+        self.default_budget = default_budget
+        self.agent_budgets = agent_budgets or {}
+        self.tool_output_max_tokens = tool_output_max_tokens
+        self.enforce = enforce
+        self.log_path = log_path
+        self._calls: Dict[str, List[Dict[str, Any]]] = {}
+
+    def budget_for(self, agent_name: str) -> int:
+        return self.agent_budgets.get(agent_name, self.default_budget)
+
+    def _breakdown(self, messages: List[BaseMessage]) -> Dict[str, int]:
+        query_index = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=len(messages))
+        breakdown = {"system": 0, "history": 0, "tools": 0, "query": 0}
+        for i, message in enumerate(messages):
+            if isinstance(message, SystemMessage):
+                category = "system"
+            elif i < query_index:
+                category = "history"
+            elif i == query_index:
+                category = "query"
+            else:
+                category = "tools"
+            breakdown[category] += _message_tokens(message)
+        breakdown["total"] = sum(breakdown.values())
+        return breakdown
+
+    def _shrink_tools(self, messages: List[BaseMessage], query: str, max_tokens: int) -> List[BaseMessage]:
+        return [
+            m.model_copy(update={"content": compress_text(str(m.content), query, max_tokens)})
+            if isinstance(m, ToolMessage) and count_tokens(str(m.content)) > max_tokens else m
+            for m in messages
+        ]
+
+    def pack(self, agent_name: str, stage: str, messages: List[BaseMessage], query: str) -> List[BaseMessage]:
+        before = self._breakdown(messages)
+        budget = self.budget_for(agent_name)
+        packed, history_dropped = list(messages), 0
+        if self.enforce:
+            packed = self._shrink_tools(packed, query, self.tool_output_max_tokens)
+            while self._breakdown(packed)["total"] > budget:
+                # Oldest history first; a dropped tool call takes its orphaned ToolMessages with it
+                first = next((i for i, m in enumerate(packed) if not isinstance(m, SystemMessage)), None)
+                if first is None or self._breakdown(packed)["history"] == 0:
+                    break
+                packed.pop(first)
+                history_dropped += 1
+                while first < len(packed) and isinstance(packed[first], ToolMessage):
+                    packed.pop(first)
+                    history_dropped += 1
+            # Shrink tool outputs to share what is left, until the prompt fits or they are at the floor
+            while True:
+                tool_messages = [m for m in packed if isinstance(m, ToolMessage)]
+                overflow = self._breakdown(packed)["total"] - budget
+                if overflow <= 0 or not tool_messages:
+                    break
+                tool_tokens = sum(count_tokens(str(m.content)) for m in tool_messages)
+                share = max(MIN_TOOL_TOKENS, (tool_tokens - overflow) // len(tool_messages))
+                if all(count_tokens(str(m.content)) <= share for m in tool_messages):
+                    break
+                packed = self._shrink_tools(packed, query, share)
+
+        after = self._breakdown(packed)
+        record = {
+            "agent": agent_name, "stage": stage, **after, "budget": budget,
+            "tokens_before": before["total"], "history_dropped": history_dropped,
+        }
+        self._calls.setdefault(agent_name, []).append(record)
+        saved = f" (packed from {before['total']})" if before["total"] != after["total"] else ""
+        print(
+            f"📏 {agent_name}.{stage} tokens: system={after['system']} history={after['history']} "
+            f"tools={after['tools']} query={after['query']} total={after['total']}/{budget}{saved}"
+        )
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return packed
+
+    def report(self) -> Dict[str, Any]:
+        per_agent = {}
+        for agent, records in sorted(self._calls.items()):
+            totals = sorted(r["total"] for r in records)
+            per_agent[agent] = {
+                "calls": len(records),
+                **{f"avg_{k}": round(sum(r[k] for r in records) / len(records), 1) for k in ("system", "history", "tools", "query", "total")},
+                "p95_total": totals[min(len(totals) - 1, int(len(totals) * 0.95))],
+                "max_total": totals[-1],
+                "budget": self.budget_for(agent),
+                "tokens_packed_away": sum(r["tokens_before"] - r["total"] for r in records),
+            }
+        return {"enforce": self.enforce, "per_agent": per_agent}
+
+
+def context_packer_from_env() -> Optional[ContextPacker]:
+    mode = os.getenv("EVA_CONTEXT_PACKING", "on").strip().lower()
+    if mode in ("off", "false", "0"):
+        return None
+    return ContextPacker(
+        default_budget=int(os.getenv("EVA_CONTEXT_BUDGET_TOKENS", "6000")),
+        agent_budgets=parse_agent_budgets(os.getenv("EVA_CONTEXT_AGENT_BUDGETS", "")),
+        tool_output_max_tokens=int(os.getenv("EVA_TOOL_OUTPUT_MAX_TOKENS", "1500")),
+        enforce=mode != "log",
+        log_path=os.getenv("EVA_TOKEN_LOG_PATH") or None,
+    )
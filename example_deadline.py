@@ -0,0 +1,138 @@
+# Per-Request Deadlines for the EVA Graph
+# Description: A deadline budget set once per request and propagated (via a context variable)
+#              through the orchestrator, specialist LLM calls and tool calls. Every stage only
+#              gets the time that is left; on expiry outstanding work is cancelled and the graph
+#              returns a degraded but timely response, with per-stage timings for diagnosis.
+
+# -- Imports -- #
+import asyncio
+import contextvars
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from example_profiling import span
+
+current_deadline: contextvars.ContextVar[Optional["RequestDeadline"]] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+# Extra time a whole node gets over its inner stages before it is cut off
+NODE_GRACE_S = 0.05
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during '{stage}'.")
+        self.stage = stage
+
+
+class RequestDeadline:
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.started_at = time.perf_counter()
+        self.expires_at = self.started_at + budget_s
+        self.stage_ms: Dict[str, float] = {}
+        self.expired_stage: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.perf_counter())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "budget_s": self.budget_s,
+            "elapsed_s": round(time.perf_counter() - self.started_at, 3),
+            "expired": self.expired_stage is not None,
+            "expired_stage": self.expired_stage,
+            "stage_ms": {stage: round(ms, 2) for stage, ms in self.stage_ms.items()},
+        }
+
+
+async def run_stage(stage: str, awaitable: Awaitable[Any], grace_s: float = 0.0) -> Any:
+    with span(stage):
+        return await _run_stage(stage, awaitable, grace_s)
+
+
+async def _run_stage(stage: str, awaitable: Awaitable[Any], grace_s: float) -> Any:
+    # Bounds one stage by whatever budget is left; without an active deadline it is a plain await
+    deadline = current_deadline.get()
+    if deadline is None:
+        return await awaitable
+    start = time.perf_counter()
+    try:
+        if deadline.expired():
+            # Close the never-started coroutine so it does not warn about being unawaited
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            expired_in = stage
+        else:
+            try:
+                return await asyncio.wait_for(awaitable, timeout=deadline.remaining() + grace_s)
+            except asyncio.TimeoutError:
+                expired_in = stage
+        # The first stage to run out is the one that consumed the budget
+        if deadline.expired_stage is None:
+            deadline.expired_stage = expired_in
+        raise DeadlineExceeded(expired_in)
+    finally:
+        deadline.stage_ms[stage] = deadline.stage_ms.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def with_deadline(
+    node_fn: Callable[[Any], Awaitable[Dict[str, Any]]],
+    stage: str,
+    fallback: Callable[[Any, str], Dict[str, Any]],
+) -> Callable[[Any], Awaitable[Dict[str, Any]]]:
+    # Wraps a graph node so it runs within the remaining budget and degrades instead of hanging
+    @wraps(node_fn)
+    async def wrapped(state: Any) -> Dict[str, Any]:
+        with span(stage):
+            return await _run_node(state)
+
+    async def _run_node(state: Any) -> Dict[str, Any]:
+        deadline = current_deadline.get()
+        if deadline is None:
+            return await node_fn(state)
+        try:
+            # A little grace lets the node's inner LLM/tool stage expire first, so it gets the blame
+            result = await run_stage(stage, node_fn(state), grace_s=NODE_GRACE_S)
+        except DeadlineExceeded as e:
+            print(f"⏰ Deadline exceeded in {e.stage}; returning degraded response.")
+            return fallback(state, stage)
+        if deadline.expired_stage is not None and "final_response" in result:
+            # An inner stage ran out of time and the node's own error handling produced the reply
+            print(f"⏰ Deadline exceeded in {deadline.expired_stage}; returning degraded response.")
+            return fallback(state, stage)
+        return result
+
+    return wrapped
+
+
+async def ainvoke_with_deadline(
+    graph: Any,
+    initial_state: Dict[str, Any],
+    budget_s: Optional[float],
+    config: Optional[Dict[str, Any]] = None,
+    grace_s: float = 0.25,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    if not budget_s:
+        return await graph.ainvoke(initial_state, config=config), None
+
+    deadline = RequestDeadline(budget_s)
+    token = current_deadline.set(deadline)
+    try:
+        # Safety net for anything not wrapped in a stage; nodes normally degrade well before this
+        final_state = await asyncio.wait_for(graph.ainvoke(initial_state, config=config), timeout=budget_s + grace_s)
+    except asyncio.TimeoutError:
+        deadline.expired_stage = deadline.expired_stage or "graph"
+        final_state = {
+            **initial_state,
+            "final_response": "Sorry, I couldn't complete your request in time. Please try again.",
+            "final_responder": "deadline",
+        }
+    finally:
+        current_deadline.reset(token)
+    return final_state, deadline.report()
@@ -0,0 +1,310 @@
+# Streaming Email Triage for the email_mgmt_agent
+# Description: Triage thousands of inbound emails without an LLM call per message. Emails are
+#              streamed from a local Maildir directory or mbox file and classified in three tiers:
+#                1. header/keyword rules (bulk mail, no-reply senders, obvious urgency)
+#                2. embedding similarity against category prototypes, accepted only when confident
+#                3. the LLM, for the ambiguous remainder, in concurrent multi-email batches
+#              Results are appended to a JSONL checkpoint, so an interrupted run resumes where it stopped.
+#
+# Usage:
+#   python example_email_triage.py data/inbox.mbox data/triage.jsonl --llm-batch-size 10 --concurrency 4
+#   python example_email_triage.py data/Maildir data/triage.jsonl
+
+# -- Imports -- #
+import argparse
+import asyncio
+import json
+import mailbox
+import os
+import re
+import time
+from collections import Counter
+from email.header import decode_header, make_header
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+import numpy as np
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from example_batch_runner import load_completed_ids
+from example_embeddings import aembed
+from example_main_and_agents import llm, llm_traffic_controller
+from example_rate_limiter import current_priority
+
+TriageCategory = Literal["urgent", "action_required", "fyi", "newsletter", "spam"]
+
+# Short descriptions embedded once and compared against every email
+CATEGORY_PROTOTYPES: Dict[str, str] = {
+    "urgent": "Urgent: production outage, incident, security breach, critical failure, needs immediate attention today.",
+    "action_required": "Please review, approve, sign, reply, schedule a meeting or complete this task by the deadline.",
+    "fyi": "For your information: status update, meeting notes, receipt, confirmation, automated notification.",
+    "newsletter": "Weekly newsletter, digest, product announcements, webinar invitation, unsubscribe from this list.",
+    "spam": "You have won a prize, claim your reward, limited time offer, click here, crypto investment opportunity.",
+}
+URGENT_SUBJECT = re.compile(r"\b(urgent|asap|outage|incident|sev ?[12]|p[01]\b|down|breach)\b", re.IGNORECASE)
+NO_REPLY_SENDER = re.compile(r"\b(no-?reply|do-?not-?reply|notifications?|mailer-daemon)@", re.IGNORECASE)
+BODY_SNIPPET_CHARS = 1200
+
+TRIAGE_PROMPT = (
+    "You triage a busy professional's inbox. For each numbered email, choose one category: "
+    "urgent (needs attention within hours), action_required (the recipient must do something), "
+    "fyi (informational, no action), newsletter (bulk/marketing content), spam (unsolicited or fraudulent). "
+    "Return one decision per email, using the email's number as its index, with a one-line summary."
+)
+
+
+class TriageDecision(BaseModel):
+    index: int = Field(..., description="The number of the email in the batch.")
+    category: TriageCategory = Field(..., description="Triage category.")
+    summary: str = Field("", description="One-line summary of the email.")
+
+
+class TriageBatch(BaseModel):
+    decisions: List[TriageDecision] = Field(default_factory=list, description="One decision per email.")
+
+
+# --- Mailbox Source --- #
+def _decode(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def _plain_text(message: mailbox.Message) -> str:
+    parts = list(message.walk()) if message.is_multipart() else [message]
+    for part in parts:
+        if part.get_content_type() == "text/plain" and not part.get_filename():
+            payload = part.get_payload(decode=True) or b""
+            return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    for part in parts:
+        if part.get_content_type() == "text/html":
+            payload = part.get_payload(decode=True) or b""
+            return re.sub(r"<[^>]+>", " ", payload.decode(part.get_content_charset() or "utf-8", errors="replace"))
+    return ""
+
+
+def parse_email(key: str, message: mailbox.Message) -> Dict[str, Any]:
+    body = re.sub(r"\s+", " ", _plain_text(message)).strip()
+    return {
+        "id": (message.get("Message-ID") or key).strip(),
+        "sender": _decode(message.get("From")),
+        "subject": _decode(message.get("Subject")),
+        "date": message.get("Date"),
+        "body": body[:BODY_SNIPPET_CHARS],
+        "headers": {h: message.get(h) for h in ("List-Unsubscribe", "Precedence", "Auto-Submitted", "X-Spam-Flag") if message.get(h)},
+    }
+
+
+def open_mailbox(path: str) -> mailbox.Mailbox:
+    if os.path.isdir(path):
+        return mailbox.Maildir(path, factory=None, create=False)
+    return mailbox.mbox(path, create=False)
+
+
+async def iter_emails(path: str, skip_ids: set, read_chunk: int = 200) -> AsyncIterator[Dict[str, Any]]:
+    # Mailbox parsing is blocking file I/O; read in chunks on a thread so classification keeps running
+    box = open_mailbox(path)
+    keys = iter(box.iterkeys())
+
+    def read_next_chunk() -> List[Dict[str, Any]]:
+        chunk = []
+        for key in keys:
+            try:
+                chunk.append(parse_email(str(key), box.get_message(key)))
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable message {key}: {e}")
+            if len(chunk) >= read_chunk:
+                break
+        return chunk
+
+    while True:
+        chunk = await asyncio.to_thread(read_next_chunk)
+        if not chunk:
+            break
+        for item in chunk:
+            if item["id"] not in skip_ids:
+                yield item
+
+
+# --- Classification Tiers --- #
+def classify_by_rules(item: Dict[str, Any]) -> Optional[str]:
+    headers = item["headers"]
+    if str(headers.get("X-Spam-Flag", "")).upper() == "YES":
+        return "spam"
+    if headers.get("List-Unsubscribe") or str(headers.get("Precedence", "")).lower() in ("bulk", "list"):
+        return "newsletter"
+    if URGENT_SUBJECT.search(item["subject"]):
+        return "urgent"
+    if NO_REPLY_SENDER.search(item["sender"]) or str(headers.get("Auto-Submitted", "no")).lower() != "no":
+        return "fyi"
+    return None
+
+
+class EmbeddingPrefilter:
+    def __init__(self, min_similarity: float = 0.35, min_margin: float = 0.08):
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.categories = list(CATEGORY_PROTOTYPES)
+        self._prototypes: Optional[np.ndarray] = None
+
+    async def classify(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        if self._prototypes is None:
+            self._prototypes = await aembed([CATEGORY_PROTOTYPES[c] for c in self.categories])
+        vectors = await aembed([f"{item['subject']}\n{item['body'][:500]}" for item in items])
+        scores = vectors @ self._prototypes.T
+        results: List[Optional[str]] = []
+        for row in scores:
+            order = np.argsort(-row)
+            best, runner_up = row[order[0]], row[order[1]]
+            # Only confident, clearly separated matches skip the LLM
+            confident = best >= self.min_similarity and best - runner_up >= self.min_margin
+            results.append(self.categories[order[0]] if confident else None)
+        return results
+
+
+async def classify_with_llm(items: List[Dict[str, Any]]) -> Dict[int, TriageDecision]:
+    classifier = llm.with_structured_output(TriageBatch)
+    listing = "\n\n".join(
+        f"[{i}] From: {item['sender']}\nSubject: {item['subject']}\n{item['body'][:600]}" for i, item in enumerate(items)
+    )
+    result = await classifier.ainvoke([SystemMessage(content=TRIAGE_PROMPT), HumanMessage(content=listing)])
+    return {d.index: d for d in result.decisions if 0 <= d.index < len(items)}
+
+
+# --- Pipeline --- #
+class TriageRun:
+    def __init__(self, output_path: str, llm_batch_size: int = 10, concurrency: int = 4, embed_batch_size: int = 64,
+                 prefilter: Optional[EmbeddingPrefilter] = None):
+        self.output_path = output_path
+        self.llm_batch_size = llm_batch_size
+        self.embed_batch_size = embed_batch_size
+        self.prefilter = prefilter or EmbeddingPrefilter()
+        self.concurrency = concurrency
+        self._llm_semaphore = asyncio.Semaphore(concurrency)
+        self._llm_tasks: set = set()
+        self._write_lock = asyncio.Lock()
+        self.tier_counts: Counter = Counter()
+        self.category_counts: Counter = Counter()
+        self.llm_calls = 0
+        self.errors = 0
+
+    async def _write(self, records: List[Dict[str, Any]]) -> None:
+        # Append and flush per batch: this file is the checkpoint used for resuming
+        async with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+        for record in records:
+            self.tier_counts[record["tier"]] += 1
+            if record["status"] == "ok":
+                self.category_counts[record["category"]] += 1
+
+    @staticmethod
+    def _record(item: Dict[str, Any], category: Optional[str], tier: str, summary: str = "", status: str = "ok") -> Dict[str, Any]:
+        return {
+            "id": item["id"], "status": status, "category": category, "tier": tier,
+            "sender": item["sender"], "subject": item["subject"], "date": item["date"], "summary": summary,
+        }
+
+    async def _llm_batch(self, items: List[Dict[str, Any]]) -> None:
+        async with self._llm_semaphore:
+            try:
+                self.llm_calls += 1
+                decisions = await classify_with_llm(items)
+            except Exception as e:
+                print(f"💥 LLM triage batch failed: {e}")
+                self.errors += 1
+                decisions = {}
+        # Emails the LLM skipped are written as errors so a resumed run retries them
+        await self._write([
+            self._record(item, decisions[i].category, "llm", decisions[i].summary) if i in decisions
+            else self._record(item, None, "llm", status="error")
+            for i, item in enumerate(items)
+        ])
+
+    async def _process_chunk(self, chunk: List[Dict[str, Any]], ambiguous: List[Dict[str, Any]]) -> None:
+        records, undecided = [], []
+        for item in chunk:
+            category = classify_by_rules(item)
+            if category:
+                records.append(self._record(item, category, "rules"))
+            else:
+                undecided.append(item)
+        if undecided:
+            for item, category in zip(undecided, await self.prefilter.classify(undecided)):
+                if category:
+                    records.append(self._record(item, category, "embedding"))
+                else:
+                    ambiguous.append(item)
+        await self._write(records)
+        while len(ambiguous) >= self.llm_batch_size:
+            batch, ambiguous[:] = ambiguous[:self.llm_batch_size], ambiguous[self.llm_batch_size:]
+            await self._submit_llm_batch(batch)
+
+    async def _submit_llm_batch(self, batch: List[Dict[str, Any]]) -> None:
+        # Backpressure: stop reading the mailbox while enough LLM batches are already queued
+        while len(self._llm_tasks) >= self.concurrency * 2:
+            _, self._llm_tasks = await asyncio.wait(self._llm_tasks, return_when=asyncio.FIRST_COMPLETED)
+        self._llm_tasks.add(asyncio.ensure_future(self._llm_batch(batch)))
+
+    async def run(self, mailbox_path: str) -> Dict[str, Any]:
+        current_priority.set("batch")
+        skip_ids = load_completed_ids(self.output_path)
+        if skip_ids:
+            print(f"⏩ Resuming: {len(skip_ids)} emails already triaged")
+        start = time.perf_counter()
+        chunk: List[Dict[str, Any]] = []
+        ambiguous: List[Dict[str, Any]] = []
+        async for item in iter_emails(mailbox_path, skip_ids):
+            chunk.append(item)
+            if len(chunk) >= self.embed_batch_size:
+                await self._process_chunk(chunk, ambiguous)
+                chunk = []
+        if chunk:
+            await self._process_chunk(chunk, ambiguous)
+        if ambiguous:
+            await self._submit_llm_batch(ambiguous)
+        await asyncio.gather(*self._llm_tasks)
+        elapsed = time.perf_counter() - start
+
+        processed = sum(self.tier_counts.values())
+        summary = {
+            "processed": processed,
+            "skipped_already_done": len(skip_ids),
+            "elapsed_s": round(elapsed, 2),
+            "emails_per_s": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+            "by_tier": dict(self.tier_counts),
+            "llm_share": round(self.tier_counts["llm"] / processed, 3) if processed else 0.0,
+            "llm_calls": self.llm_calls,
+            "llm_errors": self.errors,
+            "by_category": dict(self.category_counts),
+        }
+        if llm_traffic_controller:
+            summary["llm_limiter"] = llm_traffic_controller.metrics()
+        return summary
+
+
+# --- CLI --- #
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stream-triage a Maildir/mbox through rules, embeddings and the LLM.")
+    parser.add_argument("mailbox", help="Maildir directory or mbox file.")
+    parser.add_argument("output", help="JSONL results file (also the resume checkpoint).")
+    parser.add_argument("--llm-batch-size", type=int, default=10, help="Ambiguous emails per LLM call.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent LLM batches.")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Emails per embedding/rules chunk.")
+    parser.add_argument("--min-similarity", type=float, default=0.35, help="Embedding score needed to skip the LLM.")
+    parser.add_argument("--min-margin", type=float, default=0.08, help="Lead over the runner-up category needed to skip the LLM.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run = TriageRun(
+        args.output, llm_batch_size=args.llm_batch_size, concurrency=args.concurrency,
+        embed_batch_size=args.embed_batch_size, prefilter=EmbeddingPrefilter(args.min_similarity, args.min_margin),
+    )
+    print(f"📧 Triage finished: {json.dumps(asyncio.run(run.run(args.mailbox)), indent=2)}")
@@ -0,0 +1,79 @@
+# Shared Text Embeddings
+# Description: One lazily loaded embedding model shared by every subsystem that needs vectors
+#              (memory recall, email pre-filtering, ...). Uses the pinned sentence-transformers
+#              model named by EMBEDDING_MODEL_NAME, and falls back to a dependency-free hashing
+#              embedder when sentence-transformers is not installed or the model cannot be loaded.
+
+# -- Imports -- #
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+class HashingEmbedder:
+    # Bag-of-words feature hashing: no model download, deterministic, good enough for tests and demos
+    def __init__(self, dimension: int = 384):
+        self.model_name = f"hashing-{dimension}"
+        self.dimension = dimension
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dimension
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, index] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+_embedder: Optional[object] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    global _embedder
+    if _embedder is not None:
+        return _embedder
+    # Loading can happen from worker threads (see aembed); make sure the model loads only once
+    with _embedder_lock:
+        if _embedder is not None:
+            return _embedder
+        model_name = os.getenv("EMBEDDING_MODEL_NAME") or DEFAULT_EMBEDDING_MODEL
+        if model_name.startswith("YOUR_"):
+            model_name = DEFAULT_EMBEDDING_MODEL
+        try:
+            _embedder = SentenceTransformerEmbedder(model_name)
+            print(f"🧬 Loaded embedding model: {model_name}")
+        except ImportError:
+            print("⚠️ sentence-transformers not installed; using hashing embeddings.")
+            _embedder = HashingEmbedder()
+        except (OSError, ValueError) as e:
+            # Offline or failed model download (OSError, incl. HTTP errors) or an unknown model name
+            print(f"⚠️ Could not load embedding model {model_name} ({e}); using hashing embeddings.")
+            _embedder = HashingEmbedder()
+        return _embedder
+
+
+async def aembed(texts: List[str]) -> np.ndarray:
+    # Loading and encoding are CPU-bound; keep both off the event loop
+    return await asyncio.to_thread(lambda: get_embedder().embed(texts))
@@ -0,0 +1,152 @@
+# Local Mock GitHub API
+# Description: A small stand-in for the GitHub REST API's issue listing, with page/per_page
+#              pagination, Link headers, ETags with 304 Not Modified, `state`/`since` filters and
+#              a rate-limit counter, plus a benchmark for the client in example_github_client.py.
+#
+# Usage:
+#   python example_fake_github.py serve --port 8020 --issues 1200
+#   python example_fake_github.py bench --base-url http://localhost:8020 --repo acme/platform
+
+# -- Imports -- #
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+fake_github_app = FastAPI(title="Fake GitHub API")
+ISSUES: Dict[str, List[Dict[str, Any]]] = {}
+counters = {"requests": 0, "not_modified": 0, "rate_limit_remaining": 5000}
+# Simulated network latency per request, so concurrency and caching show up in timings
+LATENCY_S = float(os.getenv("FAKE_GITHUB_LATENCY_S", "0.05"))
+
+
+def seed_repo(repo: str, count: int) -> None:
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    labels = ["bug", "enhancement", "docs", "infra"]
+    ISSUES[repo] = [
+        {
+            "number": n,
+            "title": f"Issue {n} in {repo}",
+            "state": "closed" if n % 4 == 0 else "open",
+            "labels": [{"name": labels[n % len(labels)]}],
+            "assignee": {"login": f"dev{n % 7}"} if n % 3 else None,
+            "updated_at": (base + timedelta(minutes=n)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "html_url": f"https://github.com/{repo}/issues/{n}",
+        }
+        for n in range(1, count + 1)
+    ]
+
+
+@fake_github_app.get("/repos/{owner}/{repo}/issues")
+async def list_issues(owner: str, repo: str, request: Request, state: str = "open", since: Optional[str] = None,
+                      page: int = 1, per_page: int = 30) -> Response:
+    await asyncio.sleep(LATENCY_S)
+    counters["requests"] += 1
+    issues = ISSUES.get(f"{owner}/{repo}", [])
+    if state != "all":
+        issues = [i for i in issues if i["state"] == state]
+    if since:
+        issues = [i for i in issues if i["updated_at"] >= since]
+    issues = sorted(issues, key=lambda i: -i["number"])
+    per_page = min(per_page, 100)
+    last_page = max(1, -(-len(issues) // per_page))
+    body = json.dumps(issues[(page - 1) * per_page: page * per_page])
+    etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+    url = str(request.url).split("?")[0]
+    query = "&".join(f"{k}={v}" for k, v in request.query_params.items() if k != "page")
+    links = []
+    if page < last_page:
+        links.append(f'<{url}?{query}&page={page + 1}>; rel="next"')
+        links.append(f'<{url}?{query}&page={last_page}>; rel="last"')
+    headers = {"ETag": etag, "Link": ", ".join(links)} if links else {"ETag": etag}
+
+    if request.headers.get("If-None-Match") == etag:
+        # Conditional hits do not count against GitHub's rate limit
+        counters["not_modified"] += 1
+        return Response(status_code=304, headers={**headers, "X-RateLimit-Remaining": str(counters["rate_limit_remaining"])})
+    counters["rate_limit_remaining"] -= 1
+    headers["X-RateLimit-Remaining"] = str(counters["rate_limit_remaining"])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@fake_github_app.post("/fake/touch/{owner}/{repo}/{number}")
+async def touch_issue(owner: str, repo: str, number: int, state: str = "closed") -> Dict[str, Any]:
+    for issue in ISSUES.get(f"{owner}/{repo}", []):
+        if issue["number"] == number:
+            issue["state"] = state
+            issue["updated_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            return issue
+    return {}
+
+
+@fake_github_app.get("/fake/stats")
+async def fake_stats() -> Dict[str, Any]:
+    return counters
+
+
+# --- Benchmark --- #
+async def bench(base_url: str, repo: str) -> Dict[str, Any]:
+    from example_github_client import GitHubClient, IssueIndex, ResponseCache
+
+    workdir = tempfile.mkdtemp(prefix="eva_github_bench_")
+    results: Dict[str, Any] = {}
+    try:
+        async def timed(label: str, coro) -> Any:
+            start = time.perf_counter()
+            value = await coro
+            results[label] = {"ms": round((time.perf_counter() - start) * 1000, 1)}
+            return value
+
+        sequential = GitHubClient(base_url=base_url, cache=ResponseCache(os.path.join(workdir, "seq")), max_concurrency=1)
+        items = await timed("cold_sequential_pages", sequential.get_paginated(f"/repos/{repo}/issues", {"state": "open"}))
+        results["cold_sequential_pages"].update(sequential.stats(), items=len(items))
+        await sequential.close()
+
+        client = GitHubClient(base_url=base_url, cache=ResponseCache(os.path.join(workdir, "cache")))
+        await timed("cold_concurrent_pages", client.get_paginated(f"/repos/{repo}/issues", {"state": "open"}))
+        results["cold_concurrent_pages"].update(client.stats())
+        await timed("revalidated_304", client.get_paginated(f"/repos/{repo}/issues", {"state": "open"}))
+        results["revalidated_304"].update(client.stats())
+
+        index = IssueIndex(client, path=os.path.join(workdir, "index.db"), max_age_s=300)
+        await timed("index_first_sync", index.list_issues(repo))
+        issues, _ = await timed("index_fresh_hit", index.list_issues(repo))
+        results["index_fresh_hit"].update(index.stats(), returned=len(issues))
+        await client.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# --- CLI --- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local mock GitHub API and client benchmark.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Run the mock GitHub API.")
+    serve.add_argument("--port", type=int, default=8020)
+    serve.add_argument("--repo", default="acme/platform")
+    serve.add_argument("--issues", type=int, default=1200)
+    run = subparsers.add_parser("bench", help="Benchmark the cached/concurrent client against the mock.")
+    run.add_argument("--base-url", default="http://localhost:8020")
+    run.add_argument("--repo", default="acme/platform")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        seed_repo(args.repo, args.issues)
+        uvicorn.run(fake_github_app, host="127.0.0.1", port=args.port)
+    else:
+        print(json.dumps(asyncio.run(bench(args.base_url, args.repo)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# Local Fake HubSpot API
+# Description: A small stand-in for the HubSpot CRM v3 endpoints used by example_hubspot_sync.py
+#              (object listing with `after` paging, search on the last-modified date, batch create), with a
+#              100-requests-per-10s limit answered by 429s, plus a benchmark comparing remote lookups
+#              with the locally synced store.
+#
+# Usage:
+#   python example_fake_hubspot.py serve --port 8030 --records 2000
+#   python example_fake_hubspot.py bench --base-url http://localhost:8030
+
+# -- Imports -- #
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+fake_hubspot_app = FastAPI(title="Fake HubSpot API")
+OBJECTS: Dict[str, Dict[str, Dict[str, Any]]] = {"contacts": {}, "companies": {}, "deals": {}, "calls": {}}
+counters = {"requests": 0, "rate_limited": 0, "batch_creates": 0, "records_created": 0}
+_request_times: deque = deque()
+LATENCY_S = float(os.getenv("FAKE_HUBSPOT_LATENCY_S", "0.08"))
+_next_id = 1000
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _new_id() -> str:
+    global _next_id
+    _next_id += 1
+    return str(_next_id)
+
+
+def seed(records: int) -> None:
+    random.seed(7)
+    industries = ["Software", "Retail", "Healthcare", "Finance", "Logistics"]
+    cities = ["Vienna", "Berlin", "Austin", "Toronto", "Lisbon"]
+    for n in range(records):
+        company = f"Company {n} {random.choice(['Labs', 'Systems', 'Group', 'Works'])}"
+        put("companies", {"name": company, "domain": f"company{n}.example", "industry": random.choice(industries),
+                          "city": random.choice(cities), "numberofemployees": str(random.randint(5, 5000))})
+        put("contacts", {"firstname": f"Person{n}", "lastname": random.choice(["Smith", "Novak", "Garcia", "Chen"]),
+                         "email": f"person{n}@company{n}.example", "company": company, "jobtitle": "Buyer"})
+        if n % 3 == 0:
+            put("deals", {"dealname": f"{company} renewal", "amount": str(random.randint(1, 200) * 500),
+                          "dealstage": random.choice(["appointmentscheduled", "contractsent", "closedwon"]), "pipeline": "default"})
+
+
+def modified_property(object_type: str) -> str:
+    # As in HubSpot: contacts use lastmodifieddate, every other object hs_lastmodifieddate
+    return "lastmodifieddate" if object_type == "contacts" else "hs_lastmodifieddate"
+
+
+def put(object_type: str, properties: Dict[str, Any], object_id: str = None) -> Dict[str, Any]:
+    object_id = object_id or _new_id()
+    record = OBJECTS[object_type].get(object_id, {"id": object_id, "properties": {}})
+    record["properties"].update(properties)
+    record["properties"][modified_property(object_type)] = str(_now_ms())
+    OBJECTS[object_type][object_id] = record
+    return record
+
+
+def _project(record: Dict[str, Any], properties: List[str]) -> Dict[str, Any]:
+    props = record["properties"]
+    return {"id": record["id"], "properties": {k: props.get(k) for k in properties} if properties else props}
+
+
+@fake_hubspot_app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    if request.url.path.startswith("/fake/"):
+        return await call_next(request)
+    await asyncio.sleep(LATENCY_S)
+    now = time.monotonic()
+    while _request_times and now - _request_times[0] > 10:
+        _request_times.popleft()
+    if len(_request_times) >= 100:
+        counters["rate_limited"] += 1
+        return JSONResponse({"status": "error", "category": "RATE_LIMITS"}, status_code=429, headers={"Retry-After": "1"})
+    _request_times.append(now)
+    counters["requests"] += 1
+    return await call_next(request)
+
+
+@fake_hubspot_app.get("/crm/v3/objects/{object_type}")
+async def list_objects(object_type: str, limit: int = 100, after: str = "0", properties: str = "") -> Dict[str, Any]:
+    records = sorted(OBJECTS.get(object_type, {}).values(), key=lambda r: int(r["id"]))
+    start, limit = int(after), min(limit, 100)
+    page = [_project(r, [p for p in properties.split(",") if p]) for r in records[start:start + limit]]
+    response: Dict[str, Any] = {"results": page}
+    if start + limit < len(records):
+        response["paging"] = {"next": {"after": str(start + limit)}}
+    return response
+
+
+@fake_hubspot_app.post("/crm/v3/objects/{object_type}/search")
+async def search_objects(object_type: str, request: Request) -> Any:
+    body = await request.json()
+    records = list(OBJECTS.get(object_type, {}).values())
+    modified = modified_property(object_type)
+    for group in body.get("filterGroups", []):
+        for f in group.get("filters", []):
+            if f.get("propertyName") != modified:
+                # Only the last-modified filter is faked; reject others rather than silently ignoring them
+                return JSONResponse({"status": "error", "message": f"Unsupported filter property {f.get('propertyName')}"}, status_code=400)
+            if f.get("operator") == "GT":
+                records = [r for r in records if int(r["properties"][modified]) > int(f["value"])]
+    if body.get("query"):
+        needle = body["query"].lower()
+        records = [r for r in records if any(needle in str(v).lower() for v in r["properties"].values())]
+    records.sort(key=lambda r: int(r["properties"][modified]))
+    start = int(body.get("after", 0))
+    limit = min(int(body.get("limit", 100)), 100)
+    response: Dict[str, Any] = {"total": len(records), "results": [_project(r, body.get("properties", [])) for r in records[start:start + limit]]}
+    if start + limit < len(records):
+        response["paging"] = {"next": {"after": str(start + limit)}}
+    return response
+
+
+@fake_hubspot_app.post("/crm/v3/objects/{object_type}/batch/create")
+async def batch_create(object_type: str, request: Request) -> JSONResponse:
+    inputs = (await request.json()).get("inputs", [])
+    if len(inputs) > 100:
+        return JSONResponse({"status": "error", "message": "Batch limit is 100 inputs"}, status_code=400)
+    OBJECTS.setdefault(object_type, {})
+    results = []
+    for i in inputs:
+        result = dict(put(object_type, dict(i.get("properties", {}))))
+        if "objectWriteTraceId" in i:
+            result["objectWriteTraceId"] = i["objectWriteTraceId"]
+        results.append(result)
+    # Like HubSpot, results are not promised in input order
+    random.shuffle(results)
+    counters["batch_creates"] += 1
+    counters["records_created"] += len(results)
+    return JSONResponse({"status": "COMPLETE", "results": results}, status_code=201)
+
+
+@fake_hubspot_app.post("/fake/update/{object_type}/{object_id}")
+async def fake_update(object_type: str, object_id: str, request: Request) -> Dict[str, Any]:
+    return put(object_type, await request.json(), object_id)
+
+
+@fake_hubspot_app.get("/fake/stats")
+async def fake_stats() -> Dict[str, Any]:
+    return {**counters, "objects": {k: len(v) for k, v in OBJECTS.items()}}
+
+
+# --- Benchmark --- #
+async def bench(base_url: str, lookups: int = 20, calls: int = 150) -> Dict[str, Any]:
+    from example_hubspot_sync import HubSpotClient, HubSpotLogCallTool, HubSpotSearchTool, HubSpotSync, LocalCRMStore
+
+    workdir = tempfile.mkdtemp(prefix="eva_hubspot_bench_")
+    report: Dict[str, Any] = {}
+    try:
+        client = HubSpotClient("local", base_url=base_url)
+        sync = HubSpotSync(client, LocalCRMStore(os.path.join(workdir, "crm.db")), sync_interval_s=3600, flush_interval_s=3600)
+
+        start = time.perf_counter()
+        report["full_sync"] = await sync.sync_once()
+        report["full_sync_s"] = round(time.perf_counter() - start, 2)
+        async with httpx.AsyncClient(base_url=base_url) as raw:
+            await raw.post("/fake/update/companies/1001", json={"city": "Graz"})
+        start = time.perf_counter()
+        report["incremental_sync"] = await sync.sync_once()
+        report["incremental_sync_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        names = [f"Company {random.randint(0, 500)}" for _ in range(lookups)]
+        start = time.perf_counter()
+        for name in names:
+            await client.search("companies", name)
+        report["remote_lookup_ms_avg"] = round((time.perf_counter() - start) * 1000 / lookups, 2)
+
+        search = HubSpotSearchTool(sync=sync)
+        start = time.perf_counter()
+        for name in names:
+            await search.ainvoke({"query": name, "object_type": "companies"})
+        report["local_lookup_ms_avg"] = round((time.perf_counter() - start) * 1000 / lookups, 2)
+
+        log_call = HubSpotLogCallTool(sync=sync)
+        for n in range(calls):
+            await log_call.ainvoke({"title": f"Discovery call {n}", "related_to": f"Person{n}"})
+        requests_before = client.requests
+        start = time.perf_counter()
+        report["calls_written"] = await sync.flush_writes()
+        report["write_requests"] = client.requests - requests_before
+        report["write_flush_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        await sync.stop()
+        report["client"] = sync.stats()
+        await client.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+# --- CLI --- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local fake HubSpot API and sync benchmark.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Run the fake HubSpot API.")
+    serve.add_argument("--port", type=int, default=8030)
+    serve.add_argument("--records", type=int, default=2000)
+    run = subparsers.add_parser("bench", help="Compare remote lookups with the synced local store.")
+    run.add_argument("--base-url", default="http://localhost:8030")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        seed(args.records)
+        uvicorn.run(fake_hubspot_app, host="127.0.0.1", port=args.port)
+    else:
+        print(json.dumps(asyncio.run(bench(args.base_url)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# Local Fake Slack API
+# Description: A small stand-in for the Slack Web API (auth.test, chat.postMessage) that enforces
+#              Slack's ~1 message/second/channel limit with 429 + Retry-After, plus a simulator that
+#              sends signed Events API callbacks (including bursts and retried deliveries) to the
+#              receiver in example_slack_events.py. Lets the Slack path be exercised without a workspace.
+#
+# Usage:
+#   python example_fake_slack.py serve --port 8010
+#   python example_fake_slack.py simulate --events-url http://localhost:8000/slack/events \
+#       --slack-url http://localhost:8010 --channels 3 --burst 4 --retries 2
+#   python example_fake_slack.py check-outbox                          # outbox drain regression check
+
+# -- Imports -- #
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FAKE_BOT_USER_ID = "UEVABOT"
+FAKE_BOT_ID = "BEVABOT"
+
+# --- Fake Web API --- #
+fake_slack_app = FastAPI(title="Fake Slack API")
+posted_messages: List[Dict[str, Any]] = []
+_last_post_at: Dict[str, float] = {}
+rate_limit_hits = 0
+PER_CHANNEL_INTERVAL_S = float(os.getenv("FAKE_SLACK_INTERVAL_S", "1.0"))
+
+
+@fake_slack_app.post("/api/auth.test")
+async def auth_test() -> Dict[str, Any]:
+    return {"ok": True, "user_id": FAKE_BOT_USER_ID, "bot_id": FAKE_BOT_ID, "team": "EVA Local"}
+
+
+@fake_slack_app.post("/api/chat.postMessage")
+async def chat_post_message(request: Request) -> JSONResponse:
+    global rate_limit_hits
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        body = dict(await request.form())
+    channel = body.get("channel", "")
+    now = time.monotonic()
+    # Small tolerance so a client pacing at exactly the interval is not rejected for clock jitter
+    if now - _last_post_at.get(channel, -1e9) < PER_CHANNEL_INTERVAL_S * 0.9:
+        rate_limit_hits += 1
+        return JSONResponse({"ok": False, "error": "ratelimited"}, status_code=429, headers={"Retry-After": "1"})
+    _last_post_at[channel] = now
+    ts = f"{time.time():.6f}"
+    posted_messages.append({"channel": channel, "text": body.get("text"), "thread_ts": body.get("thread_ts"), "ts": ts})
+    return JSONResponse({"ok": True, "channel": channel, "ts": ts})
+
+
+@fake_slack_app.get("/fake/posts")
+async def fake_posts() -> Dict[str, Any]:
+    return {"posts": posted_messages, "rate_limit_hits": rate_limit_hits}
+
+
+# --- Event Simulator --- #
+def sign_request(signing_secret: str, body: str) -> Dict[str, str]:
+    timestamp = str(int(time.time()))
+    base = f"v0:{timestamp}:{body}".encode("utf-8")
+    signature = "v0=" + hmac.new(signing_secret.encode("utf-8"), base, hashlib.sha256).hexdigest()
+    return {"X-Slack-Request-Timestamp": timestamp, "X-Slack-Signature": signature, "Content-Type": "application/json"}
+
+
+def make_message_event(channel: str, user: str, text: str) -> Dict[str, Any]:
+    return {
+        "type": "event_callback",
+        "event_id": f"Ev{uuid.uuid4().hex[:12].upper()}",
+        "event_time": int(time.time()),
+        "event": {"type": "message", "channel": channel, "user": user, "text": text, "ts": f"{time.time():.6f}"},
+    }
+
+
+async def simulate(
+    events_url: str, slack_url: str, signing_secret: str, channels: int = 3, burst: int = 4,
+    retries: int = 2, settle_s: float = 10.0
+) -> Dict[str, Any]:
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def deliver(payload: Dict[str, Any], retry_num: int = 0) -> float:
+            body = json.dumps(payload)
+            headers = sign_request(signing_secret, body)
+            if retry_num:
+                headers.update({"X-Slack-Retry-Num": str(retry_num), "X-Slack-Retry-Reason": "http_timeout"})
+            start = time.perf_counter()
+            response = await client.post(events_url, content=body, headers=headers)
+            response.raise_for_status()
+            return (time.perf_counter() - start) * 1000
+
+        ack_ms: List[float] = []
+        deliveries = 0
+        for c in range(channels):
+            channel = f"C{c:04d}"
+            for i in range(burst):
+                payload = make_message_event(channel, f"U{c:04d}", f"Message {i + 1} of a burst in {channel}: what's on my calendar?")
+                # Slack re-delivers the same event_id when it thinks the ack was lost
+                for retry_num in range(retries + 1 if i == 0 else 1):
+                    ack_ms.append(await deliver(payload, retry_num))
+                    deliveries += 1
+
+        # Replies are asynchronous: wait until every channel got one, or give up after settle_s
+        deadline = time.monotonic() + settle_s
+        posts: Dict[str, Any] = {"posts": [], "rate_limit_hits": 0}
+        while time.monotonic() < deadline:
+            posts = (await client.get(f"{slack_url.rstrip('/')}/fake/posts")).json()
+            if len({p["channel"] for p in posts["posts"]}) >= channels:
+                break
+            await asyncio.sleep(0.25)
+        stats = (await client.get(events_url.replace("/slack/events", "/slack/stats"))).json()
+
+    return {
+        "deliveries_sent": deliveries,
+        "unique_messages": channels * burst,
+        "ack_ms_max": round(max(ack_ms), 2) if ack_ms else 0.0,
+        "posts_received_by_slack": len(posts["posts"]),
+        "slack_429s": posts["rate_limit_hits"],
+        "receiver": stats,
+    }
+
+
+# --- Outbox Check --- #
+class _RecordingClient:
+    def __init__(self):
+        self.posts: List[Dict[str, Any]] = []
+
+    async def chat_postMessage(self, **kwargs: Any) -> Dict[str, Any]:
+        self.posts.append(kwargs)
+        return {"ok": True}
+
+
+async def check_outbox(timeout_s: float = 5.0) -> Dict[str, Any]:
+    # Regression check: posts for different threads of one channel queued together must all be
+    # sent and settled, so drain() returns instead of waiting forever
+    from example_slack_events import SlackOutbox
+
+    client = _RecordingClient()
+    outbox = SlackOutbox(client, per_channel_interval_s=0.01)
+    posts = [("C1", "a", None), ("C1", "b", "t1"), ("C1", "c", None), ("C1", "d", "t1"), ("C2", "e", "t2"), ("C1", "f", "t3")]
+    for channel, text, thread_ts in posts:
+        await outbox.post(channel, text, thread_ts)
+    await asyncio.wait_for(outbox.close(), timeout_s)
+    sent = sorted(part for p in client.posts for part in p["text"].split("\n\n"))
+    if sent != sorted(text for _, text, _ in posts):
+        raise AssertionError(f"Outbox sent {sent}, expected every queued post once")
+    return {"posts_queued": len(posts), "slack_calls": len(client.posts), "drained": True}
+
+
+# --- CLI --- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local fake Slack API and event simulator.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Run the fake Slack Web API.")
+    serve.add_argument("--port", type=int, default=8010)
+    sim = subparsers.add_parser("simulate", help="Send signed message events to the receiver.")
+    sim.add_argument("--events-url", default="http://localhost:8000/slack/events")
+    sim.add_argument("--slack-url", default="http://localhost:8010")
+    sim.add_argument("--channels", type=int, default=3)
+    sim.add_argument("--burst", type=int, default=4, help="Messages sent back-to-back per channel.")
+    sim.add_argument("--retries", type=int, default=2, help="Redeliveries of each burst's first event.")
+    sim.add_argument("--settle-s", type=float, default=30.0)
+    subparsers.add_parser("check-outbox", help="Check that mixed-thread posts are all sent and drain() returns.")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        uvicorn.run(fake_slack_app, host="127.0.0.1", port=args.port)
+    elif args.command == "check-outbox":
+        print(json.dumps(asyncio.run(check_outbox()), indent=2))
+    else:
+        secret = os.getenv("SLACK_APP_CLIENT_SIGNING_SECRET", "local-signing-secret")
+        report = asyncio.run(simulate(
+            args.events_url, args.slack_url, secret, args.channels, args.burst, args.retries, args.settle_s
+        ))
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
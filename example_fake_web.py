@@ -0,0 +1,151 @@
+# Local Web Fixture Server
+# Description: Serves a Tavily-compatible /search endpoint and large, slowly streamed HTML pages
+#              (navigation, scripts and footers around the actual content), plus a benchmark that
+#              compares a serial fetch-everything baseline with the pipeline in example_web_search.py.
+#
+# Usage:
+#   python example_fake_web.py serve --port 8040
+#   python example_fake_web.py bench --base-url http://localhost:8040
+
+# -- Imports -- #
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+fake_web_app = FastAPI(title="Fake Web")
+PAGE_COUNT = 40
+# Bytes per streamed chunk and delay between chunks: roughly a 2 MB/s connection
+CHUNK_BYTES = 16384
+CHUNK_DELAY_S = float(os.getenv("FAKE_WEB_CHUNK_DELAY_S", "0.008"))
+TOPICS = ["solar batteries", "rust async runtimes", "coffee roasting", "mountain railways", "vector databases"]
+BENCH_QUERIES = [
+    "how long do solar batteries last",
+    "which rust async runtimes are popular",
+    "what temperature is used for coffee roasting",
+]
+
+
+def render_page(n: int) -> str:
+    topic = TOPICS[n % len(TOPICS)]
+    nav = "".join(f"<li><a href='/pages/{i}'>Related page {i}</a></li>" for i in range(60))
+    script = "<script>" + "var tracking = {};" * 2000 + "</script>"
+    filler = "".join(
+        f"<p>Section {i} about {topic}: general background, history and unrelated commentary that rarely answers questions.</p>"
+        for i in range(120)
+    )
+    facts = (
+        f"<p>Key fact about {topic}: most {topic} last between 10 and 15 years when maintained properly.</p>"
+        f"<p>Experts recommend reviewing {topic} annually; the most popular options are widely documented.</p>"
+        f"<p>For {topic}, the typical operating temperature is around 200 degrees in common setups.</p>"
+    )
+    footer = "<footer>" + "Copyright notice and legal links. " * 200 + "</footer>"
+    return (
+        f"<html><head><title>Guide {n}: {topic}</title>{script}</head><body><nav><ul>{nav}</ul></nav>"
+        f"<article><h1>{topic.title()} guide {n}</h1>{facts}{filler}</article>{footer}"
+        + "<div>" + "Comment thread padding. " * 6000 + "</div></body></html>"
+    )
+
+
+@fake_web_app.get("/pages/{n}")
+async def page(n: int) -> StreamingResponse:
+    body = render_page(n).encode("utf-8")
+
+    async def stream():
+        for i in range(0, len(body), CHUNK_BYTES):
+            await asyncio.sleep(CHUNK_DELAY_S)
+            yield body[i:i + CHUNK_BYTES]
+
+    return StreamingResponse(stream(), media_type="text/html; charset=utf-8")
+
+
+@fake_web_app.post("/search")
+async def search(request: Request) -> Dict[str, Any]:
+    body = await request.json()
+    query, max_results = body.get("query", ""), int(body.get("max_results", 5))
+    await asyncio.sleep(0.15)
+    topic_index = next((i for i, t in enumerate(TOPICS) if t.split()[0] in query.lower()), None)
+    if topic_index is None:
+        topic_index = int(hashlib.sha1(query.encode("utf-8")).hexdigest(), 16) % len(TOPICS)
+    pages = [n for n in range(PAGE_COUNT) if n % len(TOPICS) == topic_index][:max_results]
+    base = str(request.base_url).rstrip("/")
+    return {
+        "query": query,
+        "results": [
+            {"url": f"{base}/pages/{n}", "title": f"Guide {n}", "content": f"A guide about {TOPICS[topic_index]}.", "score": 0.9}
+            for n in pages
+        ],
+    }
+
+
+# --- Benchmark --- #
+async def serial_baseline(base_url: str, query: str) -> Dict[str, Any]:
+    from example_tokens import count_tokens
+    from example_web_search import StreamingTextExtractor
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=60) as client:
+        results = (await client.post(f"{base_url}/search", json={"query": query, "max_results": 5})).json()["results"]
+        texts = []
+        for result in results:
+            # A fresh connection, the full body and the full text of every page, one after another
+            async with httpx.AsyncClient(timeout=60) as page_client:
+                html = (await page_client.get(result["url"])).text
+            extractor = StreamingTextExtractor(max_chars=10_000_000)
+            extractor.feed(html)
+            texts.append(extractor.text())
+    context = "\n\n".join(texts)
+    return {"ms": round((time.perf_counter() - start) * 1000, 1), "context_tokens": count_tokens(context)}
+
+
+async def bench(base_url: str) -> Dict[str, Any]:
+    from example_tokens import count_tokens
+    from example_web_search import WebSearchPipeline
+
+    report: Dict[str, Any] = {"baseline_serial": [], "pipeline_cold": [], "pipeline_cached": []}
+    pipeline = WebSearchPipeline(api_url=f"{base_url}/search", max_results=5, token_budget=800)
+    for query in BENCH_QUERIES:
+        report["baseline_serial"].append(await serial_baseline(base_url, query))
+        outcome = await pipeline.run(query)
+        report["pipeline_cold"].append({"ms": outcome["ms"], "context_tokens": count_tokens(pipeline.format_context(outcome))})
+        outcome = await pipeline.run(query)
+        report["pipeline_cached"].append({"ms": outcome["ms"]})
+
+    def avg(rows: List[Dict[str, Any]], field: str) -> float:
+        return round(sum(r[field] for r in rows) / len(rows), 1)
+
+    summary = {
+        name: {field: avg(rows, field) for field in rows[0]} for name, rows in report.items()
+    }
+    summary["speedup_cold"] = round(summary["baseline_serial"]["ms"] / summary["pipeline_cold"]["ms"], 1)
+    summary["pipeline_stats"] = pipeline.stats()
+    await pipeline.close()
+    return summary
+
+
+# --- CLI --- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local web fixture server and web search benchmark.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Run the fixture server.")
+    serve.add_argument("--port", type=int, default=8040)
+    run = subparsers.add_parser("bench", help="Compare a serial baseline with the web search pipeline.")
+    run.add_argument("--base-url", default="http://localhost:8040")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        uvicorn.run(fake_web_app, host="127.0.0.1", port=args.port)
+    else:
+        print(json.dumps(asyncio.run(bench(args.base_url.rstrip("/"))), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Skip-Synthesis Fast Path for Tool Responses
+# Description: A tool whose output is already the user-facing answer (dev tools, confirmations
+#              like "call queued") declares it with LangChain's `return_direct = True`, optionally
+#              with a `response_template` ("... {output} ..."). Specialists then return the rendered
+#              output directly instead of making a second LLM call to restate it.
+#              SynthesisStats tracks, per agent, how many synthesis calls were made or skipped and
+#              how much latency the skipped calls saved (estimated from the agent's measured calls).
+#
+# Disable with EVA_SKIP_SYNTHESIS=off to compare against always synthesizing.
+
+# -- Imports -- #
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+SKIP_SYNTHESIS = os.getenv("EVA_SKIP_SYNTHESIS", "on").strip().lower() not in ("off", "false", "0")
+# Used to estimate savings before any synthesis call has been measured
+DEFAULT_SYNTHESIS_MS = 1200.0
+
+
+def render_direct_response(tool: Any, tool_output: Any) -> Optional[str]:
+    if not SKIP_SYNTHESIS or not getattr(tool, "return_direct", False):
+        return None
+    template = getattr(tool, "response_template", None)
+    return template.format(output=tool_output) if template else str(tool_output)
+
+
+class SynthesisStats:
+    def __init__(self):
+        self._synthesis_ms: Dict[str, List[float]] = {}
+        self._skipped: Dict[str, int] = {}
+
+    async def respond(
+        self, agent_name: str, tool: Any, tool_output: Any, synthesize: Callable[[], Awaitable[BaseMessage]]
+    ) -> BaseMessage:
+        # synthesize is only called when the tool output is not directly returnable
+        direct = render_direct_response(tool, tool_output)
+        if direct is not None:
+            self._skipped[agent_name] = self._skipped.get(agent_name, 0) + 1
+            print(f"⚡ {agent_name} returned the {tool.name} output directly (synthesis skipped)")
+            return AIMessage(content=direct)
+        start = time.perf_counter()
+        response = await synthesize()
+        self._synthesis_ms.setdefault(agent_name, []).append((time.perf_counter() - start) * 1000)
+        return response
+
+    def report(self) -> Dict[str, Any]:
+        all_ms = [ms for values in self._synthesis_ms.values() for ms in values]
+        global_avg = sum(all_ms) / len(all_ms) if all_ms else DEFAULT_SYNTHESIS_MS
+        per_agent: Dict[str, Any] = {}
+        for agent in sorted(set(self._synthesis_ms) | set(self._skipped)):
+            measured = self._synthesis_ms.get(agent, [])
+            avg_ms = sum(measured) / len(measured) if measured else global_avg
+            skipped = self._skipped.get(agent, 0)
+            per_agent[agent] = {
+                "synthesis_calls": len(measured),
+                "synthesis_skipped": skipped,
+                "avg_synthesis_ms": round(avg_ms, 1),
+                "est_latency_saved_ms": round(skipped * avg_ms, 1),
+            }
+        return {
+            "llm_calls_saved": sum(self._skipped.values()),
+            "est_latency_saved_ms": round(sum(a["est_latency_saved_ms"] for a in per_agent.values()), 1),
+            "per_agent": per_agent,
+        }
+
+
+synthesis_stats = SynthesisStats()
@@ -0,0 +1,283 @@
+# GitHub Data Layer for the github_mgmt_agent
+# Description: A GitHub REST client that avoids burning rate limit and latency:
+#              - every GET is sent with If-None-Match from an on-disk response cache; a 304 reply
+#                (which GitHub does not count against the rate limit) is served from the cache
+#              - paginated listings read the Link header's last page and fetch the rest concurrently
+#              - a local SQLite issue index answers "list open issues in X" without any request while
+#                it is fresh, and refreshes incrementally with `since` when it is not
+#
+# Enable for the agent with GITHUB_INDEX=on; GITHUB_API_BASE_URL can point at example_fake_github.py.
+
+# -- Imports -- #
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import httpx
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+LAST_PAGE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+NEXT_PAGE = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+# --- Response Cache --- #
+class ResponseCache:
+    def __init__(self, directory: str = "data/github_cache", max_entries: int = 5000, prune_every: int = 100):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._puts = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        # Write-then-rename so concurrent readers never see a half-written entry
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self._puts += 1
+        if self._puts % self.prune_every == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        # Least recently written entries go first; a removed entry just means one unconditional GET
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+        excess = sorted(entries)[:max(0, len(entries) - self.max_entries)]
+        for _, path in excess:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(excess)
+
+
+# --- Client --- #
+class GitHubClient:
+    def __init__(
+        self, token: Optional[str] = None, base_url: str = "https://api.github.com",
+        cache: Optional[ResponseCache] = None, max_concurrency: int = 8
+    ):
+        headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._client = httpx.AsyncClient(
+            base_url=base_url, headers=headers, timeout=30,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self.cache = cache or ResponseCache()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = 0
+        self.not_modified = 0
+        self.rate_limit_remaining: Optional[int] = None
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[str, str]]:
+        key = f"{path}?{json.dumps(params or {}, sort_keys=True)}"
+        # A `since` query is new on every incremental refresh: its ETag could never be reused, so it is
+        # neither sent conditionally nor cached
+        cacheable = "since" not in (params or {})
+        cached = self.cache.get(key) if cacheable else None
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+        async with self._semaphore:
+            response = await self._client.get(path, params=params, headers=headers)
+        self.requests += 1
+        if "X-RateLimit-Remaining" in response.headers:
+            self.rate_limit_remaining = int(response.headers["X-RateLimit-Remaining"])
+        if response.status_code == 304 and cached:
+            self.not_modified += 1
+            return cached["body"], cached.get("headers", {})
+        response.raise_for_status()
+        body = response.json()
+        kept_headers = {h: response.headers[h] for h in ("Link",) if h in response.headers}
+        if cacheable and response.headers.get("ETag"):
+            self.cache.put(key, {"etag": response.headers["ETag"], "body": body, "headers": kept_headers, "fetched_at": time.time()})
+        return body, kept_headers
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        body, _ = await self._get(path, params)
+        return body
+
+    async def get_paginated(self, path: str, params: Optional[Dict[str, Any]] = None, per_page: int = 100) -> List[Any]:
+        params = {**(params or {}), "per_page": per_page}
+        first, headers = await self._get(path, {**params, "page": 1})
+        link = headers.get("Link", "")
+        last = LAST_PAGE.search(link)
+        if last:
+            # The Link header tells us how many pages there are: fetch them all at once
+            pages = await asyncio.gather(*[self._get(path, {**params, "page": p}) for p in range(2, int(last.group(1)) + 1)])
+            return list(first) + [item for body, _ in pages for item in body]
+        items = list(first)
+        page = 1
+        while NEXT_PAGE.search(link):
+            page += 1
+            body, headers = await self._get(path, {**params, "page": page})
+            items.extend(body)
+            link = headers.get("Link", "")
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "rate_limit_remaining": self.rate_limit_remaining,
+        }
+
+    async def warm_up(self) -> None:
+        # Opens the pooled TLS connection; /rate_limit does not count against the quota
+        await self._client.get("/rate_limit")
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# --- Issue Index --- #
+class IssueIndex:
+    def __init__(self, client: GitHubClient, path: str = "data/github_index.db", max_age_s: float = 300.0):
+        self.client = client
+        self.path = path
+        self.max_age_s = max_age_s
+        self._locks: Dict[str, asyncio.Lock] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS issues ("
+                " repo TEXT NOT NULL, number INTEGER NOT NULL, title TEXT, state TEXT, labels TEXT,"
+                " assignee TEXT, updated_at TEXT, url TEXT, PRIMARY KEY (repo, number))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_repo_state ON issues (repo, state, number)")
+            conn.execute("CREATE TABLE IF NOT EXISTS repo_sync (repo TEXT PRIMARY KEY, synced_at REAL, since TEXT)")
+        self.local_hits = 0
+        self.refreshes = 0
+
+    def _sync_info(self, repo: str) -> Tuple[Optional[float], Optional[str]]:
+        with sqlite3.connect(self.path) as conn:
+            row = conn.execute("SELECT synced_at, since FROM repo_sync WHERE repo = ?", (repo,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _store(self, repo: str, issues: List[Dict[str, Any]], synced_at: float, since: str) -> None:
+        rows = [
+            (
+                repo, issue["number"], issue.get("title"), issue.get("state"),
+                ",".join(label["name"] for label in issue.get("labels", [])),
+                (issue.get("assignee") or {}).get("login"), issue.get("updated_at"), issue.get("html_url"),
+            )
+            for issue in issues if "pull_request" not in issue
+        ]
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO repo_sync VALUES (?, ?, ?)", (repo, synced_at, since))
+
+    async def refresh(self, repo: str) -> None:
+        _, since = await asyncio.to_thread(self._sync_info, repo)
+        started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        if since:
+            # Incremental: everything updated since the last sync, including issues that were closed
+            issues = await self.client.get_paginated(f"/repos/{repo}/issues", {"state": "all", "since": since})
+        else:
+            # Full first sync, closed issues included, so state="closed"/"all" listings are complete
+            issues = await self.client.get_paginated(f"/repos/{repo}/issues", {"state": "all"})
+        await asyncio.to_thread(self._store, repo, issues, time.time(), started)
+        self.refreshes += 1
+
+    async def list_issues(self, repo: str, state: str = "open", label: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], float]:
+        async with self._locks.setdefault(repo, asyncio.Lock()):
+            synced_at, _ = await asyncio.to_thread(self._sync_info, repo)
+            if synced_at is None or time.time() - synced_at > self.max_age_s:
+                await self.refresh(repo)
+                synced_at, _ = await asyncio.to_thread(self._sync_info, repo)
+            else:
+                self.local_hits += 1
+        rows = await asyncio.to_thread(self._select, repo, state, label, limit)
+        columns = ("number", "title", "state", "labels", "assignee", "updated_at", "url")
+        return [dict(zip(columns, row)) for row in rows], time.time() - synced_at
+
+    def _select(self, repo: str, state: str, label: Optional[str], limit: int) -> List[Tuple[Any, ...]]:
+        query = "SELECT number, title, state, labels, assignee, updated_at, url FROM issues WHERE repo = ?"
+        args: List[Any] = [repo]
+        if state != "all":
+            query += " AND state = ?"
+            args.append(state)
+        if label:
+            query += " AND (',' || labels || ',') LIKE ?"
+            args.append(f"%,{label},%")
+        query += " ORDER BY number DESC LIMIT ?"
+        args.append(limit)
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(query, args).fetchall()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"local_hits": self.local_hits, "refreshes": self.refreshes, **self.client.stats()}
+
+
+# --- Agent Tool --- #
+class ListIssuesInput(BaseModel):
+    repo: str = Field(..., description="Repository as 'owner/repo'.")
+    state: str = Field("open", description="open, closed or all.")
+    label: Optional[str] = Field(None, description="Only issues with this label.")
+
+
+class GitHubIssuesTool(BaseTool):
+    name: str = "list_github_issues"
+    description: str = "Lists issues of a GitHub repository from the local issue index (refreshed when stale)."
+    args_schema: Type[BaseModel] = ListIssuesInput
+    index: Any = None
+
+    def _run(self, **kwargs: Any) -> str:
+        raise NotImplementedError("list_github_issues is async-only; use ainvoke.")
+
+    async def _arun(self, repo: str, state: str = "open", label: Optional[str] = None) -> str:
+        issues, age_s = await self.index.list_issues(repo, state, label)
+        freshness = f"data as of {int(age_s)}s ago"
+        if not issues:
+            return f"No {state} issues in {repo} ({freshness})."
+        lines = [
+            f"- #{i['number']} {i['title']}" + (f" [{i['labels']}]" if i["labels"] else "") + (f" @{i['assignee']}" if i["assignee"] else "")
+            for i in issues
+        ]
+        return f"{len(issues)} {state} issues in {repo} ({freshness}):\n" + "\n".join(lines)
+
+
+def issue_index_from_env() -> Optional[IssueIndex]:
+    if os.getenv("GITHUB_INDEX", "off").strip().lower() not in ("on", "true", "1"):
+        return None
+    token = os.getenv("GITHUB_TOKEN") or ""
+    client = GitHubClient(
+        token=None if token.startswith("YOUR_") else token or None,
+        base_url=os.getenv("GITHUB_API_BASE_URL", "https://api.github.com"),
+        cache=ResponseCache(
+            os.getenv("GITHUB_CACHE_DIR", "data/github_cache"),
+            max_entries=int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", "5000")),
+        ),
+    )
+    return IssueIndex(
+        client,
+        path=os.getenv("GITHUB_INDEX_DB", "data/github_index.db"),
+        max_age_s=float(os.getenv("GITHUB_INDEX_MAX_AGE_S", "300")),
+    )
@@ -0,0 +1,481 @@
+# HubSpot CRM Sync and Local Query Cache for the hubspot_mgmt_agent
+# Description: Contacts, companies and deals are synced incrementally in the background (search on
+#              the last-modified date since the previous sync) into a local SQLite store with an FTS5 index,
+#              so lookups like "find company X details" are answered locally with freshness metadata.
+#              Writes such as "log a sales call" go into a durable outbox and are flushed through
+#              HubSpot's batch create API, within a request rate limit.
+#
+# Enable for the agent with HUBSPOT_SYNC=on; HUBSPOT_API_BASE_URL can point at example_fake_hubspot.py.
+
+# -- Imports -- #
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import httpx
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from example_rate_limiter import TokenBucket
+
+# Contacts are the one object type whose last-modified property is not hs_lastmodifieddate
+MODIFIED_PROPERTY: Dict[str, str] = {
+    "contacts": "lastmodifieddate",
+    "companies": "hs_lastmodifieddate",
+    "deals": "hs_lastmodifieddate",
+}
+SYNCED_OBJECTS: Dict[str, List[str]] = {
+    "contacts": ["firstname", "lastname", "email", "company", "jobtitle", "phone", MODIFIED_PROPERTY["contacts"]],
+    "companies": ["name", "domain", "industry", "city", "country", "numberofemployees", MODIFIED_PROPERTY["companies"]],
+    "deals": ["dealname", "amount", "dealstage", "pipeline", "closedate", MODIFIED_PROPERTY["deals"]],
+}
+# HubSpot batch endpoints accept at most 100 inputs per request
+BATCH_LIMIT = 100
+
+
+def display_name(object_type: str, properties: Dict[str, Any]) -> str:
+    if object_type == "contacts":
+        name = " ".join(p for p in (properties.get("firstname"), properties.get("lastname")) if p)
+        return name or properties.get("email") or ""
+    if object_type == "companies":
+        return properties.get("name") or properties.get("domain") or ""
+    return properties.get("dealname") or ""
+
+
+# --- API Client --- #
+class HubSpotRateLimited(RuntimeError):
+    pass
+
+
+def write_never_applied(error: Exception) -> bool:
+    # True only when HubSpot certainly did not create anything: a 4xx/429 answer, or no connection.
+    # Read timeouts, dropped connections and 5xx can come after the records were created.
+    if isinstance(error, HubSpotRateLimited):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return 400 <= error.response.status_code < 500
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+class HubSpotClient:
+    def __init__(self, token: str, base_url: str = "https://api.hubapi.com", requests_per_s: float = 9.0):
+        self._client = httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"}, timeout=30)
+        # Private apps get ~100 requests / 10s; stay just under it
+        self._bucket = TokenBucket(requests_per_s, requests_per_s)
+        self.requests = 0
+        self.rate_limited = 0
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        for _ in range(5):
+            await self._bucket.acquire()
+            response = await self._client.request(method, path, **kwargs)
+            self.requests += 1
+            if response.status_code == 429:
+                self.rate_limited += 1
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise HubSpotRateLimited(f"HubSpot kept rate limiting {method} {path}")
+
+    async def list_all(self, object_type: str, properties: List[str]) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        params: Dict[str, Any] = {"limit": 100, "properties": ",".join(properties)}
+        while True:
+            page = await self._request("GET", f"/crm/v3/objects/{object_type}", params=params)
+            results.extend(page.get("results", []))
+            after = page.get("paging", {}).get("next", {}).get("after")
+            if not after:
+                return results
+            params["after"] = after
+
+    async def modified_since(self, object_type: str, properties: List[str], since_ms: int) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        body: Dict[str, Any] = {
+            "filterGroups": [{"filters": [{"propertyName": MODIFIED_PROPERTY[object_type], "operator": "GT", "value": str(since_ms)}]}],
+            "sorts": [{"propertyName": MODIFIED_PROPERTY[object_type], "direction": "ASCENDING"}],
+            "properties": properties,
+            "limit": 100,
+        }
+        while True:
+            page = await self._request("POST", f"/crm/v3/objects/{object_type}/search", json=body)
+            results.extend(page.get("results", []))
+            after = page.get("paging", {}).get("next", {}).get("after")
+            if not after:
+                return results
+            body["after"] = after
+
+    async def search(self, object_type: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        page = await self._request("POST", f"/crm/v3/objects/{object_type}/search", json={"query": query, "limit": limit})
+        return page.get("results", [])
+
+    async def batch_create(self, object_type: str, inputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # The whole response: a partial success (207) lists created records in "results" and the
+        # rejected inputs in "errors", neither in input order
+        return await self._request("POST", f"/crm/v3/objects/{object_type}/batch/create", json={"inputs": inputs})
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# --- Local Store --- #
+def _timestamp_ms(value: Optional[str]) -> int:
+    if not value:
+        return 0
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+class LocalCRMStore:
+    def __init__(self, path: str = "data/hubspot.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS crm_objects ("
+                " row_id INTEGER PRIMARY KEY, object_type TEXT NOT NULL, id TEXT NOT NULL, name TEXT,"
+                " properties TEXT NOT NULL, modified_ms INTEGER, UNIQUE (object_type, id))"
+            )
+            # FTS rows share crm_objects.row_id as their rowid, so updates are keyed deletes, not scans
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS crm_fts USING fts5(text)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sync_state (object_type TEXT PRIMARY KEY, last_modified_ms INTEGER, synced_at REAL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, object_type TEXT NOT NULL, payload TEXT NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL, remote_id TEXT, claimed_at REAL)"
+            )
+            if "claimed_at" not in {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}:
+                conn.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def upsert(self, object_type: str, records: List[Dict[str, Any]], synced_at: float) -> int:
+        with self._connect() as conn:
+            last_modified = conn.execute(
+                "SELECT last_modified_ms FROM sync_state WHERE object_type = ?", (object_type,)
+            ).fetchone()
+            last_modified_ms = last_modified[0] if last_modified else 0
+            for record in records:
+                properties = record.get("properties", {})
+                name = display_name(object_type, properties)
+                modified_ms = _timestamp_ms(properties.get(MODIFIED_PROPERTY[object_type]) or record.get("updatedAt"))
+                last_modified_ms = max(last_modified_ms, modified_ms)
+                row_id = conn.execute(
+                    "INSERT INTO crm_objects (object_type, id, name, properties, modified_ms) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (object_type, id) DO UPDATE SET"
+                    " name = excluded.name, properties = excluded.properties, modified_ms = excluded.modified_ms"
+                    " RETURNING row_id",
+                    (object_type, str(record["id"]), name, json.dumps(properties), modified_ms),
+                ).fetchone()[0]
+                text = " ".join(str(v) for k, v in properties.items() if v and k != MODIFIED_PROPERTY[object_type])
+                conn.execute("DELETE FROM crm_fts WHERE rowid = ?", (row_id,))
+                conn.execute("INSERT INTO crm_fts (rowid, text) VALUES (?, ?)", (row_id, f"{name} {text}"))
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)", (object_type, last_modified_ms, synced_at)
+            )
+        return len(records)
+
+    def sync_state(self, object_type: str) -> Tuple[Optional[int], Optional[float]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_modified_ms, synced_at FROM sync_state WHERE object_type = ?", (object_type,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def search(self, query: str, object_type: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        # Quote each term so user text can't break FTS syntax; prefix-match the last one
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        match = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        sql = (
+            "SELECT o.object_type, o.id, o.name, o.properties, o.modified_ms FROM crm_fts"
+            " JOIN crm_objects o ON o.row_id = crm_fts.rowid"
+            " WHERE crm_fts MATCH ?"
+        )
+        args: List[Any] = [match]
+        if object_type:
+            sql += " AND o.object_type = ?"
+            args.append(object_type)
+        sql += " ORDER BY bm25(crm_fts) LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return [
+            {"object_type": r[0], "id": r[1], "name": r[2], "properties": json.loads(r[3]), "modified_ms": r[4]}
+            for r in rows
+        ]
+
+    # --- Outbox --- #
+    def enqueue(self, object_type: str, payload: Dict[str, Any]) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (object_type, payload, created_at) VALUES (?, ?, ?)",
+                (object_type, json.dumps(payload), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self, limit: int = BATCH_LIMIT, stale_after_s: float = 600.0) -> List[Tuple[int, str, Dict[str, Any]]]:
+        # Every server worker runs a flush loop on the same outbox: rows are moved to 'sending' in one
+        # statement so each is sent by exactly one of them. Rows left 'sending' by a crashed worker are
+        # picked up again once stale.
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id IN ("
+                " SELECT id FROM outbox WHERE status = 'pending' OR (status = 'sending' AND claimed_at < ?)"
+                " ORDER BY id LIMIT ?) RETURNING id, object_type, payload",
+                (now, now - stale_after_s, limit),
+            ).fetchall()
+        return sorted((r[0], r[1], json.loads(r[2])) for r in rows)
+
+    def mark(self, outbox_ids: List[int], status: str, remote_ids: Optional[List[Optional[str]]] = None) -> None:
+        remote_ids = remote_ids or [None] * len(outbox_ids)
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, remote_id = COALESCE(?, remote_id) WHERE id = ?",
+                [(status, rid, oid) for oid, rid in zip(outbox_ids, remote_ids)],
+            )
+
+    def retry_later(self, outbox_ids: List[int], max_attempts: int = 5) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1,"
+                " status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END WHERE id = ?",
+                [(max_attempts, oid) for oid in outbox_ids],
+            )
+
+    def release(self, outbox_ids: List[int]) -> None:
+        with self._connect() as conn:
+            conn.executemany("UPDATE outbox SET status = 'pending' WHERE id = ? AND status = 'sending'", [(oid,) for oid in outbox_ids])
+
+    def outbox_counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+# --- Sync + Write Queue --- #
+def match_batch_response(outbox_ids: List[int], response: Dict[str, Any]) -> Tuple[Dict[int, Optional[str]], List[int], List[int]]:
+    # -> (created outbox id -> remote id, rejected outbox ids, outbox ids the response says nothing about)
+    wanted = set(outbox_ids)
+    created: Dict[int, Optional[str]] = {}
+    for result in response.get("results", []):
+        trace_id = str(result.get("objectWriteTraceId", ""))
+        if trace_id.isdigit() and int(trace_id) in wanted:
+            created[int(trace_id)] = result.get("id")
+    rejected = set()
+    for error in response.get("errors", []):
+        for trace_id in error.get("context", {}).get("objectWriteTraceId", []):
+            if str(trace_id).isdigit() and int(trace_id) in wanted and int(trace_id) not in created:
+                rejected.add(int(trace_id))
+    rest = [i for i in outbox_ids if i not in created and i not in rejected]
+    if rest and not response.get("errors") and len(response.get("results", [])) == len(outbox_ids):
+        # Every input was created but the ids were not echoed: sent, without a remote id
+        created.update({i: None for i in rest})
+        rest = []
+    return created, sorted(rejected), rest
+
+
+class HubSpotSync:
+    def __init__(self, client: HubSpotClient, store: LocalCRMStore, sync_interval_s: float = 300.0, flush_interval_s: float = 5.0):
+        self.client = client
+        self.store = store
+        self.sync_interval_s = sync_interval_s
+        self.flush_interval_s = flush_interval_s
+        self._sync_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self.last_sync: Dict[str, Dict[str, Any]] = {}
+
+    async def sync_object(self, object_type: str) -> int:
+        properties = SYNCED_OBJECTS[object_type]
+        last_modified_ms, _ = self.store.sync_state(object_type)
+        started = time.time()
+        if last_modified_ms is None:
+            records = await self.client.list_all(object_type, properties)
+        else:
+            records = await self.client.modified_since(object_type, properties, last_modified_ms)
+        count = await asyncio.to_thread(self.store.upsert, object_type, records, started)
+        self.last_sync[object_type] = {"records": count, "full": last_modified_ms is None, "ms": round((time.time() - started) * 1000, 1)}
+        return count
+
+    async def sync_once(self) -> Dict[str, int]:
+        async with self._sync_lock:
+            counts = await asyncio.gather(*[self.sync_object(t) for t in SYNCED_OBJECTS])
+        return dict(zip(SYNCED_OBJECTS, counts))
+
+    async def flush_writes(self) -> int:
+        sent = 0
+        async with self._flush_lock:
+            while True:
+                claimed = await asyncio.to_thread(self.store.claim)
+                if not claimed:
+                    return sent
+                by_type: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+                for outbox_id, object_type, payload in claimed:
+                    by_type.setdefault(object_type, []).append((outbox_id, payload))
+                for position, (object_type, items) in enumerate(by_type.items()):
+                    ids = [i for i, _ in items]
+                    # objectWriteTraceId is echoed back on each result and error, which is how they are
+                    # matched to outbox rows
+                    inputs = [{**payload, "objectWriteTraceId": str(outbox_id)} for outbox_id, payload in items]
+                    try:
+                        response = await self.client.batch_create(object_type, inputs)
+                    except Exception as e:
+                        if write_never_applied(e):
+                            print(f"⚠️ HubSpot batch write of {len(items)} {object_type} failed: {e}")
+                            await asyncio.to_thread(self.store.retry_later, ids)
+                        else:
+                            # The batch may have been created; resending it would log every call twice
+                            print(f"⚠️ HubSpot batch write of {len(items)} {object_type} has unknown outcome ({type(e).__name__}: {e}); marked unconfirmed")
+                            await asyncio.to_thread(self.store.mark, ids, "unconfirmed")
+                        # Claimed batches not tried yet go back to pending for the next flush
+                        untried = [i for _, rest in list(by_type.items())[position + 1:] for i, _ in rest]
+                        await asyncio.to_thread(self.store.release, untried)
+                        return sent
+                    created, rejected, unconfirmed = match_batch_response(ids, response)
+                    if created:
+                        await asyncio.to_thread(self.store.mark, list(created), "sent", list(created.values()))
+                    if rejected:
+                        print(f"⚠️ HubSpot rejected {len(rejected)} {object_type} writes; they will be retried")
+                        await asyncio.to_thread(self.store.retry_later, rejected)
+                    if unconfirmed:
+                        # Not in results or errors: possibly created, so never resent automatically
+                        print(f"⚠️ HubSpot did not confirm {len(unconfirmed)} {object_type} writes (outbox {unconfirmed})")
+                        await asyncio.to_thread(self.store.mark, unconfirmed, "unconfirmed")
+                    sent += len(created)
+
+    async def _loop(self, interval_s: float, action) -> None:
+        while True:
+            try:
+                await action()
+            except Exception as e:
+                print(f"⚠️ HubSpot background {action.__name__} failed: {e}")
+            await asyncio.sleep(interval_s)
+
+    def start_background(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.ensure_future(self._loop(self.sync_interval_s, self.sync_once)),
+                asyncio.ensure_future(self._loop(self.flush_interval_s, self.flush_writes)),
+            ]
+
+    async def stop(self) -> None:
+        # The flush loop is only cancelled between batches (it holds _flush_lock while sending), so a
+        # batch that went out is always marked sent before the final flush runs
+        async with self._flush_lock:
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+        await self.flush_writes()
+
+    def freshness_s(self, object_type: Optional[str] = None) -> Optional[float]:
+        types = [object_type] if object_type else list(SYNCED_OBJECTS)
+        synced = [self.store.sync_state(t)[1] for t in types]
+        if any(s is None for s in synced):
+            return None
+        return time.time() - min(synced)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "last_sync": self.last_sync,
+            "api_requests": self.client.requests,
+            "rate_limited": self.client.rate_limited,
+            "outbox": self.store.outbox_counts(),
+        }
+
+
+# --- Agent Tools --- #
+class CRMSearchInput(BaseModel):
+    query: str = Field(..., description="Name, email, domain or keywords to look up.")
+    object_type: Optional[str] = Field(None, description="contacts, companies or deals; omit to search all.")
+
+
+class HubSpotSearchTool(BaseTool):
+    name: str = "search_crm"
+    description: str = "Looks up HubSpot contacts, companies and deals in the locally synced CRM copy."
+    args_schema: Type[BaseModel] = CRMSearchInput
+    sync: Any = None
+
+    def _run(self, **kwargs: Any) -> str:
+        raise NotImplementedError("search_crm is async-only; use ainvoke.")
+
+    async def _arun(self, query: str, object_type: Optional[str] = None) -> str:
+        if object_type not in (None, *SYNCED_OBJECTS):
+            object_type = None
+        self.sync.start_background()
+        if self.sync.freshness_s(object_type) is None:
+            await self.sync.sync_once()
+        results = await asyncio.to_thread(self.sync.store.search, query, object_type)
+        age = self.sync.freshness_s(object_type)
+        freshness = f"local CRM copy synced {int(age)}s ago" if age is not None else "local CRM copy"
+        if not results:
+            return f"No CRM records match '{query}' ({freshness})."
+        lines = []
+        for r in results:
+            props = ", ".join(f"{k}={v}" for k, v in r["properties"].items() if v and k != MODIFIED_PROPERTY[r["object_type"]])
+            lines.append(f"- [{r['object_type'][:-1]} {r['id']}] {r['name']}: {props}")
+        return f"CRM matches ({freshness}):\n" + "\n".join(lines)
+
+
+class LogCallInput(BaseModel):
+    title: str = Field(..., description="Short title of the call.")
+    notes: str = Field("", description="Call notes.")
+    related_to: Optional[str] = Field(None, description="Contact or company the call was with.")
+
+
+class HubSpotLogCallTool(BaseTool):
+    name: str = "log_crm_call"
+    description: str = "Logs a sales call in HubSpot. The write is queued and sent in the next batch."
+    args_schema: Type[BaseModel] = LogCallInput
+    # The confirmation is the whole answer; no synthesis call needed (see example_fast_path.py)
+    return_direct: bool = True
+    sync: Any = None
+
+    def _run(self, **kwargs: Any) -> str:
+        raise NotImplementedError("log_crm_call is async-only; use ainvoke.")
+
+    async def _arun(self, title: str, notes: str = "", related_to: Optional[str] = None) -> str:
+        self.sync.start_background()
+        payload: Dict[str, Any] = {
+            "properties": {"hs_call_title": title, "hs_call_body": notes, "hs_timestamp": str(int(time.time() * 1000))}
+        }
+        target = ""
+        if related_to:
+            matches = await asyncio.to_thread(self.sync.store.search, related_to, None, 1)
+            if matches and matches[0]["object_type"] in ("contacts", "companies"):
+                match = matches[0]
+                # HubSpot-defined association types: call->contact 194, call->company 182
+                type_id = 194 if match["object_type"] == "contacts" else 182
+                payload["associations"] = [{
+                    "to": {"id": match["id"]},
+                    "types": [{"associationCategory": "HUBSPOT_DEFINED", "associationTypeId": type_id}],
+                }]
+                target = f" with {match['name']}"
+        outbox_id = await asyncio.to_thread(self.sync.store.enqueue, "calls", payload)
+        return f"Call '{title}'{target} queued for HubSpot (outbox #{outbox_id}); it will be sent in the next batch."
+
+
+def hubspot_sync_from_env() -> Optional[HubSpotSync]:
+    if os.getenv("HUBSPOT_SYNC", "off").strip().lower() not in ("on", "true", "1"):
+        return None
+    token = os.getenv("HUBSPOT_ACCESS_TOKEN", "")
+    client = HubSpotClient(
+        token=token if token and not token.startswith("YOUR_") else "local",
+        base_url=os.getenv("HUBSPOT_API_BASE_URL", "https://api.hubapi.com"),
+    )
+    return HubSpotSync(
+        client, LocalCRMStore(os.getenv("HUBSPOT_DB", "data/hubspot.db")),
+        sync_interval_s=float(os.getenv("HUBSPOT_SYNC_INTERVAL_S", "300")),
+        flush_interval_s=float(os.getenv("HUBSPOT_FLUSH_INTERVAL_S", "5")),
+    )
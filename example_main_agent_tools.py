@@ -21,6 +21,8 @@ class SlackDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Slack agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -39,6 +41,8 @@ class GitHubDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the GitHub agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -57,6 +61,8 @@ class TherapistDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Therapist agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -75,6 +81,8 @@ class LogicalDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Logical agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -93,6 +101,8 @@ class CKBDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the CKB agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -111,6 +121,8 @@ class EmailMgmtDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Email agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -129,6 +141,8 @@ class CalendarMgmtDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Calendar agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -147,6 +161,8 @@ class WebSearchDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Web Search agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -165,6 +181,8 @@ class CustomerServiceDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the Customer Service agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -183,6 +201,8 @@ class HubSpotMgmtDevTool(BaseTool):
         "Use this if the user asks to 'Run_Dev_Tool' and you are the HubSpot agent."
     )
     args_schema: Type[BaseModel] = DevToolInput
+    # The dev tool output is already the user-facing reply (see example_fast_path.py)
+    return_direct: bool = True
 
     def _run(self, task_description: Optional[str] = None) -> str:
         return (
@@ -192,19 +212,3 @@ class HubSpotMgmtDevTool(BaseTool):
 
     async def _arun(self, task_description: Optional[str] = None) -> str:
         return self._run(task_description)
-
-
-# Dictionary mapping agent node names to their respective dev tools for easy instantiation
-dev_tools_map = {
-    "slack_mgmt_agent": SlackDevTool,
-    "github_mgmt_agent": GitHubDevTool,
-    "therapist_agent": TherapistDevTool,
-    "logical_agent": LogicalDevTool,
-    "ckb_agent": CKBDevTool,
-    "email_mgmt_agent": EmailMgmtDevTool,
-    "calendar_mgmt_agent": CalendarMgmtDevTool,
-    "web_search_agent": WebSearchDevTool,
-    "customer_service_agent": CustomerServiceDevTool,
-    "hubspot_mgmt_agent": HubSpotMgmtDevTool,
-}
-
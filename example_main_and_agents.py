@@ -6,6 +6,8 @@
 # -- Imports -- #
 import asyncio
 import os
+from contextlib import nullcontext
+from datetime import datetime, tzinfo
 from dotenv import load_dotenv
 from typing import Annotated, Literal, Optional, List, Dict, Any
 
@@ -16,30 +18,74 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, Base
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 from langchain_core.messages import ToolMessage # New import
-from example_main_agent_tools import dev_tools_map # New import
+from example_agent_spec import agent_registry_from_env
+from example_batch_router import MicroBatchRouter
+from example_cassette import CassetteChatModel, cassette_from_env, wrap_dev_tools, wrap_tools
+from example_deadline import ainvoke_with_deadline, run_stage, with_deadline
+from example_rate_limiter import RateLimitedChatModel, controller_from_env, is_rate_limit_error
+from example_memory import memory_store_from_env
+from example_ckb_graph import CKBGraphQA, graph_store_from_env
+from example_calendar_index import FreeSlotsTool, calendar_index_from_env
+from example_github_client import GitHubIssuesTool, issue_index_from_env
+from example_hubspot_sync import HubSpotLogCallTool, HubSpotSearchTool, hubspot_sync_from_env
+from example_web_search import WebSearchTool, web_search_from_env
+from example_fast_path import synthesis_stats
+from example_context_packing import context_packer_from_env
+from example_embeddings import get_embedder
+from example_tokens import count_tokens
+from example_warmup import Warmup, preconnect_llm
+from example_profiling import CPU_PROFILE_ENABLED, cpu_profiler, loop_lag_monitor, span_profiler, write_profile
 
 load_dotenv()
 
+# --- Agent Spec --- #
+# The agents this deployment runs (EVA_AGENTS); nodes, routing and tools below are all derived from it
+agent_registry = agent_registry_from_env()
+
 # --- Instantiate Dev Tools --- #
 # Instantiate tools from the map; tool classes are mapped, so call them
 instantiated_dev_tools = {
-    agent_name: tool_class() for agent_name, tool_class in dev_tools_map.items()
+    agent_name: tool_class() for agent_name, tool_class in agent_registry.dev_tools_map().items()
 }
 
 # --- Configuration --- #
+# Optional record/replay of LLM and tool calls (EVA_CASSETTE_MODE=record|replay)
+cassette = cassette_from_env()
+replaying = cassette is not None and cassette.mode == "replay"
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
+if not OPENAI_API_KEY and not replaying:
     raise ValueError("OPENAI_API_KEY not found in environment variables.")
 
-llm = ChatOpenAI(model="gpt-4o-mini", api_key=OPENAI_API_KEY)
+# Optional shared client-side limiter for all LLM calls (EVA_LLM_LIMITER=on)
+llm_traffic_controller = controller_from_env()
+
+# Replay never reaches the provider, so it works on an offline machine without a key.
+# With the limiter on, 429s are retried by the limiter (which also backs off), not the client.
+llm = ChatOpenAI(
+    model="gpt-4o-mini", api_key=OPENAI_API_KEY or "cassette-replay",
+    **({"max_retries": 0} if llm_traffic_controller else {})
+)
+
+if llm_traffic_controller:
+    llm = RateLimitedChatModel(inner=llm, controller=llm_traffic_controller)
+
+# Per-request time budget in seconds, propagated to every stage of the graph. 0 disables it.
+REQUEST_DEADLINE_S = float(os.getenv("EVA_REQUEST_DEADLINE_S", "0"))
+
+if cassette:
+    print(f"📼 Cassette {cassette.mode} mode: {cassette.path}")
+    llm = CassetteChatModel(inner=llm, cassette=cassette)
+    instantiated_dev_tools = wrap_dev_tools(instantiated_dev_tools, cassette)
+
+async def prompt_now(tz: Optional[tzinfo] = None) -> datetime:
+    # The clock used in prompts; under a cassette it is recorded and replayed with the LLM calls
+    return await cassette.now(tz) if cassette else datetime.now(tz)
 
 # --- Pydantic Models --- #
 class RouteDecision(BaseModel):
-    next_agent: Literal[
-        "general_chat_agent", "slack_mgmt_agent", "github_mgmt_agent",
-        "therapist_agent", "logical_agent", "ckb_agent", "email_mgmt_agent",
-        "calendar_mgmt_agent", "web_search_agent", "customer_service_agent", "hubspot_mgmt_agent"
-    ] = Field(..., description="The agent to route the query to based on its content.")
+    # Generated from the enabled agents, so the router can only pick agents this deployment runs
+    next_agent: Literal[agent_registry.names] = Field(..., description="The agent to route the query to based on its content.")
     reasoning: Optional[str] = Field(None, description="Brief reasoning for the routing decision.")
 
 # --- State Definition --- #
@@ -49,45 +95,145 @@ class AgentState(TypedDict):
     next_agent: Optional[str]
     final_response: Optional[str]
     final_responder: Optional[str]
+    user_id: Optional[str]
+    memory_context: Optional[str]  # Top-k recalled long-term memories, appended to specialist prompts
     # tool_invocation: Optional[dict] = None # Add if tool use becomes more complex
 
+# --- Orchestrator Prompt --- #
+ORCHESTRATOR_SYSTEM_PROMPT = (
+    "You are EVA, a highly intelligent orchestrator AI. "
+    "Your role is to analyze the user's query and determine the most appropriate specialist agent to handle it. "
+    "Do not answer the query yourself. Only decide which agent should handle it."
+    "Available agents and their specializations are:\n"
+    + agent_registry.routing_prompt() +
+    "Based on the user's query, decide which single agent is most appropriate. Output your decision in the specified JSON format."
+)
+
+# --- Micro-Batched Routing (optional) --- #
+# When ORCHESTRATOR_BATCH_WINDOW_MS > 0, queries arriving within the window share one routing LLM call
+ORCHESTRATOR_BATCH_WINDOW_MS = float(os.getenv("ORCHESTRATOR_BATCH_WINDOW_MS", "0"))
+ORCHESTRATOR_MAX_BATCH_SIZE = int(os.getenv("ORCHESTRATOR_MAX_BATCH_SIZE", "16"))
+micro_batch_router = MicroBatchRouter(
+    llm, ORCHESTRATOR_SYSTEM_PROMPT, RouteDecision,
+    window_ms=ORCHESTRATOR_BATCH_WINDOW_MS, max_batch_size=ORCHESTRATOR_MAX_BATCH_SIZE
+) if ORCHESTRATOR_BATCH_WINDOW_MS > 0 else None
+
+# --- Long-Term Memory (optional) --- #
+# When EVA_MEMORY=on, facts about each user are remembered across conversations
+memory_store = memory_store_from_env(llm)
+
+async def recall_memory_context(state: AgentState) -> str:
+    user_id = state.get("user_id")
+    if not memory_store or not user_id:
+        return ""
+    try:
+        memories = await memory_store.recall(user_id, state["user_query"])
+    except Exception as e:
+        print(f"⚠️ Memory recall failed: {e}")
+        return ""
+    if memories:
+        print(f"🧠 Recalled {len(memories)} memories for {user_id}")
+    return memory_store.format_for_prompt(memories, state.get("messages"))
+
+# --- CKB Knowledge Graph (optional) --- #
+# When CKB_GRAPH_BACKEND is set, relation questions ("which services depend on X?") are answered
+# by a graph traversal in the ckb_agent, without any LLM call
+ckb_graph_store = graph_store_from_env() if agent_registry.enabled("ckb_agent") else None
+ckb_graph_qa = CKBGraphQA(ckb_graph_store) if ckb_graph_store else None
+
+# --- Calendar Free/Busy Index (optional) --- #
+# When CALENDAR_INDEX is set, the calendar_mgmt_agent gets a find_free_slots tool computed locally
+calendar_index = calendar_index_from_env() if agent_registry.enabled("calendar_mgmt_agent") else None
+free_slots_tool = FreeSlotsTool(index=calendar_index) if calendar_index else None
+
+# --- GitHub Issue Index (optional) --- #
+# When GITHUB_INDEX=on, the github_mgmt_agent lists issues from a local index with conditional refreshes
+github_issue_index = issue_index_from_env() if agent_registry.enabled("github_mgmt_agent") else None
+github_issues_tool = GitHubIssuesTool(index=github_issue_index) if github_issue_index else None
+
+# --- HubSpot Local CRM Copy (optional) --- #
+# When HUBSPOT_SYNC=on, CRM lookups are served from a background-synced local store and writes are batched
+hubspot_sync = hubspot_sync_from_env() if agent_registry.enabled("hubspot_mgmt_agent") else None
+hubspot_tools = [HubSpotSearchTool(sync=hubspot_sync), HubSpotLogCallTool(sync=hubspot_sync)] if hubspot_sync else []
+
+# --- Web Search Pipeline (optional) --- #
+# When WEB_SEARCH=on, the web_search_agent gets cached, concurrent search with token-budgeted passages
+web_search_pipeline = web_search_from_env() if agent_registry.enabled("web_search_agent") else None
+web_search_tool = WebSearchTool(pipeline=web_search_pipeline) if web_search_pipeline else None
+
+# --- Context Packing --- #
+# Per-agent token budgets for every prompt; oversized tool outputs are cut down to what is relevant
+# to the query, and each call's system/history/tools/query token breakdown is logged (EVA_CONTEXT_PACKING)
+context_packer = context_packer_from_env()
+
+def pack_context(agent_name: str, stage: str, messages: List[BaseMessage], user_query: str) -> List[BaseMessage]:
+    return context_packer.pack(agent_name, stage, messages, user_query) if context_packer else messages
+
+# --- Tool-Bound LLMs --- #
+# Optional tools each specialist gets next to its dev tool
+extra_agent_tools = {
+    "github_mgmt_agent": [github_issues_tool],
+    "calendar_mgmt_agent": [free_slots_tool],
+    "web_search_agent": [web_search_tool],
+    "hubspot_mgmt_agent": hubspot_tools,
+}
+if cassette:
+    # Replays must not reach Google, GitHub, HubSpot or the search API either
+    extra_agent_tools = {agent_name: wrap_tools(tools, cassette) for agent_name, tools in extra_agent_tools.items()}
+
+def agent_tools_for(agent_name: str) -> List[Any]:
+    return [t for t in [instantiated_dev_tools.get(agent_name), *extra_agent_tools.get(agent_name, [])] if t]
+
+# Tool schemas are converted once per agent (at warm-up or first use), not on every request
+_bound_llms: Dict[str, Any] = {}
+
+def bind_agent_tools(agent_name: str) -> Any:
+    if agent_name not in _bound_llms:
+        tools = agent_tools_for(agent_name)
+        _bound_llms[agent_name] = llm.bind_tools(tools) if tools else llm
+    return _bound_llms[agent_name]
+
+def structured_router_llm() -> Any:
+    if "orchestrator" not in _bound_llms:
+        _bound_llms["orchestrator"] = llm.with_structured_output(RouteDecision)
+    return _bound_llms["orchestrator"]
+
 # --- Agent Nodes --- #
 async def orchestrator_agent_node(state: AgentState) -> Dict[str, Any]:
     print("\n🧠 --- ORCHESTRATOR --- 🧠")
     user_query = state["user_query"]
-    system_prompt_content = (
-        "You are EVA, a highly intelligent orchestrator AI. "
-        "Your role is to analyze the user's query and determine the most appropriate specialist agent to handle it. "
-        "Do not answer the query yourself. Only decide which agent should handle it."
-        "Available agents and their specializations are:\n"
-        "- ckb_agent: For queries requiring information from our internal knowledge base (e.g., 'how does X work?', 'what are the specs for Y?').\n"
-        "- email_mgmt_agent: For tasks related to managing Gmail inbox (e.g., 'read new emails', 'draft a reply to X', 'search for email from Y').\n"
-        "- calendar_mgmt_agent: For tasks related to Google Calendar (e.g., 'create an event', 'check my schedule for tomorrow', 'find free slots').\n"
-        "- web_search_agent: For general web searches, current events, or information not in the CKB (e.g., 'what's the weather?', 'who won the game?').\n"
-        "- customer_service_agent: For customer-facing queries about Elevated Vector Automation, its products, or services (e.g., 'tell me about your company', 'what services do you offer?').\n"
-        "- slack_mgmt_agent: For tasks related to sending messages to Slack channels, listing Slack channels, or other Slack interactions.\n"
-        "- github_mgmt_agent: For tasks related to GitHub, such as creating or managing issues, listing repositories, commenting on issues, or getting repository details.\n"
-        "- hubspot_mgmt_agent: For CRM tasks in HubSpot (e.g., 'create a new contact', 'log a sales call', 'find company X details').\n"
-        "- therapist_agent: For emotional support, therapy, feelings, or personal problems.\n"
-        "- logical_agent: For facts, information, logical analysis, or practical solutions.\n"
-        "- general_chat_agent: For general conversation, greetings, or if no other specialist is suitable. This agent can also echo messages and provide the current date/time.\n"
-        "Based on the user's query, decide which single agent is most appropriate. Output your decision in the specified JSON format."
-    )
-    
-    router_llm = llm.with_structured_output(RouteDecision)
+    system_prompt_content = ORCHESTRATOR_SYSTEM_PROMPT
+
+    router_llm = structured_router_llm()
+
+    # Memory recall runs concurrently with routing, so it adds no latency of its own
+    memory_task = asyncio.ensure_future(recall_memory_context(state))
     
     try:
-        decision_result = await router_llm.ainvoke([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=user_query)
-        ])
-        print(f"🎯 Orchestrator decision: -> {decision_result.next_agent}, Reason: {decision_result.reasoning}")
-        return {"next_agent": decision_result.next_agent}
-    except Exception as e:
-        print(f"Error in orchestrator: {e} 🛑")
-        # Default to general chat agent on error
-        return {"next_agent": "general_chat_agent"}
-
+        try:
+            if micro_batch_router:
+                decision_result = await run_stage("orchestrator.llm", micro_batch_router.route(user_query))
+            else:
+                decision_result = await run_stage("orchestrator.llm", router_llm.ainvoke(pack_context("orchestrator", "llm", [
+                    SystemMessage(content=system_prompt_content),
+                    HumanMessage(content=user_query)
+                ], user_query)))
+            print(f"🎯 Orchestrator decision: -> {decision_result.next_agent}, Reason: {decision_result.reasoning}")
+            next_agent = decision_result.next_agent
+        except Exception as e:
+            if is_rate_limit_error(e):
+                print(f"🚥 Orchestrator still rate limited after retries: {e} 🛑")
+            else:
+                print(f"Error in orchestrator: {e} 🛑")
+            # Default to general chat agent on error
+            next_agent = "general_chat_agent"
+        return {"next_agent": next_agent, "memory_context": await memory_task}
+    finally:
+        # A deadline or cancellation must not leave the recall running unobserved
+        if not memory_task.done():
+            memory_task.cancel()
+
+@agent_registry.node("general_chat_agent")
 async def general_chat_agent_node(state: AgentState) -> Dict[str, Any]:
     print("💬 --- GENERAL CHAT AGENT ---")
     user_query = state["user_query"]
@@ -97,14 +243,15 @@ async def general_chat_agent_node(state: AgentState) -> Dict[str, Any]:
         "For other general questions, answer directly."
     )
     # Simplified: No actual tool calls in this version for example_main_with_tools.py
-    response = await llm.ainvoke([
-        SystemMessage(content=system_prompt_content),
+    response = await run_stage("general_chat_agent.llm", llm.ainvoke(pack_context("general_chat_agent", "llm", [
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
-    ])
+    ], user_query)))
     final_response = response.content
     print(f"💬 General Chat Agent response: {final_response}")
     return {"messages": add_messages(state["messages"], [AIMessage(content=final_response)]), "final_response": final_response, "final_responder": "general_chat_agent"}
 
+@agent_registry.node("slack_mgmt_agent")
 async def slack_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
     print("📱 --- SLACK MGMT AGENT ---")
     user_query = state["user_query"]
@@ -122,11 +269,11 @@ async def slack_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([slack_tool]) if slack_tool else llm
+    llm_with_tool = bind_agent_tools(agent_name)
     
     # Prepare initial messages for the first LLM call
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
 
@@ -135,7 +282,7 @@ async def slack_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
 
     try:
         # First LLM call, potentially invoking the tool
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
@@ -146,15 +293,18 @@ async def slack_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
             if tool_call['name'] == slack_tool.name:
                 # Ensure args is a dictionary, even if empty, for the tool's Pydantic model
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await slack_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", slack_tool.ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
                 # Second LLM call to synthesize response from tool output
                 # We send the history including the initial AI message (with tool_call) and the tool_message
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, slack_tool, tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -184,11 +334,11 @@ async def slack_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("github_mgmt_agent")
 async def github_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
     print("💻 --- GITHUB MGMT AGENT ---")
     user_query = state["user_query"]
     agent_name = "github_mgmt_agent"
-    github_tool = instantiated_dev_tools.get(agent_name) # Get the instantiated tool
 
     system_prompt_content = (
         "You are a helpful AI assistant specialized in GitHub repository management. "
@@ -200,32 +350,40 @@ async def github_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([github_tool]) if github_tool else llm
+    agent_tools = agent_tools_for(agent_name)
+    tools_by_name = {t.name: t for t in agent_tools}
+    if github_issues_tool:
+        system_prompt_content += "\nTo list or look up issues of a repository, use the 'list_github_issues' tool."
+
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
-        if ai_response_msg.tool_calls and github_tool:
+        if ai_response_msg.tool_calls and agent_tools:
             print(f"🛠️ {agent_name} attempting to use tool: {ai_response_msg.tool_calls[0]['name']}")
             tool_call = ai_response_msg.tool_calls[0]
 
-            if tool_call['name'] == github_tool.name:
+            if tool_call['name'] in tools_by_name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await github_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", tools_by_name[tool_call['name']].ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, tools_by_name[tool_call['name']], tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -252,6 +410,7 @@ async def github_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("therapist_agent")
 async def therapist_agent_node(state: AgentState) -> Dict[str, Any]:
     print("❤️‍🩹 --- THERAPIST AGENT ---")
     user_query = state["user_query"]
@@ -269,16 +428,16 @@ async def therapist_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
@@ -288,13 +447,16 @@ async def therapist_agent_node(state: AgentState) -> Dict[str, Any]:
 
             if tool_call['name'] == agent_tool.name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", agent_tool.ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, agent_tool, tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -321,6 +483,7 @@ async def therapist_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("logical_agent")
 async def logical_agent_node(state: AgentState) -> Dict[str, Any]:
     print("💡 --- LOGICAL AGENT ---")
     user_query = state["user_query"]
@@ -338,16 +501,16 @@ async def logical_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
@@ -357,13 +520,16 @@ async def logical_agent_node(state: AgentState) -> Dict[str, Any]:
 
             if tool_call['name'] == agent_tool.name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", agent_tool.ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, agent_tool, tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -390,6 +556,7 @@ async def logical_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("ckb_agent")
 async def ckb_agent_node(state: AgentState) -> Dict[str, Any]:
     print("📚 --- CKB AGENT ---")
     user_query = state["user_query"]
@@ -405,16 +572,26 @@ async def ckb_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        if ckb_graph_qa:
+            graph_answer = await run_stage(f"{agent_name}.graph", ckb_graph_qa.answer(user_query))
+            if graph_answer:
+                print(f"🕸️ {agent_name} answered from the knowledge graph")
+                return {
+                    "messages": add_messages(state["messages"], [AIMessage(content=graph_answer)]),
+                    "final_response": graph_answer,
+                    "final_responder": agent_name
+                }
+
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
@@ -424,13 +601,16 @@ async def ckb_agent_node(state: AgentState) -> Dict[str, Any]:
 
             if tool_call['name'] == agent_tool.name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", agent_tool.ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, agent_tool, tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -457,6 +637,7 @@ async def ckb_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("email_mgmt_agent")
 async def email_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
     print("📧 --- EMAIL MGMT AGENT ---")
     user_query = state["user_query"]
@@ -472,16 +653,16 @@ async def email_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
@@ -491,13 +672,16 @@ async def email_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
 
             if tool_call['name'] == agent_tool.name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", agent_tool.ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, agent_tool, tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -524,11 +708,11 @@ async def email_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("calendar_mgmt_agent")
 async def calendar_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
     print("📅 --- CALENDAR MGMT AGENT ---")
     user_query = state["user_query"]
     agent_name = "calendar_mgmt_agent"
-    agent_tool = instantiated_dev_tools.get(agent_name)
 
     system_prompt_content = (
         "You are an AI assistant for Google Calendar. You can create events, check schedules, and find free slots. "
@@ -539,32 +723,43 @@ async def calendar_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    agent_tools = agent_tools_for(agent_name)
+    tools_by_name = {t.name: t for t in agent_tools}
+    if free_slots_tool:
+        system_prompt_content += (
+            f"\nToday is {await prompt_now(calendar_index.tz):%A %Y-%m-%d}. For availability or 'find a free slot' questions, "
+            "use the 'find_free_slots' tool and present its slots to the user."
+        )
+
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
-        if ai_response_msg.tool_calls and agent_tool:
+        if ai_response_msg.tool_calls and agent_tools:
             print(f"🛠️ {agent_name} attempting to use tool: {ai_response_msg.tool_calls[0]['name']}")
             tool_call = ai_response_msg.tool_calls[0]
 
-            if tool_call['name'] == agent_tool.name:
+            if tool_call['name'] in tools_by_name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", tools_by_name[tool_call['name']].ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, tools_by_name[tool_call['name']], tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -591,11 +786,11 @@ async def calendar_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("web_search_agent")
 async def web_search_agent_node(state: AgentState) -> Dict[str, Any]:
     print("🌐 --- WEB SEARCH AGENT ---")
     user_query = state["user_query"]
     agent_name = "web_search_agent"
-    agent_tool = instantiated_dev_tools.get(agent_name)
 
     system_prompt_content = (
         "You are a web search assistant. You can find information on the internet about current events, facts, or general knowledge. "
@@ -606,32 +801,43 @@ async def web_search_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    agent_tools = agent_tools_for(agent_name)
+    tools_by_name = {t.name: t for t in agent_tools}
+    if web_search_tool:
+        system_prompt_content += (
+            "\nFor questions that need current or factual information from the internet, use the 'web_search' tool "
+            "and answer from its passages, citing the numbered sources."
+        )
+
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
-        if ai_response_msg.tool_calls and agent_tool:
+        if ai_response_msg.tool_calls and agent_tools:
             print(f"🛠️ {agent_name} attempting to use tool: {ai_response_msg.tool_calls[0]['name']}")
             tool_call = ai_response_msg.tool_calls[0]
 
-            if tool_call['name'] == agent_tool.name:
+            if tool_call['name'] in tools_by_name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", tools_by_name[tool_call['name']].ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, tools_by_name[tool_call['name']], tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -658,6 +864,7 @@ async def web_search_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("customer_service_agent")
 async def customer_service_agent_node(state: AgentState) -> Dict[str, Any]:
     print("🤝 --- CUSTOMER SERVICE AGENT ---")
     user_query = state["user_query"]
@@ -674,16 +881,16 @@ async def customer_service_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
@@ -693,13 +900,16 @@ async def customer_service_agent_node(state: AgentState) -> Dict[str, Any]:
 
             if tool_call['name'] == agent_tool.name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", agent_tool.ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, agent_tool, tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -726,11 +936,11 @@ async def customer_service_agent_node(state: AgentState) -> Dict[str, Any]:
             "final_responder": agent_name
         }
 
+@agent_registry.node("hubspot_mgmt_agent")
 async def hubspot_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
     print("📈 --- HUBSPOT MGMT AGENT ---")
     user_query = state["user_query"]
     agent_name = "hubspot_mgmt_agent"
-    agent_tool = instantiated_dev_tools.get(agent_name)
 
     system_prompt_content = (
         "You are an AI assistant for HubSpot CRM. You can manage contacts, companies, deals, and tasks. "
@@ -741,32 +951,43 @@ async def hubspot_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
         "you can use the user's query or a summary of it."
     )
 
-    llm_with_tool = llm.bind_tools([agent_tool]) if agent_tool else llm
+    agent_tools = agent_tools_for(agent_name)
+    tools_by_name = {t.name: t for t in agent_tools}
+    if hubspot_tools:
+        system_prompt_content += (
+            "\nUse 'search_crm' to look up contacts, companies and deals, and mention how fresh the data is. "
+            "Use 'log_crm_call' to log sales calls."
+        )
+
+    llm_with_tool = bind_agent_tools(agent_name)
     
     current_messages = [
-        SystemMessage(content=system_prompt_content),
+        SystemMessage(content=system_prompt_content + (state.get("memory_context") or "")),
         HumanMessage(content=user_query)
     ]
     all_messages_for_state_update = []
 
     try:
-        ai_response_msg = await llm_with_tool.ainvoke(current_messages)
+        ai_response_msg = await run_stage(f"{agent_name}.llm", llm_with_tool.ainvoke(pack_context(agent_name, "llm", current_messages, user_query)))
         all_messages_for_state_update.append(ai_response_msg)
         final_response_content = ""
 
-        if ai_response_msg.tool_calls and agent_tool:
+        if ai_response_msg.tool_calls and agent_tools:
             print(f"🛠️ {agent_name} attempting to use tool: {ai_response_msg.tool_calls[0]['name']}")
             tool_call = ai_response_msg.tool_calls[0]
 
-            if tool_call['name'] == agent_tool.name:
+            if tool_call['name'] in tools_by_name:
                 tool_args = tool_call['args'] if isinstance(tool_call['args'], dict) else {}
-                tool_output = await agent_tool.ainvoke(tool_args)
+                tool_output = await run_stage(f"{agent_name}.tool", tools_by_name[tool_call['name']].ainvoke(tool_args))
                 print(f"🛠️ {agent_name} tool output: {tool_output}")
                 tool_message = ToolMessage(content=str(tool_output), tool_call_id=tool_call['id'])
                 all_messages_for_state_update.append(tool_message)
 
-                messages_for_final_synthesis = current_messages + all_messages_for_state_update
-                final_llm_response = await llm_with_tool.ainvoke(messages_for_final_synthesis)
+                messages_for_final_synthesis = pack_context(agent_name, "synthesis", current_messages + all_messages_for_state_update, user_query)
+                final_llm_response = await synthesis_stats.respond(
+                    agent_name, tools_by_name[tool_call['name']], tool_output,
+                    lambda: run_stage(f"{agent_name}.synthesis", llm_with_tool.ainvoke(messages_for_final_synthesis))
+                )
                 all_messages_for_state_update.append(final_llm_response)
                 final_response_content = final_llm_response.content
             else:
@@ -796,76 +1017,103 @@ async def hubspot_mgmt_agent_node(state: AgentState) -> Dict[str, Any]:
 
 # --- Graph Definition --- #
 
+# Used when a request's deadline runs out: skip the remaining work and answer right away
+def deadline_fallback(state: AgentState, stage: str) -> Dict[str, Any]:
+    if stage == "orchestrator":
+        return {"next_agent": agent_registry.default_agent}
+    degraded_response = (
+        "Sorry, I couldn't finish working on your request in time. "
+        "Please try again, or ask a shorter or more specific question."
+    )
+    return {
+        "messages": add_messages(state["messages"], [AIMessage(content=degraded_response)]),
+        "final_response": degraded_response,
+        "final_responder": stage
+    }
+
 graph_builder = StateGraph(AgentState)
 
-graph_builder.add_node("orchestrator", orchestrator_agent_node)
-graph_builder.add_node("general_chat_agent", general_chat_agent_node)
-graph_builder.add_node("slack_mgmt_agent", slack_mgmt_agent_node)
-graph_builder.add_node("github_mgmt_agent", github_mgmt_agent_node)
-graph_builder.add_node("therapist_agent", therapist_agent_node)
-graph_builder.add_node("logical_agent", logical_agent_node)
-graph_builder.add_node("ckb_agent", ckb_agent_node)
-graph_builder.add_node("email_mgmt_agent", email_mgmt_agent_node)
-graph_builder.add_node("calendar_mgmt_agent", calendar_mgmt_agent_node)
-graph_builder.add_node("web_search_agent", web_search_agent_node)
-graph_builder.add_node("customer_service_agent", customer_service_agent_node)
-graph_builder.add_node("hubspot_mgmt_agent", hubspot_mgmt_agent_node)
+graph_builder.add_node("orchestrator", with_deadline(orchestrator_agent_node, "orchestrator", deadline_fallback))
+for agent_name in agent_registry.names:
+    graph_builder.add_node(agent_name, with_deadline(agent_registry.node_for(agent_name), agent_name, deadline_fallback))
 
 graph_builder.add_edge(START, "orchestrator")
 
 # Conditional routing from orchestrator
 def route_logic(state: AgentState) -> str:
     next_agent = state.get("next_agent")
-    defined_agents = [
-        "general_chat_agent", "slack_mgmt_agent", "github_mgmt_agent", 
-        "therapist_agent", "logical_agent", "ckb_agent", "email_mgmt_agent",
-        "calendar_mgmt_agent", "web_search_agent", "customer_service_agent", "hubspot_mgmt_agent"
-    ]
-    if next_agent in defined_agents:
-        return next_agent
-    # Fallback or error handling - default to general_chat_agent
-    print(f"⚠️ Warning: Unknown or unhandled agent '{next_agent}', defaulting to general_chat_agent.")
-    return "general_chat_agent"
-
-graph_builder.add_conditional_edges(
-    "orchestrator",
-    route_logic,
-    {
-        "general_chat_agent": "general_chat_agent",
-        "slack_mgmt_agent": "slack_mgmt_agent",
-        "github_mgmt_agent": "github_mgmt_agent",
-        "therapist_agent": "therapist_agent",
-        "logical_agent": "logical_agent",
-        "ckb_agent": "ckb_agent",
-        "email_mgmt_agent": "email_mgmt_agent",
-        "calendar_mgmt_agent": "calendar_mgmt_agent",
-        "web_search_agent": "web_search_agent",
-        "customer_service_agent": "customer_service_agent",
-        "hubspot_mgmt_agent": "hubspot_mgmt_agent"
-    }
-)
+    if not agent_registry.enabled(next_agent):
+        # Fallback or error handling - the registry routes unknown agents to general_chat_agent
+        print(f"⚠️ Warning: Unknown or unhandled agent '{next_agent}', defaulting to {agent_registry.default_agent}.")
+    return agent_registry.route(next_agent)
+
+graph_builder.add_conditional_edges("orchestrator", route_logic, agent_registry.route_table)
 
 # All specialist agents go to END for now
-graph_builder.add_edge("general_chat_agent", END)
-graph_builder.add_edge("slack_mgmt_agent", END)
-graph_builder.add_edge("github_mgmt_agent", END)
-graph_builder.add_edge("therapist_agent", END)
-graph_builder.add_edge("logical_agent", END)
-graph_builder.add_edge("ckb_agent", END)
-graph_builder.add_edge("email_mgmt_agent", END)
-graph_builder.add_edge("calendar_mgmt_agent", END)
-graph_builder.add_edge("web_search_agent", END)
-graph_builder.add_edge("customer_service_agent", END)
-graph_builder.add_edge("hubspot_mgmt_agent", END)
+for agent_name in agent_registry.names:
+    graph_builder.add_edge(agent_name, END)
 
 graph = graph_builder.compile()
 
+# --- Warm-Up --- #
+# Pays the first-use costs (connections, model and tokenizer loads, index syncs, tool schemas) before
+# the first request instead of during it; see example_warmup.py
+def build_warmup() -> Warmup:
+    warmup = Warmup()
+    if not replaying:
+        warmup.add("llm_connection", lambda: preconnect_llm(llm))
+
+    def bind_all_tools() -> None:
+        structured_router_llm()
+        for agent_name in agent_registry.names:
+            bind_agent_tools(agent_name)
+
+    warmup.add("tool_schemas", bind_all_tools)
+    warmup.add("tokenizer", lambda: count_tokens("warm-up"))
+    if memory_store:
+        warmup.add("embedder", lambda: get_embedder().embed(["warm-up"]))
+    if ckb_graph_store:
+        warmup.add("ckb_graph", ckb_graph_store.warm_up)
+    # A replay serves these tools from the cassette, so their backends are not contacted at all
+    if calendar_index and not replaying:
+        warmup.add("calendar_index", lambda: calendar_index.sync(force=True))
+    if github_issue_index and not replaying:
+        warmup.add("github_connection", github_issue_index.client.warm_up)
+    if web_search_pipeline and not replaying:
+        warmup.add("web_search_connection", web_search_pipeline.warm_up)
+    if hubspot_sync and not replaying:
+        async def sync_hubspot() -> None:
+            await hubspot_sync.sync_once()
+            hubspot_sync.start_background()
+        warmup.add("hubspot_sync", sync_hubspot)
+    return warmup
+
 # --- Chatbot Execution --- #
 async def run_chatbot():
     session_id_counter = 0
+    user_id = os.getenv("EVA_USER_ID", "local_user")
+    await build_warmup().run()
+    if CPU_PROFILE_ENABLED:
+        cpu_profiler.start()
     while True:
         user_input = input("Message: ")
         if user_input.lower() == "exit":
+            if memory_store:
+                await memory_store.drain()
+                print(f"🧠 Memory stats: {memory_store.stats()}")
+            if hubspot_sync:
+                await hubspot_sync.stop()
+                print(f"🤝 HubSpot sync stats: {hubspot_sync.stats()}")
+            print(f"⚡ Synthesis fast path: {synthesis_stats.report()}")
+            if context_packer:
+                print(f"📏 Prompt tokens: {context_packer.report()}")
+            if span_profiler.enabled:
+                print(f"🔬 Span profile written to {write_profile('repl_spans', span_profiler.folded())}")
+            if cpu_profiler.running:
+                # Samples taken while waiting in input() show up under the REPL's own frames
+                print(f"🔬 CPU profile written to {write_profile('repl_cpu', cpu_profiler.stop())}")
+            if loop_lag_monitor:
+                print(f"🐢 Event loop lag: {loop_lag_monitor.report()}")
             print("Bye")
             break
 
@@ -877,7 +1125,8 @@ async def run_chatbot():
             "user_query": user_input,
             "next_agent": None,
             "final_response": None,
-            "final_responder": None
+            "final_responder": None,
+            "user_id": user_id
         }
 
         # Configuration for invoking the graph, if needed (e.g., for checkpoints)
@@ -885,18 +1134,23 @@ async def run_chatbot():
 
         print(f"\n⏳ Processing for session: {current_session_id}...")
         try:
-            final_graph_state = await graph.ainvoke(initial_state, config=config)
+            # The lag monitor only watches graph runs; input() blocks the loop on purpose
+            with span_profiler.trace_request(current_session_id) as trace:
+                async with loop_lag_monitor.watch() if loop_lag_monitor else nullcontext():
+                    final_graph_state, deadline_report = await ainvoke_with_deadline(
+                        graph, initial_state, REQUEST_DEADLINE_S, config=config
+                    )
+            if trace:
+                print(f"🔬 Spans: {trace.summary()}")
+            if deadline_report and deadline_report["expired"]:
+                print(f"⏰ Deadline report: {deadline_report}")
             
             if final_graph_state and final_graph_state.get("final_response"):
                 responder = final_graph_state.get('final_responder', 'N/A')
-                emoji_map = {
-                    "general_chat_agent": "💬", "slack_mgmt_agent": "📱", "github_mgmt_agent": "💻",
-                    "therapist_agent": "❤️‍🩹", "logical_agent": "💡", "ckb_agent": "📚",
-                    "email_mgmt_agent": "📧", "calendar_mgmt_agent": "📅", "web_search_agent": "🌐",
-                    "customer_service_agent": "🤝", "hubspot_mgmt_agent": "📈", "N/A": "🤖"
-                }
-                responder_emoji = emoji_map.get(responder, "🤖")
+                responder_emoji = agent_registry.emoji(responder)
                 print(f"\n{responder_emoji} Assistant ({responder}): {final_graph_state['final_response']}")
+                if memory_store:
+                    memory_store.schedule_remember_turn(user_id, user_input, final_graph_state["final_response"])
             else:
                 # Fallback if final_response isn't set, check last message
                 if final_graph_state and final_graph_state.get("messages"):
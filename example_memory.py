@@ -0,0 +1,198 @@
+# Long-Term User Memory with Vector Recall
+# Description: After each turn, salient facts about the user are extracted by the LLM (in the
+#              background, off the response path), embedded and stored per user. At query time
+#              only the top-k memories relevant to the query are injected into the specialist's
+#              SystemMessage, instead of sending the full conversation history.
+#
+# Enable with EVA_MEMORY=on; storage path in EVA_MEMORY_DB, top-k in EVA_MEMORY_TOP_K and the
+# minimum cosine similarity for a memory to be injected in EVA_MEMORY_MIN_SIMILARITY.
+
+# -- Imports -- #
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from example_embeddings import aembed
+from example_stats import percentile
+from example_tokens import count_message_tokens, count_tokens
+
+EXTRACTION_PROMPT = (
+    "You maintain long-term memory for an AI assistant. From the exchange below, extract durable, "
+    "salient facts about the user that will help in future conversations: preferences, people, "
+    "projects, tools, accounts, recurring schedules and goals. Each fact must be one short, "
+    "self-contained sentence written in the third person (e.g. 'The user's manager is Alice.'). "
+    "Skip small talk, one-off requests and anything already obvious. Return an empty list if nothing is worth keeping."
+)
+# Facts closer than this to an existing memory are treated as duplicates
+DUPLICATE_SIMILARITY = 0.92
+
+
+class ExtractedMemories(BaseModel):
+    facts: List[str] = Field(default_factory=list, description="Durable facts about the user.")
+
+
+class MemoryStore:
+    def __init__(
+        self, llm: Any, path: str = "data/memory.db", top_k: int = 5,
+        min_similarity: float = 0.15, cache_ttl_s: float = 30.0
+    ):
+        self.path = path
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        # Other worker processes may add memories to the same database; re-read after this long
+        self.cache_ttl_s = cache_ttl_s
+        self._extractor = llm.with_structured_output(ExtractedMemories)
+        # Per-user (texts, normalized embedding matrix), loaded from SQLite on first use
+        self._cache: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._cache_loaded_at: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._background: Set[asyncio.Task] = set()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memories ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " embedding TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_user ON memories (user_id)")
+
+        # Metrics
+        self.recall_ms: List[float] = []
+        self.injected_tokens: List[int] = []
+        self.full_history_tokens: List[int] = []
+        self.facts_stored = 0
+
+    def _lock_for(self, user_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(user_id, asyncio.Lock())
+
+    def _load_user(self, user_id: str) -> Tuple[List[str], np.ndarray]:
+        with sqlite3.connect(self.path) as conn:
+            rows = conn.execute("SELECT text, embedding FROM memories WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
+        texts = [row[0] for row in rows]
+        matrix = np.asarray([json.loads(row[1]) for row in rows], dtype=np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+        return texts, matrix
+
+    async def _user_memories(self, user_id: str) -> Tuple[List[str], np.ndarray]:
+        loaded_at = self._cache_loaded_at.get(user_id)
+        if loaded_at is None or time.monotonic() - loaded_at > self.cache_ttl_s:
+            self._cache[user_id] = await asyncio.to_thread(self._load_user, user_id)
+            self._cache_loaded_at[user_id] = time.monotonic()
+        return self._cache[user_id]
+
+    # --- Recall --- #
+    async def recall(self, user_id: str, query: str, k: Optional[int] = None) -> List[str]:
+        start = time.perf_counter()
+        texts, matrix = await self._user_memories(user_id)
+        if not texts:
+            self.recall_ms.append((time.perf_counter() - start) * 1000)
+            return []
+        query_vector = (await aembed([query]))[0]
+        scores = matrix @ query_vector
+        k = min(k or self.top_k, len(texts))
+        top = np.argpartition(-scores, k - 1)[:k]
+        ranked = sorted(top, key=lambda i: -scores[i])
+        recalled = [texts[i] for i in ranked if scores[i] >= self.min_similarity]
+        self.recall_ms.append((time.perf_counter() - start) * 1000)
+        return recalled
+
+    def format_for_prompt(self, memories: List[str], history: Optional[List[Any]] = None) -> str:
+        block = ""
+        if memories:
+            block = "\n\nRelevant things you remember about this user:\n" + "\n".join(f"- {m}" for m in memories)
+        # Track what the memories cost versus replaying the whole conversation, on every call:
+        # a turn with nothing recalled still saves its full history
+        self.injected_tokens.append(count_tokens(block) if block else 0)
+        if history is not None:
+            self.full_history_tokens.append(count_message_tokens(history))
+        return block
+
+    # --- Extraction --- #
+    async def remember_turn(self, user_id: str, user_query: str, response: Optional[str]) -> int:
+        try:
+            result = await self._extractor.ainvoke([
+                SystemMessage(content=EXTRACTION_PROMPT),
+                HumanMessage(content=f"User: {user_query}\nAssistant: {response or ''}")
+            ])
+        except Exception as e:
+            print(f"⚠️ Memory extraction failed for {user_id}: {e}")
+            return 0
+        facts = [f.strip() for f in result.facts if f and f.strip()]
+        if not facts:
+            return 0
+        return await self.add_memories(user_id, facts)
+
+    async def add_memories(self, user_id: str, facts: List[str]) -> int:
+        vectors = await aembed(facts)
+        async with self._lock_for(user_id):
+            texts, matrix = await self._user_memories(user_id)
+            new_texts, new_vectors = [], []
+            for fact, vector in zip(facts, vectors):
+                existing = [matrix] if len(texts) else []
+                existing += [np.asarray(new_vectors)] if new_vectors else []
+                if existing and float(np.max(np.vstack(existing) @ vector)) >= DUPLICATE_SIMILARITY:
+                    continue
+                new_texts.append(fact)
+                new_vectors.append(vector)
+            if not new_texts:
+                return 0
+            now = time.time()
+            rows = [(user_id, t, json.dumps(v.tolist()), now) for t, v in zip(new_texts, new_vectors)]
+
+            def _insert() -> None:
+                with sqlite3.connect(self.path) as conn:
+                    conn.executemany("INSERT INTO memories (user_id, text, embedding, created_at) VALUES (?, ?, ?, ?)", rows)
+
+            await asyncio.to_thread(_insert)
+            stacked = np.vstack([matrix, np.asarray(new_vectors)]) if len(texts) else np.asarray(new_vectors, dtype=np.float32)
+            self._cache[user_id] = (texts + new_texts, stacked)
+            self.facts_stored += len(new_texts)
+            return len(new_texts)
+
+    def schedule_remember_turn(self, user_id: str, user_query: str, response: Optional[str]) -> None:
+        # Fire-and-forget so the user never waits for extraction
+        task = asyncio.ensure_future(self.remember_turn(user_id, user_query, response))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def drain(self) -> None:
+        if self._background:
+            await asyncio.gather(*list(self._background), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        injected = sum(self.injected_tokens) / len(self.injected_tokens) if self.injected_tokens else 0.0
+        history = sum(self.full_history_tokens) / len(self.full_history_tokens) if self.full_history_tokens else 0.0
+        return {
+            "facts_stored": self.facts_stored,
+            "recalls": len(self.recall_ms),
+            "recall_ms_p50": round(percentile(self.recall_ms, 50), 2),
+            "recall_ms_p95": round(percentile(self.recall_ms, 95), 2),
+            "avg_injected_tokens": round(injected, 1),
+            "avg_full_history_tokens": round(history, 1),
+            "prompt_tokens_saved_per_call": round(history - injected, 1),
+        }
+
+
+def memory_store_from_env(llm: Any) -> Optional[MemoryStore]:
+    if os.getenv("EVA_MEMORY", "off").strip().lower() not in ("on", "true", "1"):
+        return None
+    return MemoryStore(
+        llm,
+        path=os.getenv("EVA_MEMORY_DB", "data/memory.db"),
+        top_k=int(os.getenv("EVA_MEMORY_TOP_K", "5")),
+        min_similarity=float(os.getenv("EVA_MEMORY_MIN_SIMILARITY", "0.15")),
+        cache_ttl_s=float(os.getenv("EVA_MEMORY_CACHE_TTL_S", "30")),
+    )
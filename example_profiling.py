@@ -0,0 +1,304 @@
+# Profiling Hooks for Live Graph Runs
+# Description: Three low-overhead views of where a slow request spends its time:
+#              - SpanProfiler: per-request async span traces. Every graph node and every stage run
+#                through run_stage (orchestrator.llm, <agent>.llm / .tool / .synthesis) is a span;
+#                time not covered by a child span shows up as the parent's own time (LangGraph state
+#                merging, message construction, ...). Exported as collapsed stacks
+#                ("request;logical_agent;logical_agent.llm 812345"), which flamegraph.pl,
+#                speedscope and inferno all read.
+#              - SamplingProfiler: a stdlib sampling CPU profiler that periodically records the event
+#                loop thread's Python stack, started by a flag or on demand for N seconds.
+#              - LoopLagMonitor: a heartbeat on the loop plus a watchdog thread; when the heartbeat
+#                stalls, the watchdog captures what the loop thread is running and the node/stage
+#                span of the task that blocked it.
+#
+# Enable span traces with EVA_PROFILE=on, a whole-run CPU profile with EVA_CPU_PROFILE=on, and set
+# the loop-lag threshold with EVA_LOOP_LAG_MS (0 disables the monitor).
+
+# -- Imports -- #
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PROFILE_ENABLED = os.getenv("EVA_PROFILE", "off").strip().lower() in ("on", "true", "1")
+CPU_PROFILE_ENABLED = os.getenv("EVA_CPU_PROFILE", "off").strip().lower() in ("on", "true", "1")
+PROFILE_DIR = os.getenv("EVA_PROFILE_DIR", "data/profiles")
+LOOP_LAG_MS = float(os.getenv("EVA_LOOP_LAG_MS", "100"))
+
+
+def folded_text(stacks: Counter) -> str:
+    # Collapsed-stack format: "frame;frame;frame value", one stack per line
+    return "\n".join(f"{';'.join(path)} {int(value)}" for path, value in sorted(stacks.items()) if value > 0) + "\n"
+
+
+# --- Async Span Traces --- #
+class RequestTrace:
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started_at = time.perf_counter()
+        self.total_ms = 0.0
+        # (span path, duration in µs) for every finished span
+        self.spans: List[Tuple[Tuple[str, ...], float]] = []
+
+    def self_times(self) -> Counter:
+        totals: Counter = Counter()
+        for path, duration_us in self.spans:
+            totals[path] += duration_us
+        self_us = Counter(totals)
+        for path, duration_us in totals.items():
+            if len(path) > 1:
+                self_us[path[:-1]] -= duration_us
+        # Concurrent children can add up to more than their parent's wall time
+        return Counter({path: max(0.0, us) for path, us in self_us.items()})
+
+    def summary(self, top: int = 8) -> Dict[str, Any]:
+        totals: Counter = Counter()
+        for path, duration_us in self.spans:
+            totals[path[-1]] += duration_us
+        return {
+            "request_id": self.request_id,
+            "total_ms": round(self.total_ms, 1),
+            "spans_ms": {name: round(us / 1000, 1) for name, us in totals.most_common(top + 1) if name != "request"},
+        }
+
+
+current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("current_trace", default=None)
+current_span_path: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("current_span_path", default=())
+# Span path of every task, readable from the loop-lag watchdog thread (contextvars are not)
+_task_span_paths: "weakref.WeakKeyDictionary[asyncio.Task, Tuple[str, ...]]" = weakref.WeakKeyDictionary()
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    # The path is always tracked (for loop-lag attribution); timings only inside a traced request
+    path = current_span_path.get()
+    if path and path[-1] == name:
+        yield
+        return
+    token = current_span_path.set(path + (name,))
+    task = _current_task()
+    if task is not None:
+        _task_span_paths[task] = path + (name,)
+    trace = current_trace.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.spans.append((path + (name,), (time.perf_counter() - start) * 1_000_000))
+        current_span_path.reset(token)
+        if task is not None:
+            _task_span_paths[task] = path
+
+
+class SpanProfiler:
+    def __init__(self, enabled: bool = PROFILE_ENABLED, keep: int = 200):
+        self.enabled = enabled
+        self.recent: deque = deque(maxlen=keep)
+        self.aggregate: Counter = Counter()
+
+    @contextmanager
+    def trace_request(self, request_id: str) -> Iterator[Optional[RequestTrace]]:
+        if not self.enabled:
+            yield None
+            return
+        trace = RequestTrace(request_id)
+        trace_token = current_trace.set(trace)
+        path_token = current_span_path.set(("request",))
+        try:
+            yield trace
+        finally:
+            current_span_path.reset(path_token)
+            current_trace.reset(trace_token)
+            trace.total_ms = (time.perf_counter() - trace.started_at) * 1000
+            trace.spans.append((("request",), trace.total_ms * 1000))
+            self.aggregate.update(trace.self_times())
+            self.recent.append(trace)
+
+    def find(self, request_id: str) -> Optional[RequestTrace]:
+        return next((t for t in reversed(self.recent) if t.request_id == request_id), None)
+
+    def folded(self, request_id: Optional[str] = None) -> str:
+        if request_id is None:
+            return folded_text(self.aggregate)
+        trace = self.find(request_id)
+        return folded_text(trace.self_times()) if trace else ""
+
+
+# --- Sampling CPU Profiler --- #
+def _frame_stack(frame: Any, limit: int = 64) -> Tuple[str, ...]:
+    stack = []
+    while frame is not None and len(stack) < limit:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+class SamplingProfiler:
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, target_thread_id: Optional[int] = None) -> None:
+        if self.running:
+            raise RuntimeError("A CPU profile is already running.")
+        target = target_thread_id or threading.get_ident()
+        self.samples = Counter()
+        self._stop.clear()
+
+        def sample() -> None:
+            while not self._stop.wait(self.interval_s):
+                frame = sys._current_frames().get(target)
+                if frame is not None:
+                    self.samples[_frame_stack(frame)] += 1
+
+        self._thread = threading.Thread(target=sample, name="eva-cpu-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return folded_text(self.samples)
+
+    async def profile_for(self, seconds: float) -> str:
+        # Samples the thread running the event loop while the loop keeps serving requests
+        self.start(threading.get_ident())
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            folded = self.stop()
+        return folded
+
+
+# --- Event-Loop Lag --- #
+class LoopLagMonitor:
+    def __init__(self, threshold_ms: float = LOOP_LAG_MS, interval_s: float = 0.05, keep: int = 100):
+        self.threshold_ms = threshold_ms
+        self.interval_s = interval_s
+        self.events: deque = deque(maxlen=keep)
+        self.blocked_ms_by_stage: Counter = Counter()
+        self.max_lag_ms = 0.0
+        self._last_beat = time.monotonic()
+        self._captured: Optional[Tuple[str, ...]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+            lag_ms = (time.monotonic() - self._last_beat - self.interval_s) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.threshold_ms:
+                self._record(lag_ms, self._captured)
+            self._captured = None
+
+    def _watchdog(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int, stop: threading.Event) -> None:
+        stall_s = self.interval_s + self.threshold_ms / 1000
+        while not stop.wait(self.interval_s / 2):
+            if self._captured is None and time.monotonic() - self._last_beat > stall_s:
+                frame = sys._current_frames().get(loop_thread_id)
+                task = asyncio.current_task(loop)
+                span_path = _task_span_paths.get(task, ()) if task is not None else ()
+                self._captured = (span_path, _frame_stack(frame) if frame is not None else ())
+
+    def _record(self, lag_ms: float, captured: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]) -> None:
+        span_path, stack = captured or ((), ())
+        # Spans name the graph node and stage; the captured stack says which call blocked
+        stage = " > ".join(p for p in span_path if p != "request") or None
+        blocked_in = stack[-1] if stack else "unknown"
+        self.events.append({"lag_ms": round(lag_ms, 1), "stage": stage, "blocked_in": blocked_in, "stack": list(stack[-8:])})
+        self.blocked_ms_by_stage[stage or "outside graph nodes"] += lag_ms
+        print(f"🐢 Event loop blocked for {lag_ms:.0f} ms in {stage or 'code outside graph nodes'} ({blocked_in})")
+
+    def _task_factory(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        # Child tasks (asyncio.wait_for, gather) inherit the span path of the task that created them
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        parent = _current_task()
+        if parent is not None and parent in _task_span_paths:
+            _task_span_paths[task] = _task_span_paths[parent]
+        return task
+
+    def start(self) -> None:
+        if self._task:
+            return
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is None:
+            loop.set_task_factory(self._task_factory)
+        self._stop = threading.Event()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        threading.Thread(
+            target=self._watchdog, args=(loop, threading.get_ident(), self._stop), name="eva-loop-watchdog", daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        if self._task:
+            # A block just before stop() (the last stretch of a watched request) has not been measured
+            # by the heartbeat yet; measure it here instead of dropping it with the heartbeat
+            lag_ms = (time.monotonic() - self._last_beat - self.interval_s) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.threshold_ms:
+                self._record(lag_ms, self._captured)
+            self._captured = None
+            self._task.cancel()
+            self._task = None
+        self._stop.set()
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() == self._task_factory:
+            loop.set_task_factory(None)
+
+    @asynccontextmanager
+    async def watch(self):
+        # For callers that block the loop on purpose between runs (the REPL's input())
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "blocked_ms_by_stage": {stage: round(ms, 1) for stage, ms in self.blocked_ms_by_stage.most_common()},
+            "recent_events": list(self.events)[-10:],
+        }
+
+
+def write_profile(name: str, folded: str) -> Optional[str]:
+    if not folded.strip():
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(folded)
+    return path
+
+
+span_profiler = SpanProfiler()
+cpu_profiler = SamplingProfiler()
+loop_lag_monitor = LoopLagMonitor() if LOOP_LAG_MS > 0 else None
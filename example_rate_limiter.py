@@ -0,0 +1,289 @@
+# Client-Side LLM Traffic Control
+# Description: A shared limiter in front of the chat model that combines request- and token-based
+#              token buckets with AIMD adaptive concurrency (driven by observed latency and 429s)
+#              and priority classes, so interactive traffic is served ahead of batch jobs.
+#
+# Enable with EVA_LLM_LIMITER=on; tune with EVA_LLM_RPM, EVA_LLM_TPM, EVA_LLM_MAX_CONCURRENCY
+# and EVA_LLM_TARGET_LATENCY_MS. Batch entry points run under the "batch" priority class.
+
+# -- Imports -- #
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict
+
+from example_cassette import forward_structured_output
+from example_stats import percentile
+
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("current_priority", default="interactive")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+# --- Token Bucket --- #
+class TokenBucket:
+    def __init__(self, rate_per_s: float, capacity: float):
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_s)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # Requests larger than the bucket would wait forever; let them drain it instead
+        amount = min(amount, self.capacity)
+        # Reserve under the lock and sleep outside it: the balance may go negative, so later
+        # callers queue behind earlier reservations without waiting on the lock itself
+        async with self._lock:
+            self._refill()
+            self.tokens -= amount
+            wait_s = -self.tokens / self.rate_per_s if self.tokens < 0 else 0.0
+        if wait_s:
+            try:
+                await asyncio.sleep(wait_s)
+            except asyncio.CancelledError:
+                self.adjust(-amount)  # hand the reservation back
+                raise
+
+    def adjust(self, delta: float) -> None:
+        # Corrects an estimate once the real usage is known; may go negative to repay a debt
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+# --- Adaptive Concurrency (AIMD) --- #
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        target_latency_ms: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        decrease_cooldown_s: float = 1.0,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        # Without an explicit target, latency above twice the best observed one counts as overload
+        self.target_latency_ms = target_latency_ms
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown_s = decrease_cooldown_s
+        self.in_flight = 0
+        self.min_latency_ms: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {name: 0 for name in PRIORITY_CLASSES}
+        names = {rank: name for name, rank in PRIORITY_CLASSES.items()}
+        for rank, _, future in self._waiters:
+            if not future.done():
+                depth[names[rank]] += 1
+        return depth
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # cancelled while waiting
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: str = "interactive") -> None:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITY_CLASSES.get(priority, 1), next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as we were cancelled; hand it back
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, latency_ms: Optional[float] = None, overloaded: bool = False) -> None:
+        self.in_flight -= 1
+        if latency_ms is not None and not overloaded:
+            self.min_latency_ms = latency_ms if self.min_latency_ms is None else min(self.min_latency_ms, latency_ms)
+            threshold = self.target_latency_ms or 2 * self.min_latency_ms
+            overloaded = latency_ms > threshold
+        if overloaded:
+            now = time.monotonic()
+            # One multiplicative decrease per cooldown, so a burst of 429s from one window counts once
+            if now - self._last_decrease >= self.decrease_cooldown_s:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+        elif latency_ms is not None:
+            # Additive increase: about +1 slot per limit's worth of successful calls
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+
+# --- Combined Controller --- #
+class LLMTrafficController:
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 32,
+        initial_concurrency: int = 8,
+        target_latency_ms: Optional[float] = None,
+        max_retries: int = 3,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60)) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 6) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial_limit=min(initial_concurrency, max_concurrency),
+            max_limit=max_concurrency,
+            target_latency_ms=target_latency_ms,
+        )
+        self.max_retries = max_retries
+
+        # Metrics
+        self.requests = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.tokens_used = 0
+        self.wait_ms: Dict[str, Deque[float]] = {name: deque(maxlen=1000) for name in PRIORITY_CLASSES}
+
+    async def _admit(self, priority: str, estimated_tokens: int) -> float:
+        start = time.perf_counter()
+        await self.concurrency.acquire(priority)
+        try:
+            if self.request_bucket:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket:
+                await self.token_bucket.acquire(estimated_tokens)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        waited_ms = (time.perf_counter() - start) * 1000
+        self.wait_ms.setdefault(priority, deque(maxlen=1000)).append(waited_ms)
+        return waited_ms
+
+    async def call(self, make_call: Any, estimated_tokens: int, priority: Optional[str] = None) -> Any:
+        priority = priority or current_priority.get()
+        attempt = 0
+        while True:
+            await self._admit(priority, estimated_tokens)
+            self.requests += 1
+            start = time.perf_counter()
+            try:
+                result = await make_call()
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    self.rate_limited += 1
+                    self.concurrency.release(overloaded=True)
+                    if attempt < self.max_retries:
+                        attempt += 1
+                        backoff_s = min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                        print(f"🚥 LLM rate limited (429); retry {attempt}/{self.max_retries} in {backoff_s:.2f}s")
+                        await asyncio.sleep(backoff_s)
+                        continue
+                    self.failed += 1
+                else:
+                    self.failed += 1
+                    self.concurrency.release()
+                raise
+            except BaseException:
+                self.concurrency.release()
+                raise
+            self.concurrency.release(latency_ms=(time.perf_counter() - start) * 1000)
+            return result
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        if actual_tokens is None:
+            actual_tokens = estimated_tokens
+        self.tokens_used += actual_tokens
+        if self.token_bucket:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "queue_depth": self.concurrency.queue_depth(),
+            "wait_ms_avg": {
+                name: round(sum(w) / len(w), 2) if w else 0.0 for name, w in self.wait_ms.items()
+            },
+            "wait_ms_p95": {name: round(percentile(list(w), 95), 2) for name, w in self.wait_ms.items()},
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+            "tokens_used": self.tokens_used,
+        }
+
+
+# --- Chat Model Wrapper --- #
+class RateLimitedChatModel(BaseChatModel):
+    inner: BaseChatModel
+    controller: Any
+    expected_output_tokens: int = 256
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.inner._llm_type}"
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any):
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def with_structured_output(self, schema: Any, **kwargs: Any):
+        # Keep the inner model's structured-output method (json_schema for ChatOpenAI)
+        return forward_structured_output(self, self.inner, schema, **kwargs)
+
+    def _estimate_tokens(self, messages: List[Any], kwargs: Dict[str, Any]) -> int:
+        # ~4 characters per token; corrected from the provider's usage once the call returns
+        chars = sum(len(str(m.content)) for m in messages) + len(str(kwargs.get("tools") or ""))
+        return chars // 4 + self.expected_output_tokens
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        kwargs.pop("ls_structured_output_format", None)
+        estimated = self._estimate_tokens(messages, kwargs)
+        result = await self.controller.call(
+            lambda: self.inner._agenerate(messages, stop=stop, **kwargs), estimated
+        )
+        usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+        self.controller.record_usage(estimated, usage.get("total_tokens") if usage else None)
+        return result
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return asyncio.run(self._agenerate(messages, stop=stop, **kwargs))
+
+
+def controller_from_env() -> Optional[LLMTrafficController]:
+    if os.getenv("EVA_LLM_LIMITER", "off").strip().lower() not in ("on", "true", "1"):
+        return None
+    rpm = os.getenv("EVA_LLM_RPM")
+    tpm = os.getenv("EVA_LLM_TPM")
+    target = os.getenv("EVA_LLM_TARGET_LATENCY_MS")
+    return LLMTrafficController(
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None,
+        max_concurrency=int(os.getenv("EVA_LLM_MAX_CONCURRENCY", "32")),
+        target_latency_ms=float(target) if target else None,
+    )
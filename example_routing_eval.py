@@ -0,0 +1,331 @@
+# Routing Evaluation Suite for the EVA Orchestrator
+# Description: Scores a router against a labeled dataset on accuracy, confusion matrix,
+#              latency percentiles and token cost. Compares the live orchestrator LLM, an
+#              embedding router (nearest agent description, no LLM call), a cached router
+#              (normalized-query cache in front of another router) and recorded decisions
+#              replayed offline through a fake chat model.
+#
+# A router is any async callable `query -> decision`, where the decision is either an agent
+# name or an object with a `next_agent` attribute (e.g. `RouteDecision`).
+#
+# Usage:
+#   python example_routing_eval.py                      # replays data/routing_predictions_sample.json
+#   python example_routing_eval.py --router orchestrator --save-predictions data/routing_predictions.json
+#   python example_routing_eval.py --router recorded --recorded data/routing_predictions.json
+#   python example_routing_eval.py --router embedding
+#   python example_routing_eval.py --router cached --cached-base embedding --passes 2
+
+# -- Imports -- #
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import get_usage_metadata_callback
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from example_stats import percentile
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_DATASET_PATH = os.path.join(DATA_DIR, "routing_eval_dataset.jsonl")
+# Replayed by the default run; see the README for how it was produced
+DEFAULT_RECORDED_PATH = os.path.join(DATA_DIR, "routing_predictions_sample.json")
+
+Router = Callable[[str], Awaitable[Any]]
+
+
+# --- Dataset --- #
+def load_dataset(path: str = DEFAULT_DATASET_PATH) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# --- Offline Fake Model --- #
+class RecordedRoutingChatModel(BaseChatModel):
+    # Answers structured-output routing calls from a {query: agent} map, so the real
+    # `with_structured_output(RouteDecision)` path runs without a provider.
+    responses: Dict[str, str] = Field(default_factory=dict)
+    default_agent: str = "general_chat_agent"
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded-routing"
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> ChatResult:
+        query = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        agent = self.responses.get(query, self.default_agent)
+        # Rough 4-characters-per-token estimate keeps token cost comparable across runs
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = 16
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        if tools:
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": tools[0]["function"]["name"],
+                    "args": {"next_agent": agent, "reasoning": "recorded"},
+                    "id": "call_recorded",
+                }],
+                usage_metadata=usage,
+                response_metadata={"model_name": self._llm_type},
+            )
+        else:
+            message = AIMessage(content=agent, usage_metadata=usage, response_metadata={"model_name": self._llm_type})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._respond(messages, kwargs.get("tools"))
+
+
+# --- Routers --- #
+def make_orchestrator_router(chat_model: Any, system_prompt: str, decision_model: Any) -> Router:
+    # Mirrors the call made by `orchestrator_agent_node`
+    router_llm = chat_model.with_structured_output(decision_model)
+
+    async def route(query: str) -> Any:
+        return await router_llm.ainvoke([
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=query)
+        ])
+
+    return route
+
+
+class EmbeddingRouter:
+    # Routes to the agent whose description is most similar to the query. No LLM call, so
+    # latency and token cost are near zero; accuracy depends on the embedding model.
+    def __init__(self, descriptions: Dict[str, str], embedder: Any, default_agent: str, min_similarity: float = 0.0):
+        self.agents = list(descriptions)
+        self.embedder = embedder
+        self.default_agent = default_agent
+        self.min_similarity = min_similarity
+        self.prototypes = embedder.embed([f"{name.replace('_', ' ')}: {text}" for name, text in descriptions.items()])
+
+    async def __call__(self, query: str) -> str:
+        vector = (await asyncio.to_thread(self.embedder.embed, [query]))[0]
+        scores = self.prototypes @ vector
+        best = int(scores.argmax())
+        if scores[best] < self.min_similarity:
+            return self.default_agent
+        return self.agents[best]
+
+
+class CachedRouter:
+    # Normalized-query LRU cache in front of another router; repeated queries skip the inner call
+    def __init__(self, inner: Router, max_entries: int = 10000):
+        self.inner = inner
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(re.findall(r"\w+", query.lower()))
+
+    async def __call__(self, query: str) -> str:
+        key = self.normalize(query)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        agent = _agent_name(await self.inner(query))
+        # Failed or unusable decisions are not cached, so the next call retries the inner router
+        if agent != "unknown":
+            self._cache[key] = agent
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return agent
+
+
+def _agent_name(decision: Any) -> str:
+    if isinstance(decision, str):
+        return decision
+    return getattr(decision, "next_agent", None) or "unknown"
+
+
+# --- Evaluation --- #
+async def evaluate_router(
+    router: Router,
+    dataset: List[Dict[str, str]],
+    price_per_1k_input: float = 0.0,
+    price_per_1k_output: float = 0.0,
+) -> Dict[str, Any]:
+    # Items run one at a time so latencies are not distorted by contention
+    predictions: List[Dict[str, Any]] = []
+    latencies_ms: List[float] = []
+    input_tokens = 0
+    output_tokens = 0
+    errors = 0
+
+    for item in dataset:
+        start = time.perf_counter()
+        with get_usage_metadata_callback() as usage_cb:
+            try:
+                predicted = _agent_name(await router(item["query"]))
+            except Exception as e:
+                print(f"💥 Router error on {item.get('id')}: {e}")
+                predicted = "error"
+                errors += 1
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        for usage in usage_cb.usage_metadata.values():
+            input_tokens += usage.get("input_tokens", 0)
+            output_tokens += usage.get("output_tokens", 0)
+        predictions.append({**item, "predicted_agent": predicted})
+
+    confusion: Dict[str, Counter] = defaultdict(Counter)
+    per_agent_total: Counter = Counter()
+    per_agent_correct: Counter = Counter()
+    for p in predictions:
+        confusion[p["expected_agent"]][p["predicted_agent"]] += 1
+        per_agent_total[p["expected_agent"]] += 1
+        if p["predicted_agent"] == p["expected_agent"]:
+            per_agent_correct[p["expected_agent"]] += 1
+
+    total = len(predictions)
+    correct = sum(per_agent_correct.values())
+    cost = input_tokens / 1000 * price_per_1k_input + output_tokens / 1000 * price_per_1k_output
+    return {
+        "total": total,
+        "correct": correct,
+        "errors": errors,
+        "accuracy": round(correct / total, 4) if total else 0.0,
+        "per_agent_accuracy": {
+            agent: round(per_agent_correct[agent] / n, 4) for agent, n in sorted(per_agent_total.items())
+        },
+        "confusion_matrix": {agent: dict(row) for agent, row in sorted(confusion.items())},
+        "latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 2),
+            "p90": round(percentile(latencies_ms, 90), 2),
+            "p99": round(percentile(latencies_ms, 99), 2),
+            "max": round(max(latencies_ms), 2) if latencies_ms else 0.0,
+        },
+        "tokens": {
+            "input": input_tokens,
+            "output": output_tokens,
+            "per_query": round((input_tokens + output_tokens) / total, 1) if total else 0.0,
+        },
+        "estimated_cost": round(cost, 6),
+        "predictions": predictions,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n📊 Routing accuracy: {report['accuracy']:.1%} ({report['correct']}/{report['total']}, {report['errors']} errors)")
+    print(f"⏱️ Latency ms: {report['latency_ms']}")
+    print(f"🪙 Tokens: {report['tokens']}, estimated cost: ${report['estimated_cost']}")
+    print("🎯 Per-agent accuracy:")
+    for agent, accuracy in report["per_agent_accuracy"].items():
+        misroutes = {k: v for k, v in report["confusion_matrix"][agent].items() if k != agent}
+        suffix = f"  misrouted -> {misroutes}" if misroutes else ""
+        print(f"   {agent:<24} {accuracy:.0%}{suffix}")
+
+
+# --- CLI --- #
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate EVA orchestrator routing accuracy and latency.")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH, help="Labeled JSONL dataset.")
+    router_choices = ["orchestrator", "recorded", "embedding", "cached"]
+    parser.add_argument(
+        "--router", choices=router_choices, default="recorded",
+        help=(
+            "'orchestrator' calls the live LLM; 'recorded' replays saved predictions offline; "
+            "'embedding' picks the nearest agent description; 'cached' puts a query cache in front of --cached-base."
+        )
+    )
+    parser.add_argument("--recorded", default=DEFAULT_RECORDED_PATH, help="JSON {query: agent} map used by the recorded router.")
+    parser.add_argument("--recorded-latency-ms", type=float, default=0.0, help="Simulated latency for the recorded router.")
+    parser.add_argument("--cached-base", choices=router_choices[:3], default="orchestrator", help="Router behind the cached router.")
+    parser.add_argument("--min-similarity", type=float, default=0.0, help="Embedding router falls back to the default agent below this score.")
+    parser.add_argument("--passes", type=int, default=1, help="Run the dataset this many times and report the last pass (warm caches).")
+    parser.add_argument("--save-predictions", default=None, help="Write {query: predicted_agent} for later offline replay.")
+    parser.add_argument("--report", default=None, help="Write the full JSON report to this path.")
+    parser.add_argument("--price-per-1k-input", type=float, default=0.00015)
+    parser.add_argument("--price-per-1k-output", type=float, default=0.0006)
+    args = parser.parse_args()
+    if args.passes < 1:
+        parser.error("--passes must be at least 1")
+    base = args.cached_base if args.router == "cached" else args.router
+    if base == "recorded" and not os.path.exists(args.recorded):
+        # Without recorded predictions every query would fall back to the default agent
+        parser.error(f"{args.recorded} not found; create one with --router orchestrator --save-predictions PATH")
+    return args
+
+
+def build_router(kind: str, args: argparse.Namespace, responses: Dict[str, str]) -> Router:
+    from example_main_and_agents import ORCHESTRATOR_SYSTEM_PROMPT, RouteDecision, agent_registry, llm
+
+    if kind == "embedding":
+        from example_embeddings import get_embedder
+        descriptions = {name: spec.description for name, spec in agent_registry.specs.items()}
+        return EmbeddingRouter(descriptions, get_embedder(), agent_registry.default_agent, args.min_similarity)
+    if kind == "recorded":
+        chat_model = RecordedRoutingChatModel(responses=responses, latency_ms=args.recorded_latency_ms)
+    else:
+        chat_model = llm
+    return make_orchestrator_router(chat_model, ORCHESTRATOR_SYSTEM_PROMPT, RouteDecision)
+
+
+async def main() -> None:
+    args = parse_args()
+    base = args.cached_base if args.router == "cached" else args.router
+    if base != "orchestrator":
+        # Offline routers never reach the provider; a placeholder key lets the main module import
+        os.environ.setdefault("OPENAI_API_KEY", "offline-eval")
+    from example_main_and_agents import RouteDecision
+
+    responses: Dict[str, str] = {}
+    if base == "recorded":
+        with open(args.recorded, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+    router = build_router(base, args, responses)
+    if args.router == "cached":
+        router = CachedRouter(router)
+
+    dataset = load_dataset(args.dataset)
+    known_agents = set(RouteDecision.model_fields["next_agent"].annotation.__args__)
+    missing = known_agents - {item["expected_agent"] for item in dataset}
+    if missing:
+        print(f"⚠️ Dataset has no examples for: {sorted(missing)}")
+    if base == "recorded":
+        unrecorded = sum(1 for item in dataset if item["query"] not in responses)
+        if unrecorded:
+            print(f"⚠️ {unrecorded}/{len(dataset)} queries have no recorded prediction and count as {RecordedRoutingChatModel().default_agent}")
+
+    for _ in range(args.passes):
+        report = await evaluate_router(router, dataset, args.price_per_1k_input, args.price_per_1k_output)
+    print_report(report)
+    if isinstance(router, CachedRouter):
+        print(f"🗃️ Cache: {router.hits} hits, {router.misses} misses over {args.passes} pass(es)")
+
+    if args.save_predictions:
+        with open(args.save_predictions, "w", encoding="utf-8") as f:
+            json.dump({p["query"]: p["predicted_agent"] for p in report["predictions"]}, f, indent=2, ensure_ascii=False)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+# Multi-Worker Scaling Benchmark
+# Description: Starts example_server.py under gunicorn with 1..N workers, drives it with
+#              concurrent multi-turn conversations and reports throughput and latency per
+#              worker count. Threads alternate between workers, which also checks that the
+#              shared session store lets any worker continue any conversation.
+#
+# For repeatable offline numbers, replay a recorded cassette with its original timing:
+#   EVA_CASSETTE_MODE=replay EVA_CASSETTE_PATH=cassettes/bench.jsonl EVA_CASSETTE_TIMING=original \
+#   python example_scaling_bench.py prompts.jsonl --workers 1 2 4 8 --requests 400 --concurrency 64
+
+# -- Imports -- #
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from example_server import gunicorn_command
+from example_stats import percentile
+
+
+def load_prompts(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    return [item.get("query") or item.get("prompt") for item in items if item.get("query") or item.get("prompt")]
+
+
+async def wait_until_ready(base_url: str, workers: int = 1, timeout_s: float = 60.0) -> None:
+    # /readyz (not /healthz) so no request is measured before warm-up finished; fresh connections
+    # reach different workers, and every one of them has to report ready
+    deadline = time.monotonic() + timeout_s
+    ready_pids = set()
+    async with httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0)) as client:
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get(f"{base_url}/readyz")
+                if response.status_code == 200:
+                    ready_pids.add(response.json().get("worker_pid"))
+                    if len(ready_pids) >= workers:
+                        return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1 if ready_pids else 0.25)
+    raise TimeoutError(f"Server at {base_url} had {len(ready_pids)}/{workers} workers ready after {timeout_s}s")
+
+
+async def drive_load(base_url: str, prompts: List[str], total_requests: int, concurrency: int, turns_per_thread: int) -> Dict[str, Any]:
+    latencies_ms: List[float] = []
+    worker_pids = set()
+    errors = 0
+    threads_continued_elsewhere = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    # No keep-alive: every request is a fresh connection, like many independent clients, so
+    # the kernel spreads them over workers instead of pinning them to whichever accepted first
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+
+        async def conversation(thread_index: int) -> None:
+            nonlocal errors, threads_continued_elsewhere
+            thread_id = f"bench-{os.getpid()}-{time.time_ns()}-{thread_index}"
+            pids = set()
+            for turn in range(turns_per_thread):
+                prompt = prompts[(thread_index * turns_per_thread + turn) % len(prompts)]
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.post("/chat", json={"thread_id": thread_id, "message": prompt})
+                        response.raise_for_status()
+                        pids.add(response.json()["worker_pid"])
+                    except httpx.HTTPError:
+                        errors += 1
+                        continue
+                    latencies_ms.append((time.perf_counter() - start) * 1000)
+            worker_pids.update(pids)
+            if len(pids) > 1:
+                threads_continued_elsewhere += 1
+
+        thread_count = max(1, total_requests // turns_per_thread)
+        start = time.perf_counter()
+        await asyncio.gather(*[conversation(i) for i in range(thread_count)])
+        elapsed = time.perf_counter() - start
+
+    completed = len(latencies_ms)
+    return {
+        "requests": completed,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms_p50": round(percentile(latencies_ms, 50), 2),
+        "latency_ms_p95": round(percentile(latencies_ms, 95), 2),
+        "workers_seen": len(worker_pids),
+        "threads_served_by_multiple_workers": threads_continued_elsewhere,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    prompts = load_prompts(args.prompts)
+    results = []
+    session_dir = tempfile.mkdtemp(prefix="eva_bench_")
+    for workers in args.workers:
+        env = {**os.environ, "EVA_SESSION_STORE_URL": os.getenv(
+            "EVA_SESSION_STORE_URL", f"sqlite:///{os.path.join(session_dir, f'sessions_{workers}.db')}"
+        )}
+        bind = f"127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            gunicorn_command(workers, bind), env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        try:
+            await wait_until_ready(f"http://{bind}", workers)
+            print(f"⏳ Benchmarking {workers} worker(s)...")
+            result = await drive_load(f"http://{bind}", prompts, args.requests, args.concurrency, args.turns)
+            result["workers"] = workers
+            results.append(result)
+            print(f"📈 {result}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    baseline = results[0]["throughput_rps"] if results and results[0]["throughput_rps"] else None
+    print("\nworkers  throughput_rps  speedup  p50_ms    p95_ms")
+    for r in results:
+        speedup = r["throughput_rps"] / baseline if baseline else 0.0
+        print(f"{r['workers']:>7}  {r['throughput_rps']:>14}  {speedup:>6.2f}x  {r['latency_ms_p50']:>8}  {r['latency_ms_p95']:>8}")
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark EVA throughput scaling from 1 to N workers.")
+    parser.add_argument("prompts", help="JSONL file with {'query'} objects to send.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to test.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per worker count.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent in-flight requests.")
+    parser.add_argument("--turns", type=int, default=2, help="Turns per conversation thread.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path.")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(run_benchmark(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if all(r["errors"] == 0 for r in results) else 1)
@@ -0,0 +1,220 @@
+# HTTP Serving for the EVA Graph (multi-worker)
+# Description: FastAPI app exposing the compiled graph. Conversation threads live in a shared
+#              session store (see example_session_store.py), so the app can run under gunicorn
+#              with many uvicorn workers and any worker can continue any thread.
+#              Each worker warms up at start (example_warmup.py); /readyz answers 503 until it has.
+#
+# Usage:
+#   python example_server.py --workers 8 --bind 0.0.0.0:8000
+#   (equivalent to: gunicorn example_server:app -k uvicorn.workers.UvicornWorker -w 8 -b 0.0.0.0:8000)
+#
+#   curl -X POST localhost:8000/chat -H 'content-type: application/json' \
+#        -d '{"thread_id": "t1", "message": "what is on my calendar tomorrow?"}'
+
+# -- Imports -- #
+import argparse
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from langchain_core.messages import HumanMessage, messages_to_dict
+from pydantic import BaseModel, Field
+
+from example_deadline import ainvoke_with_deadline
+from example_fast_path import synthesis_stats
+from example_main_and_agents import REQUEST_DEADLINE_S, AgentState, build_warmup, context_packer, graph, llm_traffic_controller, memory_store
+from example_profiling import CPU_PROFILE_ENABLED, cpu_profiler, loop_lag_monitor, span_profiler, write_profile
+from example_session_store import SessionStore, session_store_from_url
+from example_warmup import LatencyTracker, Warmup
+
+# Only the most recent messages are loaded per turn, so long threads do not slow every request
+SESSION_HISTORY_LIMIT = int(os.getenv("EVA_SESSION_HISTORY_LIMIT", "50"))
+# Required in the X-Admin-Token header for /admin endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("EVA_ADMIN_TOKEN")
+
+session_store: Optional[SessionStore] = None
+warmup: Optional[Warmup] = None
+latency_tracker = LatencyTracker()
+
+
+# --- API Models --- #
+class ChatRequest(BaseModel):
+    thread_id: str = Field(..., description="Conversation thread; any worker can continue it.")
+    message: str = Field(..., description="The user's message.")
+    user_id: Optional[str] = Field(None, description="Owner of long-term memories; defaults to the thread id.")
+
+
+class ChatResponse(BaseModel):
+    thread_id: str
+    response: Optional[str]
+    responder: Optional[str]
+    worker_pid: int
+    latency_ms: float
+    cold: bool = False
+    deadline: Optional[Dict[str, Any]] = None
+
+
+# --- App --- #
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global session_store, warmup
+    session_store = session_store_from_url()
+    warmup = build_warmup()
+    warmup.add("session_store", lambda: session_store.load("__warmup__", limit=1))
+    # Warm-up runs in the background so /healthz answers right away; /readyz flips once it is done
+    warmup_task = asyncio.ensure_future(warmup.run())
+    warmup_task.add_done_callback(lambda _: print(f"🚀 Worker {os.getpid()} ready"))
+    if loop_lag_monitor:
+        loop_lag_monitor.start()
+    if CPU_PROFILE_ENABLED:
+        cpu_profiler.start()
+    yield
+    warmup_task.cancel()
+    if loop_lag_monitor:
+        loop_lag_monitor.stop()
+    if cpu_profiler.running:
+        print(f"🔬 CPU profile written to {write_profile(f'cpu_worker{os.getpid()}', cpu_profiler.stop())}")
+    await session_store.close()
+
+
+app = FastAPI(title="EVA Multi-Agent Graph", lifespan=lifespan)
+
+
+@app.get("/healthz")
+async def healthz() -> Dict[str, Any]:
+    health: Dict[str, Any] = {"status": "ok", "worker_pid": os.getpid()}
+    if llm_traffic_controller:
+        health["llm_limiter"] = llm_traffic_controller.metrics()
+    if memory_store:
+        health["memory"] = memory_store.stats()
+    health["synthesis"] = synthesis_stats.report()
+    if context_packer:
+        health["prompt_tokens"] = context_packer.report()
+    health["latency"] = latency_tracker.report()
+    if loop_lag_monitor:
+        health["loop_lag"] = loop_lag_monitor.report()
+    return health
+
+
+@app.get("/readyz")
+async def readyz() -> JSONResponse:
+    report = warmup.report() if warmup else {"ready": False}
+    return JSONResponse({**report, "worker_pid": os.getpid()}, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/threads/{thread_id}")
+async def get_thread(thread_id: str) -> Dict[str, Any]:
+    messages = await session_store.load(thread_id)
+    return {"thread_id": thread_id, "messages": messages_to_dict(messages)}
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest) -> Any:
+    start = time.perf_counter()
+    cold = not warmup.ready.is_set()
+    history = await session_store.load(request.thread_id, limit=SESSION_HISTORY_LIMIT)
+    human_message = HumanMessage(content=request.message)
+
+    initial_state: AgentState = {
+        "messages": history + [human_message],
+        "user_query": request.message,
+        "next_agent": None,
+        "final_response": None,
+        "final_responder": None,
+        "user_id": request.user_id or request.thread_id
+    }
+    config = {"configurable": {"session_id": request.thread_id}}
+    try:
+        with span_profiler.trace_request(request.thread_id):
+            final_graph_state, deadline_report = await ainvoke_with_deadline(
+                graph, initial_state, REQUEST_DEADLINE_S, config=config
+            )
+
+        # Persist only this turn's messages; history rows are already in the store.
+        # The append is one transaction, so a failed turn leaves the thread as it was.
+        known_ids = {m.id for m in history if m.id}
+        new_messages = [m for m in final_graph_state.get("messages", []) if not m.id or m.id not in known_ids]
+        await session_store.append(request.thread_id, new_messages)
+    except Exception as e:
+        print(f"💥 /chat failed for thread {request.thread_id}: {type(e).__name__}: {e}")
+        return JSONResponse(
+            {
+                "error": "chat_failed",
+                "detail": f"{type(e).__name__}: {e}",
+                "thread_id": request.thread_id,
+                "worker_pid": os.getpid(),
+                "persisted": False,
+            },
+            status_code=500,
+        )
+    if memory_store and final_graph_state.get("final_response"):
+        memory_store.schedule_remember_turn(initial_state["user_id"], request.message, final_graph_state["final_response"])
+
+    latency_ms = (time.perf_counter() - start) * 1000
+    latency_tracker.record(latency_ms, cold)
+    return ChatResponse(
+        thread_id=request.thread_id,
+        response=final_graph_state.get("final_response"),
+        responder=final_graph_state.get("final_responder"),
+        worker_pid=os.getpid(),
+        latency_ms=round(latency_ms, 2),
+        cold=cold,
+        deadline=deadline_report,
+    )
+
+
+# --- Admin: Profiling --- #
+def require_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints need EVA_ADMIN_TOKEN and a matching X-Admin-Token header.")
+
+
+@app.get("/admin/profile/traces")
+async def profile_traces(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    require_admin(x_admin_token)
+    return {"enabled": span_profiler.enabled, "recent": [t.summary() for t in list(span_profiler.recent)[-20:]]}
+
+
+@app.get("/admin/profile/flamegraph", response_class=PlainTextResponse)
+async def profile_flamegraph(thread_id: Optional[str] = None, x_admin_token: Optional[str] = Header(None)) -> str:
+    # Collapsed stacks of span self-times (µs), for all traced requests or the latest one of a thread
+    require_admin(x_admin_token)
+    return span_profiler.folded(thread_id)
+
+
+@app.post("/admin/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(seconds: float = 10.0, x_admin_token: Optional[str] = Header(None)) -> str:
+    require_admin(x_admin_token)
+    if cpu_profiler.running:
+        raise HTTPException(status_code=409, detail="A CPU profile is already running in this worker.")
+    return await cpu_profiler.profile_for(min(seconds, 120.0))
+
+
+# --- CLI --- #
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the EVA graph with gunicorn + uvicorn workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    parser.add_argument("--bind", default="0.0.0.0:8000", help="Address to bind to.")
+    parser.add_argument("--timeout", type=int, default=120, help="Gunicorn worker timeout in seconds.")
+    return parser.parse_args()
+
+
+def gunicorn_command(workers: int, bind: str, timeout: int = 120) -> list:
+    return [
+        "gunicorn", "example_server:app",
+        "--worker-class", "uvicorn.workers.UvicornWorker",
+        "--workers", str(workers),
+        "--bind", bind,
+        "--timeout", str(timeout),
+    ]
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    command = gunicorn_command(args.workers, args.bind, args.timeout)
+    print(f"🚀 Starting: {' '.join(command)}")
+    os.execvp(command[0], command)
@@ -0,0 +1,329 @@
+# Slack Events Receiver for the EVA Graph
+# Description: Receives Slack Events API callbacks and feeds channel messages into the graph.
+#              - Retried deliveries (Slack re-sends an event when the ack is slow) are deduplicated by event_id.
+#              - Bursts of messages in the same channel/thread are coalesced into one graph turn.
+#              - Replies go through an outbox that merges pending posts per channel and respects
+#                Slack's ~1 message/second/channel limit, backing off on 429 Retry-After.
+#
+# Usage:
+#   python example_fake_slack.py serve --port 8010                   # optional local Slack API stand-in
+#   SLACK_API_BASE_URL=http://localhost:8010/api/ uvicorn example_slack_events:app --port 8000
+#   Point the Slack app's Event Subscriptions at https://<host>/slack/events
+
+# -- Imports -- #
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response
+from langchain_core.messages import HumanMessage
+from slack_sdk.errors import SlackApiError
+from slack_sdk.signature import SignatureVerifier
+from slack_sdk.web.async_client import AsyncWebClient
+
+from example_deadline import ainvoke_with_deadline
+from example_rate_limiter import TokenBucket
+from example_session_store import SessionStore, session_store_from_url
+
+# Slack's limit on a single message's text
+SLACK_MAX_TEXT_CHARS = 40000
+
+
+def _configured(value: Optional[str]) -> Optional[str]:
+    return None if not value or value.startswith("YOUR_") else value
+
+
+# --- Deduplication --- #
+class EventDeduplicator:
+    def __init__(self, ttl_s: float = 600.0, max_entries: int = 10000):
+        # Slack retries for up to ~1 hour in practice, but nearly all retries land within minutes
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.duplicates = 0
+
+    def is_duplicate(self, event_id: str) -> bool:
+        now = time.monotonic()
+        while self._seen and (len(self._seen) > self.max_entries or now - next(iter(self._seen.values())) > self.ttl_s):
+            self._seen.popitem(last=False)
+        if event_id in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen[event_id] = now
+        return False
+
+
+# --- Burst Coalescing --- #
+class ChannelCoalescer:
+    def __init__(self, handler, window_s: float = 1.5, max_messages: int = 20):
+        # handler(channel, thread_ts, messages) is awaited once per coalesced burst
+        self.handler = handler
+        self.window_s = window_s
+        self.max_messages = max_messages
+        self._buffers: Dict[Tuple[str, Optional[str]], List[Dict[str, Any]]] = {}
+        self._timers: Dict[Tuple[str, Optional[str]], asyncio.Task] = {}
+        self._inflight: set = set()
+        self.messages_in = 0
+        self.turns_out = 0
+
+    def add(self, channel: str, thread_ts: Optional[str], message: Dict[str, Any]) -> None:
+        key = (channel, thread_ts)
+        self.messages_in += 1
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(message)
+        if len(buffer) >= self.max_messages:
+            timer = self._timers.pop(key, None)
+            if timer:
+                timer.cancel()
+            self._start(self._flush(key))
+        elif key not in self._timers:
+            self._timers[key] = asyncio.ensure_future(self._flush_after_window(key))
+
+    def _start(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _flush_after_window(self, key: Tuple[str, Optional[str]]) -> None:
+        await asyncio.sleep(self.window_s)
+        self._timers.pop(key, None)
+        self._start(self._flush(key))
+
+    async def _flush(self, key: Tuple[str, Optional[str]]) -> None:
+        messages = self._buffers.pop(key, [])
+        if not messages:
+            return
+        self.turns_out += 1
+        try:
+            await self.handler(key[0], key[1], messages)
+        except Exception as e:
+            print(f"💥 Slack turn failed for channel {key[0]}: {e}")
+
+    async def drain(self) -> None:
+        for key, timer in list(self._timers.items()):
+            timer.cancel()
+            self._timers.pop(key, None)
+            self._start(self._flush(key))
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+
+# --- Outbound Batching --- #
+class SlackOutbox:
+    def __init__(self, client: AsyncWebClient, per_channel_interval_s: float = 1.0, global_rate_per_s: float = 20.0):
+        self.client = client
+        self.per_channel_interval_s = per_channel_interval_s
+        self.global_bucket = TokenBucket(global_rate_per_s, max(1.0, global_rate_per_s))
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._last_post_at: Dict[str, float] = {}
+        self.posts_requested = 0
+        self.posts_sent = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    async def post(self, channel: str, text: str, thread_ts: Optional[str] = None) -> None:
+        self.posts_requested += 1
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = asyncio.Queue()
+            self._workers[channel] = asyncio.ensure_future(self._channel_worker(channel, queue))
+        await queue.put((thread_ts, text))
+
+    async def _channel_worker(self, channel: str, queue: asyncio.Queue) -> None:
+        # Posts for other threads skipped while merging wait here, not back in the queue: they were
+        # taken with get() once and must be settled with task_done() exactly once, when posted
+        held: Deque[Tuple[Optional[str], str]] = deque()
+        while True:
+            thread_ts, text = held.popleft() if held else await queue.get()
+            wait = self._last_post_at.get(channel, 0.0) + self.per_channel_interval_s - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Merge everything that queued up for the same thread while we were waiting
+            candidates = list(held)
+            held.clear()
+            while not queue.empty():
+                candidates.append(queue.get_nowait())
+            parts = [text]
+            for next_ts, next_text in candidates:
+                if next_ts == thread_ts and sum(len(p) for p in parts) + len(next_text) + 2 <= SLACK_MAX_TEXT_CHARS:
+                    parts.append(next_text)
+                else:
+                    held.append((next_ts, next_text))
+            try:
+                await self._send(channel, thread_ts, "\n\n".join(parts))
+            finally:
+                # Always settle the merged items, or drain()/close() would wait on them forever
+                for _ in parts:
+                    queue.task_done()
+
+    async def _send(self, channel: str, thread_ts: Optional[str], text: str, max_attempts: int = 5) -> None:
+        for attempt in range(max_attempts):
+            await self.global_bucket.acquire()
+            try:
+                await self.client.chat_postMessage(channel=channel, text=text, thread_ts=thread_ts)
+                self._last_post_at[channel] = time.monotonic()
+                self.posts_sent += 1
+                return
+            except SlackApiError as e:
+                if e.response.status_code != 429:
+                    print(f"💥 Slack post to {channel} failed: {e.response.get('error')}")
+                    break
+                self.rate_limited += 1
+                retry_after = float(e.response.headers.get("Retry-After", e.response.headers.get("retry-after", 1)))
+                print(f"⏳ Slack rate limited on {channel}; retrying in {retry_after:.0f}s")
+                await asyncio.sleep(retry_after)
+            except Exception as e:
+                # Transport errors (connection reset, timeout) fail this post, not the channel's worker
+                print(f"💥 Slack post to {channel} failed: {type(e).__name__}: {e}")
+                break
+        self.failed += 1
+
+    async def drain(self) -> None:
+        for queue in self._queues.values():
+            await queue.join()
+
+    async def close(self) -> None:
+        await self.drain()
+        for worker in self._workers.values():
+            worker.cancel()
+
+
+# --- Event Service --- #
+class SlackEventService:
+    def __init__(
+        self, graph: Any, client: AsyncWebClient, session_store: SessionStore,
+        coalesce_window_s: float = 1.5, history_limit: int = 50, deadline_s: float = 0.0
+    ):
+        self.graph = graph
+        self.client = client
+        self.session_store = session_store
+        self.history_limit = history_limit
+        self.deadline_s = deadline_s
+        self.deduplicator = EventDeduplicator()
+        self.coalescer = ChannelCoalescer(self._run_turn, window_s=coalesce_window_s)
+        self.outbox = SlackOutbox(client)
+        self.bot_user_id: Optional[str] = None
+        self.events_received = 0
+        self.events_ignored = 0
+
+    async def start(self) -> None:
+        try:
+            self.bot_user_id = (await self.client.auth_test()).get("user_id")
+        except Exception as e:
+            print(f"⚠️ Slack auth.test failed ({e}); the bot's own messages are filtered by bot_id only.")
+
+    def handle_payload(self, payload: Dict[str, Any]) -> None:
+        # Called on the request path: must only enqueue, Slack expects an ack within 3 seconds
+        self.events_received += 1
+        event_id = payload.get("event_id")
+        if event_id and self.deduplicator.is_duplicate(event_id):
+            return
+        event = payload.get("event", {})
+        if (
+            event.get("type") not in ("message", "app_mention")
+            or event.get("subtype")
+            or event.get("bot_id")
+            or (self.bot_user_id and event.get("user") == self.bot_user_id)
+            or not event.get("text")
+        ):
+            self.events_ignored += 1
+            return
+        self.coalescer.add(event["channel"], event.get("thread_ts"), {"user": event.get("user"), "text": event["text"]})
+
+    async def _run_turn(self, channel: str, thread_ts: Optional[str], messages: List[Dict[str, Any]]) -> None:
+        thread_id = f"slack:{channel}:{thread_ts or 'main'}"
+        text = "\n".join(m["text"] for m in messages)
+        history = await self.session_store.load(thread_id, limit=self.history_limit)
+        initial_state = {
+            "messages": history + [HumanMessage(content=text)],
+            "user_query": text,
+            "next_agent": None,
+            "final_response": None,
+            "final_responder": None,
+            "user_id": messages[-1].get("user") or thread_id
+        }
+        final_state, _ = await ainvoke_with_deadline(
+            self.graph, initial_state, self.deadline_s, config={"configurable": {"session_id": thread_id}}
+        )
+        known_ids = {m.id for m in history if m.id}
+        await self.session_store.append(thread_id, [m for m in final_state.get("messages", []) if not m.id or m.id not in known_ids])
+        if final_state.get("final_response"):
+            await self.outbox.post(channel, final_state["final_response"], thread_ts)
+
+    async def drain(self) -> None:
+        await self.coalescer.drain()
+        await self.outbox.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events_received": self.events_received,
+            "duplicates_dropped": self.deduplicator.duplicates,
+            "events_ignored": self.events_ignored,
+            "messages_coalesced": self.coalescer.messages_in,
+            "graph_turns": self.coalescer.turns_out,
+            "posts_requested": self.outbox.posts_requested,
+            "posts_sent": self.outbox.posts_sent,
+            "rate_limited": self.outbox.rate_limited,
+            "posts_failed": self.outbox.failed,
+        }
+
+
+# --- App --- #
+slack_service: Optional[SlackEventService] = None
+signature_verifier: Optional[SignatureVerifier] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global slack_service, signature_verifier
+    from example_main_and_agents import REQUEST_DEADLINE_S, graph
+
+    signing_secret = _configured(os.getenv("SLACK_APP_CLIENT_SIGNING_SECRET"))
+    if signing_secret:
+        signature_verifier = SignatureVerifier(signing_secret)
+    else:
+        print("⚠️ SLACK_APP_CLIENT_SIGNING_SECRET not set; request signatures are NOT verified.")
+    client = AsyncWebClient(
+        token=_configured(os.getenv("SLACK_BOT_TOKEN")) or "xoxb-local",
+        base_url=os.getenv("SLACK_API_BASE_URL", "https://slack.com/api/"),
+    )
+    session_store = session_store_from_url()
+    slack_service = SlackEventService(
+        graph, client, session_store,
+        coalesce_window_s=float(os.getenv("SLACK_COALESCE_WINDOW_S", "1.5")),
+        history_limit=int(os.getenv("EVA_SESSION_HISTORY_LIMIT", "50")),
+        deadline_s=REQUEST_DEADLINE_S,
+    )
+    await slack_service.start()
+    print("📱 Slack events receiver ready")
+    yield
+    await slack_service.drain()
+    await slack_service.outbox.close()
+    await session_store.close()
+    print(f"📊 Slack receiver stats: {slack_service.stats()}")
+
+
+app = FastAPI(title="EVA Slack Events", lifespan=lifespan)
+
+
+@app.post("/slack/events")
+async def slack_events(request: Request) -> Response:
+    body = await request.body()
+    if signature_verifier and not signature_verifier.is_valid_request(body, dict(request.headers)):
+        return Response(status_code=401)
+    payload = json.loads(body or b"{}")
+    if payload.get("type") == "url_verification":
+        return Response(content=json.dumps({"challenge": payload.get("challenge")}), media_type="application/json")
+    if payload.get("type") == "event_callback":
+        slack_service.handle_payload(payload)
+    return Response(status_code=200)
+
+
+@app.get("/slack/stats")
+async def slack_stats() -> Dict[str, Any]:
+    return slack_service.stats()
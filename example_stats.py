@@ -0,0 +1,27 @@
+# Latency Statistics Helpers
+# Description: Nearest-rank percentiles and compact latency summaries shared by the
+#              benchmarks, the routing eval and the runtime stats endpoints.
+
+# -- Imports -- #
+from typing import Any, Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    # Nearest-rank on the sorted values; 0.0 for an empty sample
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def latency_summary(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "avg_ms": round(sum(values) / len(values), 1),
+        "p50_ms": round(percentile(values, 50), 1),
+        "p95_ms": round(percentile(values, 95), 1),
+        "max_ms": round(max(values), 1),
+    }
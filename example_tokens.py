@@ -0,0 +1,46 @@
+# Token Counting Helpers
+# Description: tiktoken-based token counts for prompts and messages. Falls back to a
+#              ~4 characters-per-token estimate when the encoding cannot be loaded
+#              (e.g. tiktoken is missing or the BPE file cannot be downloaded offline).
+
+# -- Imports -- #
+from functools import lru_cache
+from typing import Any, List, Optional
+
+# gpt-4o / gpt-4o-mini encoding
+DEFAULT_ENCODING = "o200k_base"
+# Per-message framing overhead in the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(name: str) -> Optional[Any]:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"⚠️ tiktoken encoding '{name}' unavailable ({type(e).__name__}); estimating tokens from length.")
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Any], encoding_name: str = DEFAULT_ENCODING) -> int:
+    return sum(count_tokens(str(m.content), encoding_name) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,111 @@
+# Service Warm-Up and Readiness
+# Description: Moves first-use costs out of the first user request. A Warmup runs named steps
+#              concurrently at start-up (pre-opening pooled connections to the LLM provider and
+#              external APIs, loading the embedding model and tokenizer, syncing local indexes,
+#              building the tool-bound LLMs) and only then reports ready. LatencyTracker keeps
+#              request latencies served before the process was warm apart from warm ones, so the
+#              cold-start penalty is visible instead of averaged away.
+#
+# Disable with EVA_WARMUP=off to measure a cold start.
+#
+# Usage:
+#   python example_warmup.py          # run the warm-up once and print the per-step timings
+
+# -- Imports -- #
+import asyncio
+import inspect
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from example_stats import latency_summary
+
+WARMUP_ENABLED = os.getenv("EVA_WARMUP", "on").strip().lower() not in ("off", "false", "0")
+WARMUP_TIMEOUT_S = float(os.getenv("EVA_WARMUP_TIMEOUT_S", "30"))
+
+
+def unwrap_chat_model(model: Any) -> Any:
+    # RateLimitedChatModel / CassetteChatModel wrap the provider model in `inner`
+    while hasattr(model, "inner"):
+        model = model.inner
+    return model
+
+
+async def preconnect_llm(model: Any) -> None:
+    # Lists models over the same pooled client the chat completions use, so DNS, TCP and TLS are done
+    client = getattr(unwrap_chat_model(model), "root_async_client", None)
+    if client is None:
+        return
+    # No retries: a provider outage should show up as a failed step, not stall start-up
+    await client.with_options(max_retries=0).models.list()
+
+
+class Warmup:
+    def __init__(self, timeout_s: float = WARMUP_TIMEOUT_S):
+        self.timeout_s = timeout_s
+        self._steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+        self.total_ms: Optional[float] = None
+
+    def add(self, name: str, step: Callable[[], Any]) -> None:
+        # Coroutine functions run on the loop; plain callables (model loads, file reads) on a thread,
+        # and an awaitable they return is awaited on the loop
+        self._steps.append((name, step))
+
+    async def _run_step(self, name: str, step: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(step):
+                await asyncio.wait_for(step(), self.timeout_s)
+            else:
+                result = await asyncio.wait_for(asyncio.to_thread(step), self.timeout_s)
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, self.timeout_s)
+            self.steps[name] = {"ok": True}
+        except Exception as e:
+            # A failed step leaves that dependency cold; the first request pays for it instead
+            self.steps[name] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            print(f"⚠️ Warm-up step {name} failed: {type(e).__name__}: {e}")
+        self.steps[name]["ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    async def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if WARMUP_ENABLED:
+            print(f"🔥 Warming up: {', '.join(name for name, _ in self._steps)}")
+            await asyncio.gather(*[self._run_step(name, step) for name, step in self._steps])
+        self.total_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.ready.set()
+        if WARMUP_ENABLED:
+            print(f"🔥 Warm-up finished in {self.total_ms} ms")
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        return {"ready": self.ready.is_set(), "enabled": WARMUP_ENABLED, "total_ms": self.total_ms, "steps": self.steps}
+
+
+class LatencyTracker:
+    def __init__(self):
+        self._cold: List[float] = []
+        self._warm: List[float] = []
+        self.first_request_ms: Optional[float] = None
+
+    def record(self, ms: float, cold: bool) -> None:
+        if self.first_request_ms is None:
+            self.first_request_ms = round(ms, 1)
+        (self._cold if cold else self._warm).append(ms)
+
+    def report(self) -> Dict[str, Any]:
+        return {"first_request_ms": self.first_request_ms, "cold": latency_summary(self._cold), "warm": latency_summary(self._warm)}
+
+
+# --- CLI --- #
+async def main() -> None:
+    from example_main_and_agents import build_warmup
+
+    print(json.dumps(await build_warmup().run(), indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
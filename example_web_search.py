@@ -0,0 +1,326 @@
+# Web Search Pipeline for the web_search_agent
+# Description: Search -> fetch -> extract -> select, built to keep one agent turn fast:
+#              - search results and extracted pages are cached (TTL + LRU), so repeated queries
+#                skip the network entirely
+#              - result pages are fetched concurrently over one pooled httpx client
+#              - HTML is converted to text while it streams in, and the download stops as soon
+#                as enough text has been extracted
+#              - only the passages most relevant to the query are kept, within a token budget,
+#                so the synthesis call sees a compact, cited context instead of whole pages
+#
+# Enable for the agent with WEB_SEARCH=on. The search API is Tavily-compatible (TAVILY_API_KEY);
+# WEB_SEARCH_API_URL can point at example_fake_web.py for local runs.
+
+# -- Imports -- #
+import asyncio
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import httpx
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from example_tokens import count_tokens
+
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "footer", "header", "aside", "form", "svg", "iframe"}
+BLOCK_TAGS = {"p", "div", "li", "br", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article", "blockquote", "pre"}
+STOPWORDS = {"the", "a", "an", "of", "to", "in", "and", "or", "is", "are", "for", "on", "with", "what", "how", "who", "when", "why", "does"}
+
+
+# --- Cache --- #
+class TTLCache:
+    def __init__(self, max_entries: int = 512, ttl_s: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_s:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+# --- Streaming HTML to Text --- #
+class StreamingTextExtractor(HTMLParser):
+    # html.parser is incremental: feed() accepts arbitrary chunks as they arrive
+    def __init__(self, max_chars: int = 20000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = ""
+        self._parts: List[str] = []
+        self._chars = 0
+        self._skip_depth = 0
+        self._in_title = False
+
+    @property
+    def full(self) -> bool:
+        return self._chars >= self.max_chars
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth or self.full or not data.strip():
+            return
+        self._parts.append(data)
+        self._chars += len(data)
+
+    def text(self) -> str:
+        text = re.sub(r"[ \t\r\f\v]+", " ", "".join(self._parts))
+        return re.sub(r"\s*\n\s*", "\n", text).strip()[: self.max_chars]
+
+
+# --- Passage Selection --- #
+def _terms(text: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def split_passages(text: str, target_chars: int = 400) -> List[str]:
+    passages, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+|\n+", text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) > target_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        passages.append(current)
+    return passages
+
+
+def select_passages(
+    query: str, pages: List[Dict[str, Any]], token_budget: int = 1500, max_per_source: int = 3
+) -> List[Dict[str, Any]]:
+    # BM25-style scoring across every passage of every page, then greedy fill of the token budget
+    candidates = [
+        {"url": page["url"], "title": page["title"], "text": passage, "terms": Counter(_terms(passage))}
+        for page in pages for passage in split_passages(page["text"])
+    ]
+    if not candidates:
+        return []
+    query_terms = set(_terms(query))
+    avg_len = sum(sum(c["terms"].values()) for c in candidates) / len(candidates) or 1.0
+    doc_freq = Counter(term for c in candidates for term in set(c["terms"]) & query_terms)
+    k1, b = 1.2, 0.75
+    for c in candidates:
+        length = sum(c["terms"].values()) or 1
+        c["score"] = sum(
+            math.log(1 + (len(candidates) - doc_freq[t] + 0.5) / (doc_freq[t] + 0.5))
+            * c["terms"][t] * (k1 + 1) / (c["terms"][t] + k1 * (1 - b + b * length / avg_len))
+            for t in query_terms if c["terms"][t]
+        )
+
+    selected, used_tokens, per_source, seen_terms = [], 0, Counter(), []
+    for c in sorted(candidates, key=lambda c: -c["score"]):
+        if c["score"] <= 0 or per_source[c["url"]] >= max_per_source:
+            continue
+        # Mirrored/syndicated pages repeat passages; don't spend the budget twice on the same text
+        terms = set(c["terms"])
+        if any(len(terms & other) / (len(terms | other) or 1) > 0.8 for other in seen_terms):
+            continue
+        tokens = count_tokens(c["text"])
+        if used_tokens + tokens > token_budget:
+            continue
+        selected.append({"url": c["url"], "title": c["title"], "text": c["text"], "score": round(c["score"], 3)})
+        used_tokens += tokens
+        per_source[c["url"]] += 1
+        seen_terms.append(terms)
+    return selected
+
+
+# --- Pipeline --- #
+class WebSearchPipeline:
+    def __init__(
+        self, api_url: str = "https://api.tavily.com/search", api_key: Optional[str] = None, max_results: int = 5,
+        token_budget: int = 1500, cache_ttl_s: float = 900.0, max_page_bytes: int = 1_500_000,
+        max_page_chars: int = 20000, fetch_timeout_s: float = 8.0, max_connections: int = 20
+    ):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_results = max_results
+        self.token_budget = token_budget
+        self.max_page_bytes = max_page_bytes
+        self.max_page_chars = max_page_chars
+        self.fetch_timeout_s = fetch_timeout_s
+        self._client = httpx.AsyncClient(
+            timeout=fetch_timeout_s, follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"User-Agent": "EVA-WebSearch/1.0"},
+        )
+        self.search_cache = TTLCache(ttl_s=cache_ttl_s)
+        self.page_cache = TTLCache(max_entries=2048, ttl_s=cache_ttl_s)
+        self.answer_cache = TTLCache(ttl_s=cache_ttl_s)
+        self.bytes_downloaded = 0
+        self.fetch_errors = 0
+
+    async def search(self, query: str) -> List[Dict[str, Any]]:
+        key = normalize_query(query)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
+        body = {"query": query, "max_results": self.max_results, "search_depth": "basic"}
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        response = await self._client.post(self.api_url, json=body, headers=headers)
+        response.raise_for_status()
+        results = response.json().get("results", [])[: self.max_results]
+        self.search_cache.put(key, results)
+        return results
+
+    async def _fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        extractor = StreamingTextExtractor(self.max_page_chars)
+        received = 0
+        async with self._client.stream("GET", url) as response:
+            if response.status_code >= 400:
+                return None
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type and "text/plain" not in content_type:
+                return None
+            async for chunk in response.aiter_text():
+                received += len(chunk)
+                extractor.feed(chunk)
+                # Stop downloading once we have enough text, or the page is unreasonably large
+                if extractor.full or received >= self.max_page_bytes:
+                    break
+        extractor.close()
+        self.bytes_downloaded += received
+        return {"url": url, "title": extractor.title.strip(), "text": extractor.text()}
+
+    async def fetch_page(self, url: str) -> Optional[Dict[str, Any]]:
+        cached = self.page_cache.get(url)
+        if cached is not None:
+            return cached
+        try:
+            page = await asyncio.wait_for(self._fetch(url), self.fetch_timeout_s)
+        except Exception as e:
+            print(f"⚠️ Fetch failed for {url}: {type(e).__name__}")
+            self.fetch_errors += 1
+            return None
+        if page:
+            self.page_cache.put(url, page)
+        return page
+
+    async def run(self, query: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        key = normalize_query(query)
+        cached = self.answer_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True, "ms": round((time.perf_counter() - start) * 1000, 2)}
+        results = await self.search(query)
+        errors_before = self.fetch_errors
+        pages = await asyncio.gather(*[self.fetch_page(r["url"]) for r in results])
+        # Fall back to the search API's own snippet for pages that could not be fetched
+        usable = [
+            page or {"url": r["url"], "title": r.get("title", ""), "text": r.get("content", "")}
+            for r, page in zip(results, pages)
+        ]
+        passages = select_passages(query, usable, self.token_budget)
+        outcome = {"query": query, "sources": len(results), "passages": passages}
+        # An answer built from fallback snippets after failed fetches is served once, not cached,
+        # so the next ask retries the pages instead of replaying the degraded answer for the TTL
+        if self.fetch_errors == errors_before and any(pages):
+            self.answer_cache.put(key, outcome)
+        return {**outcome, "cached": False, "ms": round((time.perf_counter() - start) * 1000, 2)}
+
+    @staticmethod
+    def format_context(outcome: Dict[str, Any]) -> str:
+        if not outcome["passages"]:
+            return f"No relevant web results found for '{outcome['query']}'."
+        sources: Dict[str, int] = {}
+        lines = []
+        for passage in outcome["passages"]:
+            n = sources.setdefault(passage["url"], len(sources) + 1)
+            lines.append(f"[{n}] {passage['text']}")
+        refs = "\n".join(f"[{n}] {url}" for url, n in sources.items())
+        return "\n\n".join(lines) + f"\n\nSources:\n{refs}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "answer_cache": {"hits": self.answer_cache.hits, "misses": self.answer_cache.misses},
+            "search_cache": {"hits": self.search_cache.hits, "misses": self.search_cache.misses},
+            "page_cache": {"hits": self.page_cache.hits, "misses": self.page_cache.misses},
+            "bytes_downloaded": self.bytes_downloaded,
+            "fetch_errors": self.fetch_errors,
+        }
+
+    async def warm_up(self) -> None:
+        # Opens the pooled connection to the search API; the status of a HEAD request does not matter
+        await self._client.head(self.api_url)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# --- Agent Tool --- #
+class WebSearchInput(BaseModel):
+    query: str = Field(..., description="The web search query.")
+
+
+class WebSearchTool(BaseTool):
+    name: str = "web_search"
+    description: str = (
+        "Searches the web and returns the most relevant passages from the top result pages, with numbered sources."
+    )
+    args_schema: Type[BaseModel] = WebSearchInput
+    pipeline: Any = None
+
+    def _run(self, **kwargs: Any) -> str:
+        raise NotImplementedError("web_search is async-only; use ainvoke.")
+
+    async def _arun(self, query: str) -> str:
+        outcome = await self.pipeline.run(query)
+        print(f"🌐 Web search: {len(outcome['passages'])} passages from {outcome['sources']} sources in {outcome['ms']} ms"
+              + (" (cached)" if outcome["cached"] else ""))
+        return self.pipeline.format_context(outcome)
+
+
+def web_search_from_env() -> Optional[WebSearchPipeline]:
+    if os.getenv("WEB_SEARCH", "off").strip().lower() not in ("on", "true", "1"):
+        return None
+    api_key = os.getenv("TAVILY_API_KEY", "")
+    return WebSearchPipeline(
+        api_url=os.getenv("WEB_SEARCH_API_URL", "https://api.tavily.com/search"),
+        api_key=None if not api_key or api_key.startswith("YOUR_") else api_key,
+        max_results=int(os.getenv("WEB_SEARCH_MAX_RESULTS", "5")),
+        token_budget=int(os.getenv("WEB_SEARCH_TOKEN_BUDGET", "1500")),
+        cache_ttl_s=float(os.getenv("WEB_SEARCH_CACHE_TTL_S", "900")),
+    )